@@ -0,0 +1,248 @@
+#!/usr/bin/env python3
+"""
+Columnar, memory-mapped copy of the collected values for the hot lookups.
+For each year, export_columnar writes plain NumPy .npy files:
+
+  variables-<year>.npy   sorted variable ids (row index; a table's rows are contiguous)
+  geos-<year>.npy        county FIPS codes (column index)
+  values-<year>.npy      float64 matrix, variables x counties (NaN = no value)
+  moe-<year>.npy         float64 matrix of margins of error, same shape
+  extras-<year>.json     the few stored values a float matrix cannot hold
+                         (text values, rows with neither value nor MOE)
+
+ColumnarStore opens the matrices with mmap_mode='r', so a lookup is a
+searchsorted over the row index plus array indexing, with no query and no copy
+of the data; every gunicorn worker maps the same files and shares them through
+the page cache. Exports are written next to each published snapshot (see
+acs_snapshots.py) and never change afterwards.
+
+NumPy is optional: without it nothing is exported and the server keeps
+answering from SQLite.
+
+    python acs_columnar.py snapshots/acs_data.v3.db
+"""
+
+import argparse
+import json
+import logging
+import math
+import os
+import shutil
+import sqlite3
+import time
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # optional: lookups fall back to SQLite
+    np = None
+
+from acs_store import estimate_id
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_NAME = "manifest.json"
+COLUMNAR_FORMAT = 1
+# Rows fetched from SQLite per fetchmany while a year is exported
+FETCH_ROWS = 10000
+
+
+def columnar_dir_for(snapshot_path: str) -> str:
+    """Directory of a snapshot's columnar export (acs_data.v3.db -> acs_data.v3.columnar)."""
+    return os.path.splitext(snapshot_path)[0] + ".columnar"
+
+
+def _as_float(value) -> Optional[float]:
+    """value as a matrix cell, or None if a float64 cannot represent it exactly."""
+    if value is None:
+        return math.nan
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    return None
+
+
+def export_columnar(db_path: str, out_dir: str) -> Dict:
+    """Write the per-year arrays of db_path (a published snapshot) to out_dir; returns the manifest.
+
+    Years are read and written one at a time, so memory holds a single year's
+    matrices. The files are written to a temporary directory that is renamed
+    into place, so a reader never sees a partial export.
+    """
+    if np is None:
+        raise RuntimeError("numpy is required for the columnar export (pip install numpy)")
+    started = time.perf_counter()
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    cursor = conn.cursor()
+    cursor.execute('SELECT geo_key, county_fips FROM acs_geographies ORDER BY county_fips')
+    geographies = cursor.fetchall()
+    geo_column = {geo_key: index for index, (geo_key, _) in enumerate(geographies)}
+    geos = np.array([fips for _, fips in geographies])
+
+    cursor.execute('SELECT var_key, variable_id FROM acs_variable_keys')
+    variable_ids = dict(cursor.fetchall())
+    cursor.execute('SELECT DISTINCT year FROM acs_facts ORDER BY year')
+    years = [row[0] for row in cursor.fetchall()]
+
+    tmp_dir = out_dir + ".tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    manifest = {"format": COLUMNAR_FORMAT, "years": {}}
+    total = 0
+    for year in years:
+        # One year at a time, streamed into compact buffers (8 bytes per cell and column)
+        var_keys, columns, cells, cell_margins = array('q'), array('q'), array('d'), array('d')
+        extra_rows = []
+        cursor.execute('SELECT var_key, geo_key, value, margin_of_error FROM acs_facts WHERE year = ?', (year,))
+        while True:
+            rows = cursor.fetchmany(FETCH_ROWS)
+            if not rows:
+                break
+            for var_key, geo_key, value, moe in rows:
+                value_cell, moe_cell = _as_float(value), _as_float(moe)
+                if value_cell is None or moe_cell is None or (value is None and moe is None):
+                    # Kept in extras; both matrix cells stay NaN
+                    extra_rows.append((var_key, geo_key, value, moe))
+                    value_cell = moe_cell = math.nan
+                var_keys.append(var_key)
+                columns.append(geo_column[geo_key])
+                cells.append(value_cell)
+                cell_margins.append(moe_cell)
+
+        # Matrix row of each value: the rank of its variable id among the year's sorted ids
+        keys, key_rows = np.unique(np.frombuffer(var_keys, dtype=np.int64), return_inverse=True)
+        variables = np.array([variable_ids[var_key] for var_key in keys.tolist()])
+        order = np.argsort(variables)
+        rank = np.empty(len(order), dtype=np.int64)
+        rank[order] = np.arange(len(order))
+        cell_rows, cell_columns = rank[key_rows], np.frombuffer(columns, dtype=np.int64)
+        values = np.full((len(variables), len(geos)), np.nan)
+        margins = np.full((len(variables), len(geos)), np.nan)
+        values[cell_rows, cell_columns] = np.frombuffer(cells)
+        margins[cell_rows, cell_columns] = np.frombuffer(cell_margins)
+        extras = {f"{variable_ids[var_key]}|{geos[geo_column[geo_key]]}": [value, moe]
+                  for var_key, geo_key, value, moe in extra_rows}
+
+        np.save(os.path.join(tmp_dir, f"variables-{year}.npy"), variables[order])
+        np.save(os.path.join(tmp_dir, f"geos-{year}.npy"), geos)
+        np.save(os.path.join(tmp_dir, f"values-{year}.npy"), values)
+        np.save(os.path.join(tmp_dir, f"moe-{year}.npy"), margins)
+        with open(os.path.join(tmp_dir, f"extras-{year}.json"), "w") as f:
+            json.dump(extras, f, separators=(",", ":"))
+        manifest["years"][str(year)] = {"variables": len(variables), "geos": len(geos),
+                                        "values": len(var_keys), "extras": len(extras)}
+        total += len(var_keys)
+        del var_keys, columns, cells, cell_margins, values, margins
+    conn.close()
+
+    with open(os.path.join(tmp_dir, MANIFEST_NAME), "w") as f:
+        json.dump(manifest, f, indent=2)
+    shutil.rmtree(out_dir, ignore_errors=True)
+    os.replace(tmp_dir, out_dir)
+    logger.info(f"Exported {total} values for {len(years)} years "
+                f"to {out_dir} in {time.perf_counter() - started:.2f}s")
+    return manifest
+
+
+class ColumnarStore:
+    """Read-only lookups over an export_columnar directory (memory-mapped, zero-copy)."""
+
+    def __init__(self, directory: str):
+        if np is None:
+            raise RuntimeError("numpy is required for the columnar store (pip install numpy)")
+        self.directory = directory
+        with open(os.path.join(directory, MANIFEST_NAME)) as f:
+            self.manifest = json.load(f)
+        self.years = sorted(int(year) for year in self.manifest["years"])
+        self._years = {}
+
+    def year_arrays(self, year: int) -> Optional[Dict]:
+        """The memory-mapped arrays of one year (opened on first use), or None if not exported."""
+        year = int(year)
+        arrays = self._years.get(year)
+        if arrays is None and year in self.years:
+            arrays = {name: np.load(os.path.join(self.directory, f"{name}-{year}.npy"), mmap_mode='r')
+                      for name in ("variables", "geos", "values", "moe")}
+            arrays["geo_column"] = {fips: index for index, fips in enumerate(arrays["geos"].tolist())}
+            with open(os.path.join(self.directory, f"extras-{year}.json")) as f:
+                arrays["extras"] = json.load(f)
+            self._years[year] = arrays
+        return arrays
+
+    def table_slice(self, table_id: str, year: int):
+        """(variable_ids, county_fips, values, margins) views of one table's rows for a year, or None."""
+        arrays = self.year_arrays(year)
+        if arrays is None:
+            return None
+        # Rows are sorted, so B01001_* lies between "B01001_" and "B01001`" ('`' follows '_')
+        start, end = np.searchsorted(arrays["variables"], [table_id + "_", table_id + "`"])
+        return (arrays["variables"][start:end], arrays["geos"],
+                arrays["values"][start:end], arrays["moe"][start:end])
+
+    def fetch_series(self, variable_ids: List[str], years: List[int],
+                     county_fips: List[str]) -> List[Tuple[str, str, int, object, object]]:
+        """Same results, in the same order, as acs_store.fetch_series on the exported snapshot."""
+        if not variable_ids or not years or not county_fips:
+            return []
+        variable_ids = list(dict.fromkeys(variable_ids))
+        county_fips = list(dict.fromkeys(county_fips))
+        years = sorted({int(year) for year in years})
+        row_ids = [estimate_id(var_id) for var_id in variable_ids]
+
+        # Per year: the requested rows x counties gathered in one fancy-indexing step
+        gathered = []
+        for year in years:
+            arrays = self.year_arrays(year)
+            if arrays is None:
+                continue
+            variables = arrays["variables"]
+            if not len(variables):
+                continue
+            rows = np.minimum(np.searchsorted(variables, row_ids), len(variables) - 1)
+            found = (variables[rows] == np.array(row_ids)).tolist()
+            columns = {fips: position for position, fips in enumerate(
+                fips for fips in county_fips if fips in arrays["geo_column"])}
+            indexes = [arrays["geo_column"][fips] for fips in columns]
+            gathered.append((year, found, columns, arrays["values"][rows][:, indexes].tolist(),
+                             arrays["moe"][rows][:, indexes].tolist(), arrays["extras"]))
+
+        results = []
+        for index, (var_id, row_id) in enumerate(zip(variable_ids, row_ids)):
+            is_moe = var_id != row_id
+            for fips in county_fips:
+                for year, found, columns, values, margins, extras in gathered:
+                    extra = extras.get(f"{row_id}|{fips}") if extras else None
+                    if extra is not None:
+                        value, moe = extra
+                    else:
+                        position = columns.get(fips)
+                        if not found[index] or position is None:
+                            continue
+                        value, moe = values[index][position], margins[index][position]
+                        if value != value:  # NaN
+                            if moe != moe:
+                                continue
+                            value = None
+                        elif moe != moe:
+                            moe = None
+                    if is_moe:
+                        value, moe = moe, None
+                    results.append((var_id, fips, year, value, moe))
+        return results
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Export a snapshot's values as memory-mappable NumPy arrays")
+    parser.add_argument("db", help="Published snapshot (or any collected-data database)")
+    parser.add_argument("--out", help="Output directory (default: next to the snapshot)")
+    args = parser.parse_args()
+
+    manifest = export_columnar(args.db, args.out or columnar_dir_for(args.db))
+    for year, counts in manifest["years"].items():
+        print(f"{year}: {counts['variables']} variables x {counts['geos']} counties "
+              f"({counts['values']} values, {counts['extras']} outside the matrix)")
+
+
+if __name__ == "__main__":
+    main()
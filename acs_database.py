@@ -2,11 +2,67 @@ import sqlite3
 import requests
 import os
 import json
+import re
+import time
+from collections import Counter
 from typing import List, Dict, Tuple
+from fuzzy_search import TrigramIndex, rank_by_similarity, tokenize
+
+# Facet filters accepted by search_variables_faceted
+FACET_FIELDS = {
+    'year': 'year',
+    'family': 'table_family',
+    'kind': 'value_kind',
+    'group': 'group_name'
+}
+
+# Columns of the variables table returned by get_variables_details
+VARIABLE_FIELDS = ('id', 'name', 'concept', 'group_name', 'year', 'predicate_type', 'var_limit',
+                   'attributes', 'var_values', 'table_family', 'value_kind')
+# Stored as JSON text; only read and decoded when a caller asks for them
+JSON_FIELDS = ('attributes', 'var_values')
+DEFAULT_DETAIL_FIELDS = tuple(field for field in VARIABLE_FIELDS if field not in JSON_FIELDS)
+# How long a read catalog version is trusted before catalog_meta is read again
+CATALOG_VERSION_CHECK_SECONDS = 5.0
+# Fuzzy searches fetch this many candidate rows per returned row, then rank them by trigram similarity
+FUZZY_CANDIDATES = 10
+
+def classify_variable(var_id: str, group_name: str = '') -> Tuple[str, str]:
+    """Return (table_family, value_kind) for a variable, e.g. ('B', 'estimate') for B01001_001E"""
+    table_id = group_name or (var_id.split('_')[0] if '_' in var_id else '')
+    match = re.match(r'[A-Z]+', table_id or '')
+    family = match.group(0) if match else ''
+    
+    if '_' not in var_id:
+        kind = 'other'
+    elif var_id.endswith(('EA', 'MA')):
+        kind = 'annotation'
+    elif var_id.endswith('E'):
+        kind = 'estimate'
+    elif var_id.endswith('M'):
+        kind = 'moe'
+    else:
+        kind = 'other'
+    return family, kind
+
+def label_path(label: str) -> List[str]:
+    """Split a '!!' label into hierarchy parts, e.g. 'Estimate!!Total:!!Male:' -> ['Total', 'Male']"""
+    parts = [part.strip().rstrip(':').strip() for part in (label or '').split('!!')]
+    if parts and parts[0] in ('Estimate', 'Margin of Error'):
+        parts = parts[1:]
+    return [part for part in parts if part]
 
 class ACSDatabase:
-    def __init__(self, db_path: str = 'acs_variables.db'):
+    def __init__(self, db_path: str = 'acs_variables.db', search_cache=None):
         self.db_path = db_path
+        # Optional SearchCache placed in front of search_variables
+        self.search_cache = search_cache
+        # Trigram index for fuzzy search, rebuilt when the catalog version changes
+        self._trigram_index = None
+        self._trigram_index_version = None
+        # Last read catalog version and when it was read (see get_catalog_version)
+        self._catalog_version = None
+        self._catalog_version_read_at = 0.0
         self.init_database()
     
     def init_database(self):
@@ -25,15 +81,81 @@ class ACSDatabase:
                 predicate_type TEXT,
                 var_limit TEXT,
                 attributes TEXT,
-                var_values TEXT
+                var_values TEXT,
+                table_family TEXT,
+                value_kind TEXT
             )
         ''')
         
+        # Facet columns (added to older databases in place and backfilled)
+        cursor.execute('PRAGMA table_info(variables)')
+        columns = {row[1] for row in cursor.fetchall()}
+        if 'table_family' not in columns or 'value_kind' not in columns:
+            if 'table_family' not in columns:
+                cursor.execute('ALTER TABLE variables ADD COLUMN table_family TEXT')
+            if 'value_kind' not in columns:
+                cursor.execute('ALTER TABLE variables ADD COLUMN value_kind TEXT')
+            conn.create_function('classify_family', 2, lambda v, g: classify_variable(v or '', g or '')[0])
+            conn.create_function('classify_kind', 1, lambda v: classify_variable(v or '')[1])
+            cursor.execute('''
+                UPDATE variables
+                SET table_family = classify_family(id, group_name), value_kind = classify_kind(id)
+            ''')
+        
         # Create search indexes for fast queries
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_name ON variables(name)')
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_concept ON variables(concept)')
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_group ON variables(group_name)')
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_year ON variables(year)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_facets ON variables(year, table_family, value_kind, group_name)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_family_kind ON variables(table_family, value_kind)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_kind_group ON variables(value_kind, group_name)')
+        
+        # Catalog metadata (version is bumped on every reload to invalidate caches)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS catalog_meta (
+                key TEXT PRIMARY KEY,
+                value TEXT
+            )
+        ''')
+        cursor.execute("INSERT OR IGNORE INTO catalog_meta (key, value) VALUES ('version', '0')")
+        
+        # Vocabulary of label/concept terms used by the fuzzy (trigram) search
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS search_terms (
+                term TEXT PRIMARY KEY,
+                frequency INTEGER
+            )
+        ''')
+        
+        # Precomputed table hierarchy (parent/child tree from the '!!' label structure)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS table_info (
+                table_id TEXT,
+                year INTEGER,
+                concept TEXT,
+                universe TEXT,
+                total_var_id TEXT,
+                variable_count INTEGER,
+                max_depth INTEGER,
+                PRIMARY KEY (table_id, year)
+            )
+        ''')
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS table_tree (
+                table_id TEXT,
+                year INTEGER,
+                var_id TEXT,
+                line INTEGER,
+                parent_id TEXT,
+                depth INTEGER,
+                label TEXT,
+                path TEXT,
+                is_total INTEGER,
+                PRIMARY KEY (table_id, year, var_id)
+            ) WITHOUT ROWID
+        ''')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_tree_var ON table_tree(var_id, year)')
         
         conn.commit()
         conn.close()
@@ -48,16 +170,20 @@ class ACSDatabase:
         
         variables_data = response.json()
         variables = variables_data.get("variables", {})
+        # Fetched before the write transaction starts, so no HTTP round trip holds the catalog lock
+        universes = self.fetch_table_universes(year)
         
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
         
         count = 0
         for var_id, var_info in variables.items():
+            family, kind = classify_variable(var_id, var_info.get("group", ""))
             cursor.execute('''
                 INSERT OR REPLACE INTO variables 
-                (id, name, concept, group_name, year, predicate_type, var_limit, attributes, var_values)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+                (id, name, concept, group_name, year, predicate_type, var_limit, attributes, var_values,
+                 table_family, value_kind)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             ''', (
                 var_id,
                 var_info.get("label", ""),
@@ -67,17 +193,388 @@ class ACSDatabase:
                 var_info.get("predicateType", ""),
                 var_info.get("limit", ""),
                 json.dumps(var_info.get("attributes", {})),
-                json.dumps(var_info.get("values", {}))
+                json.dumps(var_info.get("values", {})),
+                family,
+                kind
             ))
             count += 1
         
+        self.rebuild_search_terms(cursor)
+        self.rebuild_table_trees(cursor, year, variables, universes)
+        
+        self.store_database_stats(cursor)
+        
+        # Bump the catalog version in the same transaction so cached searches are invalidated
+        cursor.execute("UPDATE catalog_meta SET value = CAST(value AS INTEGER) + 1 WHERE key = 'version'")
+        
         conn.commit()
         conn.close()
+        # This process sees its own bump at once; others within CATALOG_VERSION_CHECK_SECONDS
+        self._catalog_version = None
         
         print(f"Stored {count} variables for year {year}")
         return count
     
-    def search_variables(self, search_term: str, limit: int = 50) -> List[Tuple]:
+    def fetch_table_universes(self, year: int) -> Dict[str, str]:
+        """Fetch table universes from groups.json (not part of variables.json); empty on failure"""
+        try:
+            response = requests.get(f"https://api.census.gov/data/{year}/acs/acs5/groups.json", timeout=60)
+            response.raise_for_status()
+            groups = response.json().get("groups", [])
+        except Exception as e:
+            print(f"Warning: Could not fetch table universes for {year}: {e}")
+            return {}
+        # The API spells the key with a trailing space ("universe ")
+        return {g.get("name", ""): (g.get("universe ") or g.get("universe") or "").strip() for g in groups}
+    
+    def rebuild_table_trees(self, cursor, year: int, variables: Dict, universes: Dict[str, str] = None):
+        """Precompute the parent/child tree of every table for a year from its estimate labels"""
+        universes = universes or {}
+        tables = {}
+        for var_id, var_info in variables.items():
+            group = var_info.get("group", "")
+            if group and classify_variable(var_id, group)[1] == 'estimate':
+                tables.setdefault(group, []).append((var_id, var_info))
+        
+        cursor.execute('DELETE FROM table_tree WHERE year = ?', (year,))
+        cursor.execute('DELETE FROM table_info WHERE year = ?', (year,))
+        
+        node_rows = []
+        info_rows = []
+        for table_id, table_vars in tables.items():
+            table_vars.sort(key=lambda item: item[0])
+            by_path = {}
+            total_var_id = None
+            max_depth = 0
+            for var_id, var_info in table_vars:
+                parts = tuple(label_path(var_info.get("label", "")))
+                # Nearest ancestor that is itself a variable (some tables skip levels)
+                parent_id = None
+                for i in range(len(parts) - 1, 0, -1):
+                    parent_id = by_path.get(parts[:i])
+                    if parent_id:
+                        break
+                by_path.setdefault(parts, var_id)
+                depth = max(len(parts) - 1, 0)
+                is_total = depth == 0 and bool(parts) and parts[0].startswith('Total')
+                if is_total and total_var_id is None:
+                    total_var_id = var_id
+                max_depth = max(max_depth, depth)
+                suffix = var_id[len(table_id) + 1:]
+                line = int(''.join(ch for ch in suffix if ch.isdigit()) or 0)
+                node_rows.append((
+                    table_id, year, var_id, line, parent_id, depth,
+                    parts[-1] if parts else '', ' -> '.join(parts), int(is_total)
+                ))
+            concept = table_vars[0][1].get("concept", "")
+            info_rows.append((table_id, year, concept, universes.get(table_id) or None,
+                              total_var_id, len(table_vars), max_depth))
+        
+        cursor.executemany('''
+            INSERT INTO table_tree (table_id, year, var_id, line, parent_id, depth, label, path, is_total)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', node_rows)
+        cursor.executemany('''
+            INSERT INTO table_info (table_id, year, concept, universe, total_var_id, variable_count, max_depth)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+        ''', info_rows)
+    
+    def get_table_tree(self, table_id: str, year: int = None) -> Dict:
+        """Get the precomputed hierarchy for a table (latest year if none given)"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        table_id = table_id.upper().strip()
+        if year is None:
+            cursor.execute('SELECT MAX(year) FROM table_info WHERE table_id = ?', (table_id,))
+            year = cursor.fetchone()[0]
+        cursor.execute('''
+            SELECT concept, universe, total_var_id, variable_count, max_depth
+            FROM table_info WHERE table_id = ? AND year = ?
+        ''', (table_id, year))
+        info = cursor.fetchone()
+        if not info:
+            conn.close()
+            return {}
+        
+        cursor.execute('''
+            SELECT var_id, line, parent_id, depth, label, path, is_total
+            FROM table_tree WHERE table_id = ? AND year = ?
+            ORDER BY line
+        ''', (table_id, year))
+        nodes = []
+        children = {}
+        for var_id, line, parent_id, depth, label, path, is_total in cursor.fetchall():
+            nodes.append({
+                'id': var_id,
+                'line': line,
+                'parent': parent_id,
+                'depth': depth,
+                'label': label,
+                'path': path,
+                'is_total': bool(is_total)
+            })
+            if parent_id:
+                children.setdefault(parent_id, []).append(var_id)
+        conn.close()
+        
+        for node in nodes:
+            node['children'] = children.get(node['id'], [])
+        
+        concept, universe, total_var_id, variable_count, max_depth = info
+        return {
+            'table_id': table_id,
+            'year': year,
+            'concept': concept,
+            'universe': universe,
+            'total_var_id': total_var_id,
+            'variable_count': variable_count,
+            'max_depth': max_depth,
+            'roots': [node['id'] for node in nodes if not node['parent']],
+            'nodes': nodes
+        }
+    
+    def get_variable_paths(self, var_ids: List[str], year: int) -> Dict[str, str]:
+        """Map variable IDs (E or M) to their precomputed hierarchy path for a year"""
+        # MOE variables share the tree node of their estimate
+        estimate_of = {var_id: var_id[:-1] + 'E' if var_id.endswith('M') else var_id for var_id in var_ids}
+        if not estimate_of:
+            return {}
+        lookup_ids = sorted(set(estimate_of.values()))
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        placeholders = ','.join(['?' for _ in lookup_ids])
+        cursor.execute(f'''
+            SELECT var_id, path FROM table_tree
+            WHERE year = ? AND var_id IN ({placeholders})
+        ''', [year] + lookup_ids)
+        paths = dict(cursor.fetchall())
+        conn.close()
+        return {var_id: paths[estimate_id] for var_id, estimate_id in estimate_of.items() if estimate_id in paths}
+    
+    def rebuild_search_terms(self, cursor):
+        """Rebuild the search term vocabulary from all variable labels and concepts"""
+        counts = Counter()
+        cursor.execute('SELECT name, concept FROM variables')
+        for name, concept in cursor.fetchall():
+            counts.update(tokenize(name))
+            counts.update(tokenize(concept))
+        
+        cursor.execute('DELETE FROM search_terms')
+        cursor.executemany(
+            'INSERT INTO search_terms (term, frequency) VALUES (?, ?)',
+            ((term, freq) for term, freq in counts.items() if len(term) >= 3 and not term.isdigit())
+        )
+    
+    def get_trigram_index(self) -> TrigramIndex:
+        """Load the in-memory trigram index for the current catalog version"""
+        version = self.get_catalog_version()
+        if self._trigram_index is None or self._trigram_index_version != version:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            cursor.execute('SELECT term, frequency FROM search_terms')
+            terms = cursor.fetchall()
+            if not terms:
+                # Catalogs loaded before the vocabulary existed: build it once now
+                self.rebuild_search_terms(cursor)
+                conn.commit()
+                cursor.execute('SELECT term, frequency FROM search_terms')
+                terms = cursor.fetchall()
+            self._trigram_index = TrigramIndex(terms)
+            self._trigram_index_version = version
+            conn.close()
+        return self._trigram_index
+    
+    def get_catalog_version(self) -> int:
+        """Get the current catalog version (incremented by populate_from_api)
+
+        catalog_meta is read at most once per CATALOG_VERSION_CHECK_SECONDS, so
+        cached searches do not open a connection per lookup; other processes'
+        updates are seen within that interval.
+        """
+        now = time.monotonic()
+        if self._catalog_version is not None and now - self._catalog_version_read_at < CATALOG_VERSION_CHECK_SECONDS:
+            return self._catalog_version
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute("SELECT value FROM catalog_meta WHERE key = 'version'")
+        row = cursor.fetchone()
+        conn.close()
+        self._catalog_version = int(row[0]) if row else 0
+        self._catalog_version_read_at = now
+        return self._catalog_version
+    
+    def search_variables(self, search_term: str, limit: int = 50, fuzzy: bool = False) -> List[Tuple]:
+        """Search variables by name, concept, or ID, served from the search cache when available"""
+        if fuzzy:
+            compute = lambda: self.fuzzy_search_variables(search_term, limit)
+        else:
+            compute = lambda: self._search_variables_uncached(search_term, limit)
+        if not self.search_cache:
+            return compute()
+        filters = {'fuzzy': 1} if fuzzy else None
+        return self.search_cache.get_or_compute(
+            search_term, limit, filters, self.get_catalog_version(), compute
+        )
+    
+    def search_variables_faceted(self, search_term: str, limit: int = 20, filters: Dict = None,
+                                fuzzy: bool = False, facets: bool = True) -> Dict:
+        """Filtered search returning matching rows plus facet counts, served from the cache when available
+
+        With facets=False only the filtered rows are computed ('total' is None
+        and 'facets' empty), skipping the COUNT/GROUP BY aggregation.
+        """
+        filters = {k: v for k, v in (filters or {}).items() if k in FACET_FIELDS and v not in (None, '', [])}
+        compute = lambda: self._search_variables_faceted_uncached(search_term, limit, filters, fuzzy, facets)
+        if not self.search_cache:
+            return compute()
+        cache_filters = dict(filters, facets=1 if facets else 0, fuzzy=1 if fuzzy else 0)
+        return self.search_cache.get_or_compute(
+            search_term, limit, cache_filters, self.get_catalog_version(), compute
+        )
+    
+    def _search_variables_faceted_uncached(self, search_term: str, limit: int, filters: Dict,
+                                           fuzzy: bool = False, facets: bool = True) -> Dict:
+        """Run the filtered search and (with facets) all facet counts in a single statement"""
+        typed_term = search_term
+        if fuzzy:
+            search_term, alternatives = self._fuzzy_alternatives(search_term)
+        else:
+            alternatives = [[word] for word in search_term.split()]
+        if not alternatives:
+            return {'results': [], 'total': 0, 'facets': {}}
+        
+        where_conditions, params = self._word_conditions(alternatives)
+        
+        # Facet filters hit the facet indexes before the LIKE terms are evaluated
+        for key, value in filters.items():
+            column = FACET_FIELDS[key]
+            values = value if isinstance(value, (list, tuple)) else str(value).split(',')
+            values = [self._normalize_facet_value(key, v) for v in values if str(v).strip()]
+            if not values:
+                continue
+            placeholders = ','.join(['?' for _ in values])
+            where_conditions.append(f'{column} IN ({placeholders})')
+            params.extend(values)
+        
+        exact_phrase = f'%{search_term}%'
+        aggregates = '''
+            UNION ALL SELECT 'total', NULL, COUNT(*), NULL, NULL, NULL FROM matches
+            UNION ALL SELECT 'year', year, COUNT(*), NULL, NULL, NULL FROM matches GROUP BY year
+            UNION ALL SELECT 'family', table_family, COUNT(*), NULL, NULL, NULL FROM matches GROUP BY table_family
+            UNION ALL SELECT 'kind', value_kind, COUNT(*), NULL, NULL, NULL FROM matches GROUP BY value_kind
+            UNION ALL SELECT * FROM (
+                SELECT 'group', group_name, COUNT(*), NULL, NULL, NULL FROM matches
+                GROUP BY group_name ORDER BY COUNT(*) DESC LIMIT 10
+            )
+        ''' if facets else ''
+        query = f'''
+            WITH matches AS (
+                SELECT id, name, concept, group_name, year, table_family, value_kind,
+                    CASE 
+                        WHEN name LIKE ? THEN 1
+                        WHEN id LIKE ? THEN 2
+                        WHEN concept LIKE ? THEN 3
+                        ELSE 4
+                    END AS priority
+                FROM variables
+                WHERE {' AND '.join(where_conditions)}
+            )
+            SELECT * FROM (
+                SELECT 'row', id, name, concept, group_name, year FROM matches
+                ORDER BY priority, name LIMIT ?
+            ){aggregates}
+        '''
+        
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        row_limit = limit * FUZZY_CANDIDATES if fuzzy else limit
+        cursor.execute(query, [exact_phrase, exact_phrase, exact_phrase] + params + [row_limit])
+        rows = cursor.fetchall()
+        conn.close()
+        
+        results = []
+        total = 0 if facets else None
+        counts = {'year': {}, 'family': {}, 'kind': {}, 'group': {}} if facets else {}
+        for kind, key, value, concept, group_name, year in rows:
+            if kind == 'row':
+                results.append((key, value, concept, group_name, year))
+            elif kind == 'total':
+                total = value
+            else:
+                # String keys so facets survive the JSON round trip through the shared cache
+                counts[kind][str(key)] = value
+        if fuzzy:
+            results = rank_by_similarity(typed_term, results, self._row_text)[:limit]
+        
+        return {'results': results, 'total': total, 'facets': counts}
+    
+    @staticmethod
+    def _normalize_facet_value(key: str, value):
+        """Coerce a facet filter value to the form stored in the variables table"""
+        value = str(value).strip()
+        if key == 'year':
+            return int(value)
+        if key == 'kind':
+            return value.lower()
+        return value.upper()
+    
+    def fuzzy_search_variables(self, search_term: str, limit: int = 50,
+                               time_budget_ms: float = 50) -> List[Tuple]:
+        """Typo-tolerant search ranked by trigram similarity to the typed words
+        
+        Each unknown word matches its closest vocabulary terms (trigram index);
+        up to FUZZY_CANDIDATES rows per result are fetched and ordered by how
+        similar their label, concept and table are to the query.
+        """
+        corrected, alternatives = self._fuzzy_alternatives(search_term, time_budget_ms)
+        if not alternatives:
+            return []
+        where_conditions, params = self._word_conditions(alternatives)
+        exact_phrase = f'%{corrected}%'
+        
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute(f'''
+            SELECT id, name, concept, group_name, year
+            FROM variables
+            WHERE {' AND '.join(where_conditions)}
+            ORDER BY
+                CASE
+                    WHEN name LIKE ? THEN 1
+                    WHEN id LIKE ? THEN 2
+                    WHEN concept LIKE ? THEN 3
+                    ELSE 4
+                END, name
+            LIMIT ?
+        ''', params + [exact_phrase, exact_phrase, exact_phrase, limit * FUZZY_CANDIDATES])
+        rows = cursor.fetchall()
+        conn.close()
+        return rank_by_similarity(search_term, rows, self._row_text)[:limit]
+    
+    def _fuzzy_alternatives(self, search_term: str, time_budget_ms: float = 50) -> Tuple[str, List[List[str]]]:
+        """(corrected query, for each typed word: the word and its closest vocabulary terms)"""
+        corrected, suggestions = self.get_trigram_index().correct_query(search_term, time_budget_ms=time_budget_ms)
+        return corrected, [[word] + [term for term, _ in suggestions.get(word, [])] for word in search_term.split()]
+    
+    @staticmethod
+    def _word_conditions(alternatives: List[List[str]]) -> Tuple[List[str], List]:
+        """One LIKE condition per word; a word matches if any of its alternatives does"""
+        conditions = []
+        params = []
+        for options in alternatives:
+            conditions.append('(' + ' OR '.join(
+                ['(name LIKE ? OR concept LIKE ? OR id LIKE ? OR group_name LIKE ?)'] * len(options)) + ')')
+            for option in options:
+                params.extend([f'%{option}%'] * 4)
+        return conditions, params
+    
+    @staticmethod
+    def _row_text(row: Tuple) -> str:
+        """Text a search result row is ranked on: label, concept and table"""
+        return f"{row[1] or ''} {row[2] or ''} {row[3] or ''}"
+    
+    def _search_variables_uncached(self, search_term: str, limit: int = 50) -> List[Tuple]:
         """Search variables by name, concept, or ID with smart prioritization"""
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
@@ -151,26 +648,43 @@ class ACSDatabase:
     
     def get_variable_details(self, var_id: str) -> Dict:
         """Get detailed information for a specific variable"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
+        return self.get_variables_details([var_id], fields=VARIABLE_FIELDS).get(var_id, {})
+    
+    def get_variables_details(self, var_ids: List[str], fields: List[str] = None) -> Dict[str, Dict]:
+        """Get details for many variables in one query, keyed by ID (missing IDs are left out)
         
-        cursor.execute('''
-            SELECT * FROM variables WHERE id = ?
-        ''', (var_id,))
+        fields picks the columns to return (default: everything but the JSON
+        columns); attributes and var_values are only read and decoded when asked for.
+        """
+        fields = list(dict.fromkeys(fields or DEFAULT_DETAIL_FIELDS))
+        unknown = [field for field in fields if field not in VARIABLE_FIELDS]
+        if unknown:
+            raise ValueError(f"Unknown field(s): {', '.join(unknown)}")
+        var_ids = list(dict.fromkeys(var_ids))
+        if not var_ids:
+            return {}
+        columns = ['id'] + [field for field in fields if field != 'id']
         
-        row = cursor.fetchone()
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        placeholders = ','.join(['?' for _ in var_ids])
+        cursor.execute(f'''
+            SELECT {', '.join(columns)} FROM variables WHERE id IN ({placeholders})
+        ''', var_ids)
+        rows = cursor.fetchall()
         conn.close()
         
-        if row:
-            result = dict(row)
-            # Parse JSON fields
-            if result.get('attributes'):
-                result['attributes'] = json.loads(result['attributes'])
-            if result.get('values'):
-                result['values'] = json.loads(result['values'])
-            return result
-        return {}
+        details = {}
+        for row in rows:
+            record = dict(zip(columns, row))
+            for field in JSON_FIELDS:
+                if record.get(field):
+                    record[field] = json.loads(record[field])
+            if 'id' not in fields:
+                del record['id']
+            details[row[0]] = record
+        # Request order
+        return {var_id: details[var_id] for var_id in var_ids if var_id in details}
     
     def get_variables_by_group(self, group_name: str, year: int = 2023) -> List[Tuple]:
         """Get all variables in a specific group"""
@@ -187,11 +701,28 @@ class ACSDatabase:
         conn.close()
         return results
     
-    def get_database_stats(self) -> Dict:
-        """Get statistics about the database"""
+    def get_database_stats(self, recompute: bool = False) -> Dict:
+        """Get statistics about the database (stored by populate_from_api, so no table scan)"""
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
-        
+        cursor.execute("SELECT value FROM catalog_meta WHERE key = 'stats'")
+        row = cursor.fetchone()
+        if row is None or recompute:
+            # Catalogs loaded before the stats were stored: compute them once now
+            stats = self.store_database_stats(cursor)
+            conn.commit()
+        else:
+            stored = json.loads(row[0])
+            stats = {
+                'total_variables': stored['total_variables'],
+                'by_year': {int(year): count for year, count in stored['by_year'].items()},
+                'top_groups': [tuple(group) for group in stored['top_groups']]
+            }
+        conn.close()
+        return stats
+    
+    def store_database_stats(self, cursor) -> Dict:
+        """Count the catalog and store the result in catalog_meta (key 'stats')"""
         # Total variables
         cursor.execute('SELECT COUNT(*) FROM variables')
         total_vars = cursor.fetchone()[0]
@@ -211,13 +742,13 @@ class ACSDatabase:
         ''')
         top_groups = cursor.fetchall()
         
-        conn.close()
-        
-        return {
+        stats = {
             'total_variables': total_vars,
             'by_year': by_year,
             'top_groups': top_groups
         }
+        cursor.execute("INSERT OR REPLACE INTO catalog_meta (key, value) VALUES ('stats', ?)", (json.dumps(stats),))
+        return stats
 
 # Example usage
 if __name__ == '__main__':
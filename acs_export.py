@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Parquet / Arrow export of the collected values for analysis tools.
+Instead of SELECT * into Python objects, the export streams acs_facts in
+chunks and writes hive-partitioned files, one per year and table family:
+
+  <out>/year=2023/family=B/part-0.parquet      (--format parquet, zstd)
+  <out>/year=2023/family=B/part-0.arrows       (--format arrow, IPC stream)
+
+ID columns (table_id, variable_id, county_fips, county_name) are dictionary
+encoded, so they load as categoricals. Values the API returned as text (not
+numbers) are kept in value_annotation / moe_annotation. At most --chunk-rows
+rows are held in memory at a time, whatever the database size.
+
+pyarrow is optional; the export (and format=parquet on /api/download) needs it.
+
+    python acs_export.py --db snapshots/acs_data.v3.db --out exports/acs_data
+    # pyarrow.dataset.dataset("exports/acs_data", partitioning="hive").to_table()
+"""
+
+import argparse
+import io
+import logging
+import os
+import shutil
+import sqlite3
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # optional: only the export needs it
+    pa = None
+    pq = None
+
+from acs_database import classify_variable
+from acs_store import table_id_for
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FORMATS = {'parquet': 'parquet', 'arrow': 'arrows'}
+DEFAULT_CHUNK_ROWS = 500_000
+
+
+def require_pyarrow():
+    if pa is None:
+        raise RuntimeError("pyarrow is required for Parquet/Arrow exports (pip install pyarrow)")
+
+
+def export_schema(partition_columns: bool = False, include_moe: bool = True) -> "pa.Schema":
+    """Columns of the exported files; year and family are directory names unless partition_columns."""
+    require_pyarrow()
+    ids = pa.dictionary(pa.int32(), pa.string())
+    fields = [pa.field('year', pa.int16()), pa.field('family', ids)] if partition_columns else []
+    fields += [pa.field('table_id', ids), pa.field('variable_id', ids),
+               pa.field('county_fips', ids), pa.field('county_name', ids),
+               pa.field('value', pa.float64()), pa.field('value_annotation', ids)]
+    if include_moe:
+        fields += [pa.field('margin_of_error', pa.float64()), pa.field('moe_annotation', ids)]
+    return pa.schema(fields)
+
+
+def _number(value) -> Tuple[Optional[float], Optional[str]]:
+    """(numeric value, annotation text) of a stored value."""
+    if value is None or isinstance(value, (int, float)):
+        return value, None
+    return None, str(value)
+
+
+def fact_chunks(conn: sqlite3.Connection, chunk_rows: int = DEFAULT_CHUNK_ROWS, years: List[int] = None,
+                table_ids: List[str] = None, county_fips: List[str] = None) -> Iterator[List[Tuple]]:
+    """Lists of at most chunk_rows (year, family, table_id, variable_id, county_fips, county_name, value, moe) rows.
+
+    Rows are read in acs_facts' primary key order with fetchmany, so only one
+    chunk is in memory; variable and county names come from their small key tables.
+    """
+    cursor = conn.cursor()
+    cursor.execute('SELECT var_key, variable_id FROM acs_variable_keys')
+    variables = {}
+    for var_key, var_id in cursor.fetchall():
+        table_id = table_id_for(var_id)
+        if table_ids is None or table_id in table_ids:
+            variables[var_key] = (classify_variable(var_id)[0] or 'other', table_id, var_id)
+    cursor.execute('SELECT geo_key, county_fips, county_name FROM acs_geographies')
+    geos = {geo_key: (fips, name) for geo_key, fips, name in cursor.fetchall()
+            if county_fips is None or fips in county_fips}
+
+    filters, params = [], []
+    for column, keys in (('year', years), ('var_key', None if table_ids is None else sorted(variables)),
+                         ('geo_key', None if county_fips is None else sorted(geos))):
+        if keys is not None:
+            filters.append(f"{column} IN ({','.join('?' * len(keys))})" if keys else '0')
+            params += list(keys)
+    cursor.execute(f'''
+        SELECT year, var_key, geo_key, value, margin_of_error FROM acs_facts
+        {'WHERE ' + ' AND '.join(filters) if filters else ''}
+    ''', params)
+    while True:
+        rows = cursor.fetchmany(chunk_rows)
+        if not rows:
+            return
+        yield [(year,) + variables[var_key] + geos[geo_key] + (value, moe)
+               for year, var_key, geo_key, value, moe in rows]
+
+
+def record_batch(rows: List[Tuple], schema: "pa.Schema") -> "pa.RecordBatch":
+    """Arrow batch of fact_chunks rows in the layout of schema (see export_schema)."""
+    year, family, table_id, variable_id, fips, name, value, moe = (list(column) for column in zip(*rows))
+    values, value_notes = zip(*map(_number, value))
+    moes, moe_notes = zip(*map(_number, moe))
+    columns = {
+        'year': pa.array(year, pa.int16()), 'family': family, 'table_id': table_id,
+        'variable_id': variable_id, 'county_fips': fips, 'county_name': name,
+        'value': pa.array(values, pa.float64()), 'value_annotation': value_notes,
+        'margin_of_error': pa.array(moes, pa.float64()), 'moe_annotation': moe_notes
+    }
+    arrays = []
+    for field in schema:
+        column = columns[field.name]
+        if pa.types.is_dictionary(field.type):
+            column = pa.array(column, pa.string()).dictionary_encode()
+        arrays.append(column)
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def _open_writer(path: str, schema: "pa.Schema", file_format: str):
+    if file_format == 'parquet':
+        return pq.ParquetWriter(path, schema, compression='zstd')
+    return pa.ipc.new_stream(pa.OSFile(path, 'wb'), schema)
+
+
+def export_dataset(db_path: str, out_dir: str, file_format: str = 'parquet',
+                   chunk_rows: int = DEFAULT_CHUNK_ROWS) -> Dict:
+    """Write the partitioned dataset of db_path to out_dir (replaced atomically); returns counts."""
+    require_pyarrow()
+    if file_format not in EXPORT_FORMATS:
+        raise ValueError(f"format must be one of {', '.join(EXPORT_FORMATS)}")
+    started = time.perf_counter()
+    schema = export_schema()
+    tmp_dir = out_dir + ".tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
+    writers = {}
+    rows_written = 0
+    try:
+        for chunk in fact_chunks(conn, chunk_rows):
+            partitions = {}
+            for row in chunk:
+                partitions.setdefault((row[0], row[1]), []).append(row)
+            for (year, family), rows in partitions.items():
+                writer = writers.get((year, family))
+                if writer is None:
+                    directory = os.path.join(tmp_dir, f"year={year}", f"family={family}")
+                    os.makedirs(directory)
+                    writer = writers[(year, family)] = _open_writer(
+                        os.path.join(directory, f"part-0.{EXPORT_FORMATS[file_format]}"), schema, file_format)
+                writer.write_batch(record_batch(rows, schema))
+            rows_written += len(chunk)
+    finally:
+        conn.close()
+        for writer in writers.values():
+            writer.close()
+
+    shutil.rmtree(out_dir, ignore_errors=True)
+    os.replace(tmp_dir, out_dir)
+    stats = {
+        'rows': rows_written,
+        'partitions': len(writers),
+        'bytes': sum(os.path.getsize(os.path.join(root, name))
+                     for root, _, names in os.walk(out_dir) for name in names),
+        'seconds': round(time.perf_counter() - started, 2)
+    }
+    logger.info(f"Exported {stats['rows']} rows to {stats['partitions']} {file_format} files in {out_dir} "
+                f"({stats['bytes'] / 1e6:.1f} MB, {stats['seconds']}s)")
+    return stats
+
+
+def parquet_bytes(conn: sqlite3.Connection, years: List[int], table_ids: List[str], county_fips: List[str],
+                  include_moe: bool = True, chunk_rows: int = DEFAULT_CHUNK_ROWS) -> Tuple[io.BytesIO, int]:
+    """One Parquet file (year and family as columns) of the selected values; returns (buffer, rows)."""
+    require_pyarrow()
+    schema = export_schema(partition_columns=True, include_moe=include_moe)
+    buffer = io.BytesIO()
+    rows = 0
+    with pq.ParquetWriter(buffer, schema, compression='zstd') as writer:
+        for chunk in fact_chunks(conn, chunk_rows, years, table_ids, county_fips):
+            writer.write_batch(record_batch(chunk, schema))
+            rows += len(chunk)
+    buffer.seek(0)
+    return buffer, rows
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Export the collected values as partitioned Parquet or Arrow files")
+    parser.add_argument("--db", default="comprehensive_acs_data.db", help="Collected-data database or snapshot")
+    parser.add_argument("--out", default=os.path.join("exports", "acs_data"), help="Output directory (replaced)")
+    parser.add_argument("--format", choices=sorted(EXPORT_FORMATS), default="parquet")
+    parser.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS,
+                        help="Rows read and converted at a time (bounds memory use)")
+    args = parser.parse_args()
+
+    stats = export_dataset(args.db, args.out, args.format, args.chunk_rows)
+    print(f"{stats['rows']} rows in {stats['partitions']} files, {stats['bytes'] / 1e6:.1f} MB")
+
+
+if __name__ == "__main__":
+    main()
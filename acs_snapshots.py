@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Blue/green snapshots of the collected-data database.
+The collectors keep writing to their own database (the staging copy). When a
+run completes, a consistent copy is taken with the SQLite backup API, compacted,
+validated and published under snapshots/ as a versioned, read-only file. A
+manifest (current.json) names the live snapshot and is replaced atomically, so
+the web app switches to a new snapshot on its next request, without a restart,
+and never sees a half-finished run or waits on a collector's transaction.
+
+Snapshots never change once published, so readers open them with immutable=1
+(no locking, no journal checks) and memory-map them. With NumPy installed, each
+snapshot also gets a columnar export for the hot lookups (see acs_columnar.py).
+
+    python acs_snapshots.py                # publish comprehensive_acs_data.db
+    python acs_snapshots.py --list
+"""
+
+import argparse
+import glob
+import json
+import logging
+import os
+import re
+import shutil
+import sqlite3
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from acs_columnar import columnar_dir_for, export_columnar, np
+from acs_store import NORMALIZED_VERSION
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_DIR = "snapshots"
+SNAPSHOT_PREFIX = "acs_data"
+MANIFEST_NAME = "current.json"
+# Memory-mapped bytes per reader connection (larger snapshots fall back to reads past this)
+MMAP_SIZE = 1 << 30
+
+SNAPSHOT_PATTERN = re.compile(rf"^{SNAPSHOT_PREFIX}\.v(\d+)\.db$")
+REQUIRED_OBJECTS = ('acs_facts', 'acs_variable_keys', 'acs_geographies', 'acs_data_stats', 'acs_data')
+
+
+class SnapshotInvalid(Exception):
+    """Raised when a staged snapshot fails validation; nothing is published."""
+
+
+def snapshot_versions(snapshot_dir: str = SNAPSHOT_DIR) -> Dict[int, str]:
+    """{version: path} of the published snapshot files."""
+    versions = {}
+    for path in glob.glob(os.path.join(snapshot_dir, f"{SNAPSHOT_PREFIX}.v*.db")):
+        match = SNAPSHOT_PATTERN.match(os.path.basename(path))
+        if match:
+            versions[int(match.group(1))] = path
+    return versions
+
+
+def read_manifest(snapshot_dir: str = SNAPSHOT_DIR) -> Optional[Dict]:
+    try:
+        with open(os.path.join(snapshot_dir, MANIFEST_NAME)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def current_snapshot(snapshot_dir: str = SNAPSHOT_DIR) -> Optional[str]:
+    """Path of the live snapshot, or None if nothing has been published."""
+    manifest = read_manifest(snapshot_dir)
+    if not manifest:
+        return None
+    return os.path.join(snapshot_dir, manifest['file'])
+
+
+def open_snapshot(path: str) -> sqlite3.Connection:
+    """Read-only, immutable, memory-mapped connection to a published snapshot."""
+    conn = sqlite3.connect(f"file:{path}?mode=ro&immutable=1", uri=True)
+    conn.execute(f'PRAGMA mmap_size = {MMAP_SIZE}')
+    return conn
+
+
+def validate_snapshot(path: str, collector: str = None) -> List[str]:
+    """Problems that keep a staged copy from being published (empty list if none).
+
+    With collector, only that collector's unfinished runs block the publish
+    (the collectors share one database, and a long run of one kept for
+    --resume must not hold back the other); without it, any unfinished run does.
+    """
+    conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+    cursor = conn.cursor()
+    problems = []
+    cursor.execute('PRAGMA quick_check')
+    check = [row[0] for row in cursor.fetchall()]
+    if check != ['ok']:
+        problems.append(f"quick_check: {'; '.join(check[:5])}")
+    cursor.execute('PRAGMA user_version')
+    version = cursor.fetchone()[0]
+    if version < NORMALIZED_VERSION:
+        problems.append(f"schema version {version}, expected {NORMALIZED_VERSION}")
+    cursor.execute(f'''
+        SELECT name FROM sqlite_master WHERE name IN ({','.join('?' * len(REQUIRED_OBJECTS))})
+    ''', REQUIRED_OBJECTS)
+    missing = set(REQUIRED_OBJECTS) - {row[0] for row in cursor.fetchall()}
+    if missing:
+        problems.append(f"missing tables: {', '.join(sorted(missing))}")
+        conn.close()
+        return problems
+
+    cursor.execute('SELECT COUNT(*) FROM acs_facts')
+    values = cursor.fetchone()[0]
+    if not values:
+        problems.append("no collected values")
+    cursor.execute('SELECT COALESCE(SUM(values_count), 0) FROM acs_data_stats')
+    counted = cursor.fetchone()[0]
+    if counted != values:
+        problems.append(f"acs_data_stats counts {counted} values, acs_facts has {values} (run --recompute)")
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'collection_runs'")
+    if cursor.fetchone():
+        # A run that is still collecting would be published half-finished
+        query = "SELECT run_id, collector FROM collection_runs WHERE status IN ('planning', 'running')"
+        if collector is None:
+            cursor.execute(query)
+        else:
+            cursor.execute(query + " AND collector = ?", (collector,))
+        for run_id, run_collector in cursor.fetchall():
+            problems.append(f"run {run_id} ({run_collector}) is not complete")
+    conn.close()
+    return problems
+
+
+def publish_snapshot(db_path: str = "comprehensive_acs_data.db", snapshot_dir: str = SNAPSHOT_DIR,
+                     keep: int = 2, collector: str = None) -> Dict:
+    """Copy, validate and publish db_path as the next snapshot; returns the new manifest.
+
+    Raises SnapshotInvalid (and leaves the live snapshot in place) if the copy
+    fails validation (collector: see validate_snapshot). The newest `keep`
+    snapshots are kept, since requests that started before the switch may
+    still be reading the previous one.
+    """
+    started = time.perf_counter()
+    os.makedirs(snapshot_dir, exist_ok=True)
+    version = max(snapshot_versions(snapshot_dir), default=0) + 1
+    filename = f"{SNAPSHOT_PREFIX}.v{version}.db"
+    path = os.path.join(snapshot_dir, filename)
+    staging_path = path + ".tmp"
+    if os.path.exists(staging_path):
+        os.remove(staging_path)
+
+    # The backup reads one consistent state even while a collector is writing
+    source = sqlite3.connect(db_path, timeout=30)
+    staging = sqlite3.connect(staging_path)
+    source.backup(staging)
+    source.close()
+    # Self-contained, compacted file with planner statistics for the read-only queries
+    staging.execute('PRAGMA journal_mode=DELETE')
+    staging.execute('ANALYZE')
+    staging.execute('VACUUM')
+    staging.close()
+
+    problems = validate_snapshot(staging_path, collector)
+    if problems:
+        os.remove(staging_path)
+        raise SnapshotInvalid(f"{db_path} not published: {'; '.join(problems)}")
+
+    conn = sqlite3.connect(f"file:{staging_path}?mode=ro", uri=True)
+    values = conn.execute('SELECT COALESCE(SUM(values_count), 0) FROM acs_data_stats').fetchone()[0]
+    conn.close()
+    os.chmod(staging_path, 0o444)
+    os.replace(staging_path, path)
+
+    # Memory-mapped arrays for the hot lookups, ready before the snapshot goes live
+    columnar = False
+    if np is not None:
+        try:
+            export_columnar(path, columnar_dir_for(path))
+            columnar = True
+        except Exception as e:
+            logger.warning(f"Columnar export failed, lookups will use SQLite: {e}")
+
+    manifest = {
+        "file": filename,
+        "version": version,
+        "published_at": datetime.now().isoformat(timespec='seconds'),
+        "values": values,
+        "bytes": os.path.getsize(path),
+        "columnar": columnar
+    }
+    # Write the manifest atomically: readers see either the old or the new snapshot
+    manifest_path = os.path.join(snapshot_dir, MANIFEST_NAME)
+    tmp_path = manifest_path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, manifest_path)
+
+    for old_version, old_path in sorted(snapshot_versions(snapshot_dir).items())[:-max(keep, 1)]:
+        os.remove(old_path)
+        shutil.rmtree(columnar_dir_for(old_path), ignore_errors=True)
+        logger.info(f"Removed snapshot v{old_version}")
+
+    logger.info(f"Published snapshot v{version} ({values} values, {manifest['bytes'] / 1e6:.1f} MB) "
+                f"in {time.perf_counter() - started:.2f}s")
+    return manifest
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Publish a read-only snapshot of the collected data")
+    parser.add_argument("--db", default="comprehensive_acs_data.db", help="Collectors' (staging) database")
+    parser.add_argument("--dir", default=SNAPSHOT_DIR, help="Snapshot directory read by the web app")
+    parser.add_argument("--keep", type=int, default=2, help="Snapshots to keep, including the new one")
+    parser.add_argument("--list", action="store_true", help="List published snapshots and exit")
+    args = parser.parse_args()
+
+    if args.list:
+        live = current_snapshot(args.dir)
+        for version, path in sorted(snapshot_versions(args.dir).items()):
+            marker = "*" if live and os.path.samefile(path, live) else " "
+            print(f"{marker} v{version}  {os.path.getsize(path) / 1e6:8.1f} MB  {path}")
+        return
+
+    try:
+        manifest = publish_snapshot(args.db, args.dir, args.keep)
+    except SnapshotInvalid as e:
+        logger.error(str(e))
+        raise SystemExit(1)
+    print(f"Live snapshot: {manifest['file']} ({manifest['values']} values)")
+
+
+if __name__ == "__main__":
+    main()
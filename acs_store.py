@@ -0,0 +1,509 @@
+#!/usr/bin/env python3
+"""
+Storage layer for the collected-data database (comprehensive_acs_data.db).
+Shared by the collectors, the collection pipeline and the async engine:
+WAL connections with synchronous=NORMAL, executemany over generators, and
+secondary index builds deferred until the end of an initial load.
+
+Values live in acs_facts, a WITHOUT ROWID table clustered on integer
+(variable, geography, year) keys; acs_data is a view with the original
+text columns, so existing queries keep working. acs_data_stats holds value
+counts per year, table and county, maintained by the writers for the summaries.
+"""
+
+import logging
+import sqlite3
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+SCHEMA_SQL = [
+    '''
+    CREATE TABLE IF NOT EXISTS acs_variable_keys (
+        var_key INTEGER PRIMARY KEY,
+        variable_id TEXT NOT NULL UNIQUE
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS acs_geographies (
+        geo_key INTEGER PRIMARY KEY,
+        county_fips TEXT NOT NULL UNIQUE,
+        county_name TEXT
+    )
+    ''',
+    # One row per variable, county and year, stored in key order: the primary key is the table
+    '''
+    CREATE TABLE IF NOT EXISTS acs_facts (
+        var_key INTEGER NOT NULL,
+        geo_key INTEGER NOT NULL,
+        year INTEGER NOT NULL,
+        value REAL,
+        margin_of_error REAL,
+        PRIMARY KEY (var_key, geo_key, year)
+    ) WITHOUT ROWID
+    '''
+]
+
+# Compatibility view with the columns of the old acs_data table
+DATA_VIEW_SQL = '''
+    CREATE VIEW IF NOT EXISTS acs_data AS
+    SELECT v.variable_id, g.county_name, g.county_fips, f.year, f.value, f.margin_of_error,
+           CASE WHEN substr(v.variable_id, -1) = 'E' THEN 'estimate' ELSE 'other' END AS data_type
+    FROM acs_facts f
+    JOIN acs_variable_keys v ON v.var_key = f.var_key
+    JOIN acs_geographies g ON g.geo_key = f.geo_key
+'''
+
+# Table id of a variable_id (B01001_001E -> B01001)
+TABLE_ID_SQL = "CASE WHEN instr({col}, '_') > 0 THEN substr({col}, 1, instr({col}, '_') - 1) ELSE {col} END"
+
+# Value counts per year, table and county, updated by insert_data_rows in the writers'
+# transactions so summaries never scan the data. last_collected is NULL for values
+# that were already stored when the table was first built (see rebuild_data_stats).
+STATS_SQL = '''
+    CREATE TABLE IF NOT EXISTS acs_data_stats (
+        year INTEGER NOT NULL,
+        table_id TEXT NOT NULL,
+        geo_key INTEGER NOT NULL,
+        values_count INTEGER NOT NULL,
+        last_collected TIMESTAMP,
+        PRIMARY KEY (year, table_id, geo_key)
+    ) WITHOUT ROWID
+'''
+
+# Keys of a batch that are already stored (primary key seeks, see VALUES_SQL)
+STORED_KEYS_SQL = '''
+    SELECT v.variable_id, g.county_fips, f.year
+    FROM acs_variable_keys v
+    JOIN acs_facts f ON f.var_key = v.var_key
+    JOIN acs_geographies g ON g.geo_key = f.geo_key
+    WHERE v.variable_id IN ({variables})
+      AND g.county_fips IN ({geos})
+      AND f.year IN ({years})
+'''
+
+UPDATE_STATS_SQL = '''
+    INSERT INTO acs_data_stats (year, table_id, geo_key, values_count, last_collected)
+    VALUES (?, ?, (SELECT geo_key FROM acs_geographies WHERE county_fips = ?), ?, CURRENT_TIMESTAMP)
+    ON CONFLICT (year, table_id, geo_key) DO UPDATE SET
+        values_count = values_count + excluded.values_count, last_collected = excluded.last_collected
+'''
+
+# Secondary indexes on acs_facts; dropped during an initial load and rebuilt once at the end
+DATA_INDEXES = {
+    'idx_facts_geo_year': 'CREATE INDEX IF NOT EXISTS idx_facts_geo_year ON acs_facts (geo_key, year)',
+}
+
+INSERT_VARIABLE_KEY_SQL = 'INSERT OR IGNORE INTO acs_variable_keys (variable_id) VALUES (?)'
+
+INSERT_GEOGRAPHY_SQL = '''
+    INSERT INTO acs_geographies (county_fips, county_name) VALUES (?, ?)
+    ON CONFLICT (county_fips) DO UPDATE SET county_name = excluded.county_name
+    WHERE county_name IS NOT excluded.county_name
+'''
+
+# Re-collected values replace the stored ones; identical values are left untouched,
+# so a repeated collection only writes the rows that changed. A NULL column means
+# "not in this batch" (an estimate and its MOE can arrive in different requests),
+# so it never overwrites a stored value.
+INSERT_DATA_SQL = '''
+    INSERT INTO acs_facts (var_key, geo_key, year, value, margin_of_error)
+    VALUES ((SELECT var_key FROM acs_variable_keys WHERE variable_id = ?),
+            (SELECT geo_key FROM acs_geographies WHERE county_fips = ?), ?, ?, ?)
+    ON CONFLICT (var_key, geo_key, year) DO UPDATE SET
+        value = COALESCE(excluded.value, acs_facts.value),
+        margin_of_error = COALESCE(excluded.margin_of_error, acs_facts.margin_of_error)
+    WHERE acs_facts.value IS NOT COALESCE(excluded.value, acs_facts.value)
+       OR acs_facts.margin_of_error IS NOT COALESCE(excluded.margin_of_error, acs_facts.margin_of_error)
+'''
+
+# Values of many variables, counties and years in one statement. Every lookup is an
+# index search: variable_id through its unique index, then acs_facts' primary key
+# (var_key, geo_key, year), which holds value and margin_of_error itself (a covering index).
+VALUES_SQL = '''
+    SELECT v.variable_id, f.geo_key, f.year, f.value, f.margin_of_error
+    FROM acs_variable_keys v
+    JOIN acs_facts f ON f.var_key = v.var_key
+    WHERE v.variable_id IN ({variables})
+      AND f.geo_key IN ({geos})
+      AND f.year IN ({years})
+'''
+
+# PRAGMA user_version of each layout change
+PAIRED_MOE_VERSION = 1
+NORMALIZED_VERSION = 2
+
+# Natural key of the old acs_data table (see migrate_natural_key)
+NATURAL_KEY_INDEX = 'idx_data_natural_key'
+NATURAL_KEY_SQL = f'''
+    CREATE UNIQUE INDEX IF NOT EXISTS {NATURAL_KEY_INDEX} ON acs_data (variable_id, county_fips, year)
+'''
+
+
+def connect(db_path: str, timeout: float = 30, **kwargs) -> sqlite3.Connection:
+    """Open the data database in WAL mode with synchronous=NORMAL.
+
+    WAL lets readers (the web app, summaries) run during a load, and NORMAL
+    only syncs at checkpoints, which is still crash-safe in WAL mode.
+    """
+    conn = sqlite3.connect(db_path, timeout=timeout, **kwargs)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    return conn
+
+
+def data_type_for(var_id: str) -> str:
+    return 'estimate' if var_id.endswith('E') else 'margin_of_error' if var_id.endswith('M') else 'other'
+
+
+def estimate_id(var_id: str) -> str:
+    """Row key of a variable: B01001_001M is stored on the B01001_001E row."""
+    return var_id[:-1] + 'E' if data_type_for(var_id) == 'margin_of_error' else var_id
+
+
+def county_data_rows(county_data: Dict, counties: Dict[str, str], year) -> Iterator[Tuple]:
+    """Yield acs_data rows from {county_name: {var_id: value}}.
+
+    Each _nnnE estimate is paired with its _nnnM margin of error in one row
+    keyed by the estimate. A MOE whose estimate is not in county_data still
+    gets a row (value NULL), which the upsert merges into the stored estimate.
+    """
+    year = int(year)
+    for county_name, variables in county_data.items():
+        county_fips = counties[county_name]
+        for var_id, value in variables.items():
+            data_type = data_type_for(var_id)
+            if data_type == 'estimate':
+                moe = variables.get(var_id[:-1] + 'M')
+                yield (var_id, county_name, county_fips, year, value, moe, 'estimate')
+            elif data_type == 'margin_of_error':
+                if estimate_id(var_id) not in variables:
+                    yield (estimate_id(var_id), county_name, county_fips, year, None, value, 'estimate')
+            else:
+                yield (var_id, county_name, county_fips, year, value, None, data_type)
+
+
+def table_id_for(var_id: str) -> str:
+    return var_id.split('_', 1)[0]
+
+
+def insert_data_rows(cursor, rows: Iterable[Tuple]) -> int:
+    """Upsert acs_data-shaped rows into acs_facts; returns the number inserted or changed.
+
+    New variables and counties get their integer keys first, and acs_data_stats
+    is updated for every year, table and county in the batch, in the same transaction.
+    """
+    rows = list(rows)
+    if not rows:
+        return 0
+    variables = sorted({row[0] for row in rows})
+    cursor.executemany(INSERT_VARIABLE_KEY_SQL, ((var_id,) for var_id in variables))
+    cursor.executemany(INSERT_GEOGRAPHY_SQL, sorted({(row[2], row[1]) for row in rows}))
+
+    # Values not stored yet, per year, table and county
+    geos = sorted({row[2] for row in rows})
+    years = sorted({row[3] for row in rows})
+    cursor.execute(STORED_KEYS_SQL.format(variables=','.join('?' * len(variables)),
+                                          geos=','.join('?' * len(geos)), years=','.join('?' * len(years))),
+                   variables + geos + years)
+    stored = set(cursor.fetchall())
+    new_values = {}
+    for var_id, county_fips, year in {(row[0], row[2], row[3]) for row in rows}:
+        group = (year, table_id_for(var_id), county_fips)
+        new_values[group] = new_values.get(group, 0) + ((var_id, county_fips, year) not in stored)
+    # Only groups that gain values: the others keep their count and last_collected
+    stats = [group + (count,) for group, count in new_values.items() if count]
+
+    cursor.executemany(INSERT_DATA_SQL, ((row[0], row[2], row[3], row[4], row[5]) for row in rows))
+    written = cursor.rowcount
+    if stats:
+        cursor.executemany(UPDATE_STATS_SQL, stats)
+    return written
+
+
+def geo_keys_for(cursor, county_fips: List[str]) -> Dict[str, int]:
+    """{county_fips: geo_key} for the counties that have data."""
+    cursor.execute(f'''
+        SELECT county_fips, geo_key FROM acs_geographies WHERE county_fips IN ({','.join('?' * len(county_fips))})
+    ''', list(county_fips))
+    return dict(cursor.fetchall())
+
+
+def values_query(n_variables: int, n_geos: int, n_years: int) -> str:
+    return VALUES_SQL.format(variables=','.join('?' * n_variables), geos=','.join('?' * n_geos),
+                             years=','.join('?' * n_years))
+
+
+def fetch_series(conn: sqlite3.Connection, variable_ids: List[str], years: List[int],
+                 county_fips: List[str]) -> List[Tuple[str, str, int, object, object]]:
+    """(variable_id, county_fips, year, value, margin_of_error) for every stored combination, in one query.
+
+    Counties must already be resolved to FIPS (no name matching here). MOE ids
+    (_nnnM) are answered from their estimate's row, with the MOE as value.
+    Rows come back in request order: variable, then county, then year.
+    """
+    if not variable_ids or not years or not county_fips:
+        return []
+    cursor = conn.cursor()
+    geo_keys = geo_keys_for(cursor, county_fips)
+    if not geo_keys:
+        return []
+    row_ids = sorted({estimate_id(var_id) for var_id in variable_ids})
+    years = sorted({int(year) for year in years})
+    cursor.execute(values_query(len(row_ids), len(geo_keys), len(years)),
+                   row_ids + sorted(geo_keys.values()) + years)
+    rows = {(var_id, geo_key, year): (value, moe) for var_id, geo_key, year, value, moe in cursor.fetchall()}
+
+    results = []
+    for var_id in dict.fromkeys(variable_ids):
+        for fips in dict.fromkeys(county_fips):
+            for year in years:
+                key = (estimate_id(var_id), geo_keys.get(fips), year)
+                if key not in rows:
+                    continue
+                value, moe = rows[key]
+                if var_id != estimate_id(var_id):
+                    value, moe = moe, None
+                results.append((var_id, fips, year, value, moe))
+    return results
+
+
+def fetch_values(conn: sqlite3.Connection, variable_ids: List[str], years: List[int],
+                 county_fips: str) -> List[Tuple[str, int, object, object]]:
+    """(variable_id, year, value, margin_of_error) for one county; see fetch_series."""
+    return [(var_id, year, value, moe)
+            for var_id, _, year, value, moe in fetch_series(conn, variable_ids, years, [county_fips])]
+
+
+def create_data_indexes(conn: sqlite3.Connection):
+    for sql in DATA_INDEXES.values():
+        conn.execute(sql)
+    conn.commit()
+
+
+def init_data_schema(conn: sqlite3.Connection):
+    """Create the fact/dimension tables and the acs_data view, migrating an old acs_data table."""
+    cursor = conn.cursor()
+    for sql in SCHEMA_SQL:
+        cursor.execute(sql)
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'acs_data'")
+    legacy = cursor.fetchone() is not None
+    if legacy:
+        migrate_normalized(conn)
+    cursor.execute(DATA_VIEW_SQL)
+    for sql in DATA_INDEXES.values():
+        cursor.execute(sql)
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'acs_data_stats'")
+    new_stats = cursor.fetchone() is None
+    cursor.execute(STATS_SQL)
+    if new_stats:
+        rebuild_data_stats(conn)
+    cursor.execute(f'PRAGMA user_version = {NORMALIZED_VERSION}')
+    conn.commit()
+    if legacy:
+        # Give the dropped table's pages back to the filesystem
+        started = time.perf_counter()
+        conn.execute('VACUUM')
+        logger.info(f"Vacuumed database in {time.perf_counter() - started:.2f}s")
+
+
+def rebuild_data_stats(conn: sqlite3.Connection) -> int:
+    """Recompute acs_data_stats from a full scan of acs_facts; returns the values counted.
+
+    insert_data_rows keeps the table current, so this is only needed once for an
+    existing database (init_data_schema), after values were written some other
+    way, or on request (the collectors' --recompute).
+    Collection times of the existing values are not known, so last_collected is kept
+    where a group already has one.
+    """
+    started = time.perf_counter()
+    cursor = conn.cursor()
+    cursor.execute(f'''
+        CREATE TEMP TABLE recomputed_stats AS
+        SELECT f.year, {TABLE_ID_SQL.format(col='v.variable_id')} AS table_id, f.geo_key,
+               COUNT(*) AS values_count
+        FROM acs_facts f JOIN acs_variable_keys v ON v.var_key = f.var_key
+        GROUP BY 1, 2, 3
+    ''')
+    cursor.execute('''
+        CREATE TEMP TABLE previous_stats AS
+        SELECT year, table_id, geo_key, last_collected FROM acs_data_stats
+    ''')
+    cursor.execute('DELETE FROM acs_data_stats')
+    cursor.execute('''
+        INSERT INTO acs_data_stats (year, table_id, geo_key, values_count, last_collected)
+        SELECT r.year, r.table_id, r.geo_key, r.values_count, p.last_collected
+        FROM recomputed_stats r
+        LEFT JOIN previous_stats p ON p.year = r.year AND p.table_id = r.table_id AND p.geo_key = r.geo_key
+    ''')
+    cursor.execute('SELECT COALESCE(SUM(values_count), 0) FROM acs_data_stats')
+    counted = cursor.fetchone()[0]
+    cursor.execute('DROP TABLE temp.recomputed_stats')
+    cursor.execute('DROP TABLE temp.previous_stats')
+    conn.commit()
+    logger.info(f"Recomputed data statistics ({counted} values) in {time.perf_counter() - started:.2f}s")
+    return counted
+
+
+def data_stats(conn: sqlite3.Connection) -> Dict:
+    """Summary of the collected values from acs_data_stats (no scan of acs_facts).
+
+    Per year, "variables" adds up each table's best-covered county, since every
+    county is requested for the same variables.
+    """
+    cursor = conn.cursor()
+    cursor.execute('''
+        SELECT year, SUM(values_count), COUNT(DISTINCT table_id), SUM(variables), MAX(last_collected)
+        FROM (SELECT year, table_id, SUM(values_count) AS values_count, MAX(values_count) AS variables,
+                     MAX(last_collected) AS last_collected
+              FROM acs_data_stats GROUP BY year, table_id)
+        GROUP BY year ORDER BY year
+    ''')
+    years = {year: {'values': values, 'tables': tables, 'variables': variables, 'last_collected': last}
+             for year, values, tables, variables, last in cursor.fetchall()}
+    cursor.execute('''
+        SELECT g.county_name, g.county_fips, SUM(s.values_count), MAX(s.last_collected)
+        FROM acs_data_stats s JOIN acs_geographies g ON g.geo_key = s.geo_key
+        GROUP BY s.geo_key ORDER BY g.county_name
+    ''')
+    counties = {name: {'fips': fips, 'values': values, 'last_collected': last}
+                for name, fips, values, last in cursor.fetchall()}
+    cursor.execute('SELECT COUNT(DISTINCT table_id) FROM acs_data_stats')
+    tables = cursor.fetchone()[0]
+    return {
+        'total_values': sum(year['values'] for year in years.values()),
+        'tables': tables,
+        'years': years,
+        'counties': counties,
+        'last_collected': max((year['last_collected'] for year in years.values()
+                               if year['last_collected']), default=None)
+    }
+
+
+def migrate_normalized(conn: sqlite3.Connection) -> int:
+    """One-time copy of the old acs_data table into acs_facts; returns the rows copied.
+
+    The old table is deduplicated and its MOEs paired first, keys are assigned
+    in variable_id / county_fips order, and the table is dropped so the
+    compatibility view can take its name.
+    """
+    migrate_natural_key(conn)
+    migrate_paired_moe(conn)
+    started = time.perf_counter()
+    cursor = conn.cursor()
+    cursor.execute('''
+        INSERT OR IGNORE INTO acs_variable_keys (variable_id)
+        SELECT DISTINCT variable_id FROM acs_data WHERE variable_id IS NOT NULL ORDER BY variable_id
+    ''')
+    cursor.execute('''
+        INSERT OR IGNORE INTO acs_geographies (county_fips, county_name)
+        SELECT county_fips, MAX(county_name) FROM acs_data
+        WHERE county_fips IS NOT NULL GROUP BY county_fips ORDER BY county_fips
+    ''')
+    cursor.execute('''
+        INSERT OR REPLACE INTO acs_facts (var_key, geo_key, year, value, margin_of_error)
+        SELECT v.var_key, g.geo_key, d.year, d.value, d.margin_of_error
+        FROM acs_data d
+        JOIN acs_variable_keys v ON v.variable_id = d.variable_id
+        JOIN acs_geographies g ON g.county_fips = d.county_fips
+        WHERE d.year IS NOT NULL
+        ORDER BY v.var_key, g.geo_key, d.year
+    ''')
+    copied = cursor.rowcount
+    cursor.execute('DROP TABLE acs_data')
+    conn.commit()
+    logger.info(f"Moved {copied} acs_data rows to the normalized acs_facts table "
+                f"in {time.perf_counter() - started:.2f}s")
+    return copied
+
+
+def migrate_natural_key(conn: sqlite3.Connection) -> int:
+    """Old acs_data table: add the (variable_id, county_fips, year) key; returns duplicates removed.
+
+    Older databases appended a new row on every re-collection. The latest
+    row (highest id) of each key is kept, the unique index is created and the
+    remaining acs_data indexes are rebuilt.
+    """
+    cursor = conn.cursor()
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'index' AND name = ?", (NATURAL_KEY_INDEX,))
+    if cursor.fetchone():
+        return 0
+    started = time.perf_counter()
+    cursor.execute('''
+        DELETE FROM acs_data WHERE id NOT IN (
+            SELECT MAX(id) FROM acs_data GROUP BY variable_id, county_fips, year
+        )
+    ''')
+    removed = cursor.rowcount
+    cursor.execute(NATURAL_KEY_SQL)
+    cursor.execute('DROP INDEX IF EXISTS idx_data_variable')
+    cursor.execute('REINDEX acs_data')
+    conn.commit()
+    if removed:
+        logger.info(f"Removed {removed} duplicate acs_data rows and rebuilt indexes "
+                    f"in {time.perf_counter() - started:.2f}s")
+    return removed
+
+
+def migrate_paired_moe(conn: sqlite3.Connection) -> int:
+    """Old acs_data table: fold margin_of_error rows into their estimate rows; returns rows folded.
+
+    Needs the natural key (see migrate_natural_key) for the estimate lookups.
+    """
+    cursor = conn.cursor()
+    if cursor.execute('PRAGMA user_version').fetchone()[0] >= PAIRED_MOE_VERSION:
+        return 0
+    started = time.perf_counter()
+    cursor.execute('''
+        UPDATE acs_data SET margin_of_error = (
+            SELECT moe.value FROM acs_data AS moe
+            WHERE moe.variable_id = substr(acs_data.variable_id, 1, length(acs_data.variable_id) - 1) || 'M'
+              AND moe.county_fips = acs_data.county_fips AND moe.year = acs_data.year
+        )
+        WHERE data_type = 'estimate' AND margin_of_error IS NULL
+    ''')
+    # MOEs without a stored estimate keep their value on an estimate row of their own
+    cursor.execute('''
+        INSERT OR IGNORE INTO acs_data
+        (variable_id, county_name, county_fips, year, value, margin_of_error, data_type, collected_at)
+        SELECT substr(variable_id, 1, length(variable_id) - 1) || 'E', county_name, county_fips, year,
+               NULL, value, 'estimate', collected_at
+        FROM acs_data WHERE data_type = 'margin_of_error'
+    ''')
+    cursor.execute("DELETE FROM acs_data WHERE data_type = 'margin_of_error'")
+    folded = cursor.rowcount
+    cursor.execute(f'PRAGMA user_version = {PAIRED_MOE_VERSION}')
+    conn.commit()
+    if folded:
+        logger.info(f"Folded {folded} margin-of-error rows into their estimates "
+                    f"in {time.perf_counter() - started:.2f}s")
+    return folded
+
+
+@contextmanager
+def deferred_indexes(db_path: str):
+    """Drop the acs_facts secondary indexes for an initial load (empty table) and rebuild them afterwards.
+
+    Building an index once over the loaded rows is much cheaper than
+    maintaining it row by row. If the load crashes, the collectors'
+    init_database recreates the indexes on the next start.
+    """
+    conn = connect(db_path)
+    initial_load = conn.execute('SELECT 1 FROM acs_facts LIMIT 1').fetchone() is None
+    if initial_load:
+        for name in DATA_INDEXES:
+            conn.execute(f'DROP INDEX IF EXISTS {name}')
+        conn.commit()
+        logger.info("Initial load: acs_facts indexes deferred until the load finishes")
+    conn.close()
+    try:
+        yield initial_load
+    finally:
+        if initial_load:
+            started = time.perf_counter()
+            conn = connect(db_path)
+            create_data_indexes(conn)
+            conn.close()
+            logger.info(f"Rebuilt acs_facts indexes in {time.perf_counter() - started:.2f}s")
@@ -0,0 +1,377 @@
+#!/usr/bin/env python3
+"""
+Async ACS Collection Engine
+Runs many Census API requests in flight at once, throttled by a token bucket per
+API key, and hands parsed rows to a single writer task that batches them into SQLite.
+"""
+
+import asyncio
+import logging
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+import requests
+
+from acs_store import connect, county_data_rows, insert_data_rows
+from quota_scheduler import QuotaExhausted, QuotaScheduler
+from run_plan import is_invalid_request, record_unit
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """Token bucket limiter: `rate` requests per second with bursts up to `capacity`."""
+
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        """Wait until a token is available and take it."""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+def build_table_units(year, table_id: str, variables: List[Dict], batch_size: int = 50,
+                      dataset: str = None) -> List[Dict]:
+    """Split a table's estimate/MOE variables into one collection unit per API request.
+
+    dataset routes the unit to a non-default endpoint (e.g. acs/acs5/subject).
+    """
+    var_list = [var['id'] for var in variables if var['type'] in ['estimate', 'margin_of_error']]
+    units = []
+    for i in range(0, len(var_list), batch_size):
+        unit = {'year': str(year), 'table_id': table_id, 'unit_index': i // batch_size,
+                'variables': var_list[i:i + batch_size]}
+        if dataset:
+            unit['dataset'] = dataset
+        units.append(unit)
+    return units
+
+
+def pack_units(units: List[Dict], batch_size: int = 50) -> List[List[Dict]]:
+    """Pack units from different tables into shared requests of up to batch_size variables.
+
+    Units are grouped by year and dataset (one request can only hit one endpoint)
+    and packed first-fit decreasing, so the small remainders of many tables share
+    a request instead of each spending one.
+    """
+    groups = {}
+    for unit in units:
+        groups.setdefault((str(unit['year']), unit.get('dataset')), []).append(unit)
+    packs = []
+    for group in groups.values():
+        bins = []  # [free slots, units]
+        for unit in sorted(group, key=lambda u: len(u['variables']), reverse=True):
+            size = len(unit['variables'])
+            for request in bins:
+                if request[0] >= size:
+                    request[0] -= size
+                    request[1].append(unit)
+                    break
+            else:
+                bins.append([batch_size - size, [unit]])
+        packs.extend(request[1] for request in bins)
+    return packs
+
+
+def unpack_county_data(pack: List[Dict], county_data: Dict) -> List[Tuple[Dict, Dict]]:
+    """Split {county: {var: value}} from a packed request back into (unit, county_data) pairs."""
+    results = []
+    for unit in pack:
+        unit_data = {}
+        for county, values in county_data.items():
+            unit_values = {var: values[var] for var in unit['variables'] if var in values}
+            if unit_values:
+                unit_data[county] = unit_values
+        results.append((unit, unit_data))
+    return results
+
+
+class AsyncCollectionEngine:
+    def __init__(self, db_path: str, api_keys: List[str], counties: Dict[str, str],
+                 state_fips: str = "13", base_url: str = "https://api.census.gov/data",
+                 dataset: str = "acs/acs5", concurrency: int = 8,
+                 requests_per_second: float = 5.0, burst: float = None,
+                 write_batch_rows: int = 5000, timeout: int = 30,
+                 scheduler: QuotaScheduler = None, max_attempts: int = 3,
+                 pack_requests: bool = True, batch_size: int = 50):
+        self.db_path = db_path
+        self.api_keys = api_keys
+        # Picks the key with the most remaining daily budget for every request
+        self.scheduler = scheduler or QuotaScheduler(db_path, api_keys)
+        self.max_attempts = max_attempts
+        self.counties = counties
+        self.fips_to_county = {fips: name for name, fips in counties.items()}
+        self.state_fips = state_fips
+        self.base_url = base_url
+        self.dataset = dataset
+        self.concurrency = max(1, concurrency)
+        self.requests_per_second = requests_per_second
+        self.burst = burst
+        self.write_batch_rows = write_batch_rows
+        self.timeout = timeout
+        # Share requests between tables (see pack_units)
+        self.pack_requests = pack_requests
+        self.batch_size = batch_size
+
+        self.requests_made = 0
+        self._local = threading.local()
+
+    # ------------------------------------------------------------------ HTTP
+
+    def _session(self) -> requests.Session:
+        session = getattr(self._local, 'session', None)
+        if session is None:
+            session = self._local.session = requests.Session()
+        return session
+
+    def _get(self, url: str, params: Dict = None):
+        response = self._session().get(url, params=params, timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    async def _fetch(self, url: str, params: Dict = None, with_key: bool = True):
+        """Throttled GET on the HTTP thread pool.
+
+        Keyed requests go to the key with the most remaining budget; a 429
+        puts that key on cooldown and the request is retried on another key.
+        """
+        loop = asyncio.get_running_loop()
+        for attempt in range(1, self.max_attempts + 1):
+            request_params = dict(params or {})
+            # The scheduler may touch SQLite (lease reservation), so keep it off the event loop
+            key = await loop.run_in_executor(None, self.scheduler.acquire) if with_key else None
+            await self._buckets.get(key, self._buckets[None]).acquire()
+            if key:
+                request_params['key'] = key
+            self.requests_made += 1
+            try:
+                return await loop.run_in_executor(self._http_pool, self._get, url, request_params)
+            except requests.exceptions.HTTPError as e:
+                status = e.response.status_code if e.response is not None else None
+                if status != 429 or not key or attempt == self.max_attempts:
+                    raise
+                await loop.run_in_executor(None, self.scheduler.report_rate_limited, key)
+
+    def _setup(self):
+        self._buckets = {key: TokenBucket(self.requests_per_second, self.burst)
+                         for key in list(self.api_keys) + [None]}
+        self._http_pool = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="acs-fetch")
+
+    # ------------------------------------------------------------ collection
+
+    def parse_county_data(self, data: List, var_list: List[str]) -> Dict:
+        """Turn an API response into {county_name: {var_id: value}}."""
+        if not data or len(data) < 2:
+            return {}
+        headers = data[0]
+        county_data = {}
+        for row in data[1:]:
+            row_dict = dict(zip(headers, row))
+            county_name = self.fips_to_county.get(row_dict.get('county', ''))
+            if not county_name:
+                continue
+            values = county_data.setdefault(county_name, {})
+            for var_id in var_list:
+                value = row_dict.get(var_id)
+                if value is None or value == '':
+                    continue
+                try:
+                    values[var_id] = float(value)
+                except (ValueError, TypeError):
+                    values[var_id] = value
+        return county_data
+
+    async def _put_result(self, results: asyncio.Queue, stats: Dict, item):
+        """Hand a finished unit to the writer, recording backpressure on the bounded queue."""
+        started = time.perf_counter()
+        await results.put(item)
+        stats['write_queue_put_wait_seconds'] += time.perf_counter() - started
+        stats['write_queue_max_depth'] = max(stats['write_queue_max_depth'], results.qsize())
+
+    async def _collect_pack(self, pack: List[Dict], results: asyncio.Queue, stats: Dict):
+        """Fetch one (possibly packed) request and hand each unit's rows to the writer."""
+        unit = pack[0]
+        variables = [var for u in pack for var in u['variables']]
+        url = f"{self.base_url}/{unit['year']}/{unit.get('dataset', self.dataset)}"
+        params = {
+            'get': ','.join(variables),
+            'for': f"county:{','.join(self.counties.values())}",
+            'in': f'state:{self.state_fips}'
+        }
+        stats['requests'] += 1
+        try:
+            data = await self._fetch(url, params)
+        except QuotaExhausted as e:
+            # Leave this and every unstarted pack pending for --resume
+            if not self._stop.is_set():
+                logger.error(f"Stopping collection: {e}")
+            self._stop.set()
+            stats['quota_exhausted'] = True
+            return
+        except Exception as e:
+            if len(pack) > 1 and is_invalid_request(e):
+                # One bad variable rejects the whole request; retry each table batch on its own
+                logger.warning(f"Packed request for {len(pack)} units rejected ({e}); retrying separately")
+                for u in pack:
+                    if not self._stop.is_set():
+                        await self._collect_pack([u], results, stats)
+                return
+            # Timeouts, 5xx and exhausted 429 retries fail every unit of the pack (retried on --resume)
+            # instead of multiplying requests while the API is unhealthy
+            logger.error(f"Failed to collect {len(pack)} unit(s) from {unit['table_id']} ({unit['year']}): {e}")
+            if len(pack) == 1:
+                # Rejected outright (unknown variable/endpoint): never request it again
+                unit['invalid'] = is_invalid_request(e)
+            for u in pack:
+                await self._put_result(results, stats, (u, [], str(e)))
+            return
+
+        try:
+            county_data = self.parse_county_data(data, variables)
+            unit_results = [(u, list(county_data_rows(unit_data, self.counties, u['year'])), None)
+                            for u, unit_data in unpack_county_data(pack, county_data)]
+        except Exception as e:
+            logger.error(f"Failed to parse response for {unit['table_id']} ({unit['year']}): {e}")
+            unit_results = [(u, [], str(e)) for u in pack]
+        for item in unit_results:
+            await self._put_result(results, stats, item)
+
+    async def _worker(self, packs: asyncio.Queue, results: asyncio.Queue, stats: Dict):
+        while True:
+            pack = await packs.get()
+            if pack is None:
+                packs.task_done()
+                return
+            try:
+                # After quota exhaustion or a writer failure the remaining packs are skipped (left pending for --resume)
+                if not self._stop.is_set():
+                    await self._collect_pack(pack, results, stats)
+            finally:
+                packs.task_done()
+
+    def _write_batch(self, conn: sqlite3.Connection, batch: List[Tuple[Dict, List[Tuple], str]]) -> Tuple[int, int]:
+        """Write one batch of finished units (data and collection_log status) in a single transaction.
+
+        Returns (rows written, units recorded as Success).
+        """
+        cursor = conn.cursor()
+        rows_written = 0
+        successful = 0
+        for unit, rows, error in batch:
+            if rows:
+                rows_written += insert_data_rows(cursor, rows)
+            # Same transaction as the data, so a planned unit is never half-recorded
+            if record_unit(cursor, unit, len(rows), error) == 'Success':
+                successful += 1
+        conn.commit()
+        return rows_written, successful
+
+    async def _writer(self, results: asyncio.Queue, stats: Dict):
+        """Single writer: drains finished units and commits them in large batches until the None sentinel.
+
+        If a write fails, the workers are stopped and the queue is drained to
+        the sentinel (so no worker stays blocked on a full queue) before the
+        error is re-raised.
+        """
+        loop = asyncio.get_running_loop()
+        write_pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix="acs-writer")
+        conn = await loop.run_in_executor(write_pool, lambda: connect(self.db_path, check_same_thread=False))
+        batch = []
+        batch_rows = 0
+        try:
+            while True:
+                item = await results.get()
+                if item is not None:
+                    batch.append(item)
+                    batch_rows += len(item[1])
+                # Flush on size, or when the queue momentarily runs dry
+                if batch and (item is None or batch_rows >= self.write_batch_rows or results.empty()):
+                    started = time.perf_counter()
+                    rows_written, successful = await loop.run_in_executor(write_pool, self._write_batch, conn, batch)
+                    stats['rows_written'] += rows_written
+                    stats['successful_units'] += successful
+                    stats['failed_units'] += len(batch) - successful
+                    stats['write_seconds'] += time.perf_counter() - started
+                    stats['transactions'] += 1
+                    batch = []
+                    batch_rows = 0
+                if item is None:
+                    return
+        except Exception as e:
+            logger.error(f"Writer failed: {e}")
+            self._stop.set()
+            while await results.get() is not None:
+                pass
+            raise
+        finally:
+            await loop.run_in_executor(write_pool, conn.close)
+            write_pool.shutdown(wait=True)
+
+    async def _run(self, units: List[Dict]) -> Dict:
+        self._setup()
+        stats = {'units': len(units), 'requests': 0, 'successful_units': 0, 'failed_units': 0, 'quota_exhausted': False,
+                 'rows_written': 0, 'transactions': 0, 'write_seconds': 0.0,
+                 'write_queue_max_depth': 0, 'write_queue_put_wait_seconds': 0.0}
+        packs = pack_units(units, self.batch_size) if self.pack_requests else [[unit] for unit in units]
+        pack_queue = asyncio.Queue()
+        result_queue = asyncio.Queue(maxsize=self.concurrency * 4)
+        for pack in packs:
+            pack_queue.put_nowait(pack)
+        for _ in range(self.concurrency):
+            pack_queue.put_nowait(None)
+
+        self._stop = asyncio.Event()
+        try:
+            writer = asyncio.create_task(self._writer(result_queue, stats))
+            workers = [asyncio.create_task(self._worker(pack_queue, result_queue, stats))
+                       for _ in range(self.concurrency)]
+            await asyncio.gather(*workers)
+            await result_queue.put(None)
+            await writer
+        finally:
+            self._http_pool.shutdown(wait=False)
+        return stats
+
+    def run(self, units: List[Dict]) -> Dict:
+        """Collect all units and return run statistics."""
+        logger.info(f"Async collection: {len(units)} units, {self.concurrency} in flight, "
+                    f"{self.requests_per_second}/s per key across {max(1, len(self.api_keys))} key(s), "
+                    f"{self.scheduler.remaining_budget()} requests of quota left today")
+        start_time = datetime.now()
+        started = time.perf_counter()
+        try:
+            stats = asyncio.run(self._run(units))
+        finally:
+            # Hand back requests reserved for this run but not made
+            self.scheduler.release()
+        elapsed = time.perf_counter() - started
+        stats['elapsed_seconds'] = round(elapsed, 3)
+        stats['requests_per_second'] = round(stats['requests'] / elapsed, 2) if elapsed else 0.0
+        stats['rows_per_second'] = round(stats['rows_written'] / elapsed, 1) if elapsed else 0.0
+        logger.info(f"Async collection finished in {datetime.now() - start_time}: "
+                    f"{stats['units']} units in {stats['requests']} requests, "
+                    f"{stats['successful_units']} ok, {stats['failed_units']} failed, "
+                    f"{stats['rows_written']} rows in {stats['transactions']} transactions "
+                    f"({stats['requests_per_second']} req/s, {stats['rows_per_second']} rows/s)")
+        for key in ('write_seconds', 'write_queue_put_wait_seconds'):
+            stats[key] = round(stats[key], 3)
+        logger.info(f"Writer busy {stats['write_seconds']}s; write queue max depth "
+                    f"{stats['write_queue_max_depth']}/{self.concurrency * 4}, "
+                    f"fetchers blocked {stats['write_queue_put_wait_seconds']}s")
+        return stats
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Benchmark: async collection engine throughput vs. concurrency.
+Runs the same set of data requests against the local fake Census API at several
+concurrency levels and reports requests/sec. The per-key rate limit is set high
+so the numbers show the effect of overlapping network latency.
+
+    python benchmarks/bench_async_collector.py --latency 0.05 --requests 200
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from async_collector import AsyncCollectionEngine  # noqa: E402
+from fake_census_server import start_fake_server  # noqa: E402
+from comprehensive_acs_collector import ComprehensiveACSCollector  # noqa: E402
+
+COUNTIES = {"Chatham": "051", "Liberty": "179", "Effingham": "103", "Bryan": "029"}
+
+
+def make_units(metadata, n_requests: int):
+    """One unit per table batch, cycling through the fake tables."""
+    by_table = {}
+    for var_id, info in metadata["variables"].items():
+        if info["group"] != "N/A":
+            by_table.setdefault(info["group"], []).append(var_id)
+    units = []
+    tables = sorted(by_table)
+    i = 0
+    while len(units) < n_requests:
+        table_id = tables[i % len(tables)]
+        units.append({"year": "2023", "table_id": table_id, "variables": sorted(by_table[table_id])[:50]})
+        i += 1
+    return units
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.05, help="Fake server latency per request (seconds)")
+    parser.add_argument("--requests", type=int, default=200, help="Data requests per run")
+    parser.add_argument("--levels", default="1,2,4,8,16,32", help="Concurrency levels to test")
+    args = parser.parse_args()
+
+    server, base_url = start_fake_server(latency=args.latency)
+    units = make_units(server.metadata, args.requests)
+
+    print(f"{'concurrency':>11} {'seconds':>8} {'req/s':>8} {'rows':>8} {'speedup':>8}")
+    baseline = None
+    for level in [int(x) for x in args.levels.split(",")]:
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = os.path.join(tmp, "bench.db")
+            ComprehensiveACSCollector("bench-key", db_path)  # creates the schema
+            engine = AsyncCollectionEngine(db_path, ["bench-key"], COUNTIES, base_url=base_url,
+                                           concurrency=level, requests_per_second=10000, pack_requests=False)
+            stats = engine.run(units)
+        rate = stats["requests_per_second"]
+        baseline = baseline or rate
+        print(f"{level:>11} {stats['elapsed_seconds']:>8.2f} {rate:>8.1f} {stats['rows_written']:>8} {rate / baseline:>7.1f}x")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Benchmark: bulk loading collected values (acs_facts).
+Loads synthetic county rows into a fresh collector database, committing every
+--batch rows like the collection writers, and reports rows/s for:
+
+  per-row execute, rollback journal, synchronous=FULL (the old store_county_data)
+  executemany, rollback journal, synchronous=FULL
+  executemany, WAL, synchronous=NORMAL (acs_store.connect)
+  executemany, WAL, synchronous=NORMAL, indexes deferred (acs_store.deferred_indexes)
+
+    python benchmarks/bench_bulk_insert.py --rows 1000000
+"""
+
+import argparse
+import itertools
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from acs_store import connect, county_data_rows, deferred_indexes, insert_data_rows  # noqa: E402
+from comprehensive_acs_collector import ComprehensiveACSCollector  # noqa: E402
+
+
+def synthetic_rows(counties, n_rows):
+    """acs_data rows for made-up tables, 40 variables (E/M pairs) per table."""
+    def tables():
+        for table in itertools.count():
+            county_data = {}
+            for county_index, county_name in enumerate(counties):
+                county_data[county_name] = {}
+                for line in range(1, 21):
+                    county_data[county_name][f"B{table:05d}_{line:03d}E"] = float(table * 1000 + line + county_index)
+                    county_data[county_name][f"B{table:05d}_{line:03d}M"] = float(line)
+            yield from county_data_rows(county_data, counties, 2023)
+    return itertools.islice(tables(), n_rows)
+
+
+def chunks(rows, size):
+    rows = iter(rows)
+    while True:
+        chunk = list(itertools.islice(rows, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def load_per_row(conn, rows, batch):
+    cursor = conn.cursor()
+    for chunk in chunks(rows, batch):
+        for row in chunk:
+            insert_data_rows(cursor, [row])
+        conn.commit()
+
+
+def load_executemany(conn, rows, batch):
+    cursor = conn.cursor()
+    for chunk in chunks(rows, batch):
+        insert_data_rows(cursor, chunk)
+        conn.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=1_000_000, help="Rows to load per approach")
+    parser.add_argument("--batch", type=int, default=5000, help="Rows per transaction")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Generated up front so only the load itself is timed
+        counties = ComprehensiveACSCollector("bench-key", os.path.join(tmp, "counties.db")).counties
+        rows = list(synthetic_rows(counties, args.rows))
+        approaches = (
+            ("per-row execute, FULL", False, False, load_per_row),
+            ("executemany, FULL", False, False, load_executemany),
+            ("executemany, WAL/NORMAL", True, False, load_executemany),
+            ("executemany, WAL, deferred idx", True, True, load_executemany),
+        )
+        print(f"{'approach':<32} {'seconds':>8} {'rows/s':>10} {'rows':>9}")
+        for index, (name, wal, defer, load) in enumerate(approaches):
+            db_path = os.path.join(tmp, f"bench_{index}.db")
+            ComprehensiveACSCollector("bench-key", db_path)
+
+            started = time.perf_counter()
+            if defer:
+                # Timed including the index rebuild at the end
+                with deferred_indexes(db_path):
+                    conn = connect(db_path)
+                    load(conn, rows, args.batch)
+                    conn.close()
+            else:
+                conn = connect(db_path) if wal else sqlite3.connect(db_path, timeout=30)
+                if not wal:
+                    conn.execute("PRAGMA journal_mode=DELETE")
+                    conn.execute("PRAGMA synchronous=FULL")
+                load(conn, rows, args.batch)
+                conn.close()
+            elapsed = time.perf_counter() - started
+
+            conn = sqlite3.connect(db_path)
+            loaded = conn.execute("SELECT COUNT(*) FROM acs_data").fetchone()[0]
+            indexes = conn.execute("SELECT COUNT(*) FROM sqlite_master WHERE type = 'index' "
+                                   "AND tbl_name = 'acs_facts'").fetchone()[0]
+            conn.close()
+            print(f"{name:<32} {elapsed:>8.2f} {loaded / elapsed:>10.0f} {loaded:>9}  ({indexes} indexes)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+"""
+Benchmark: inline fetch/parse/store loop vs. the staged collection pipeline.
+The inline loop is what the sequential collectors used to do (request, parse,
+then open a connection and commit per table). The pipeline overlaps the
+network with parsing and a single writer committing large transactions, and
+reports queue backpressure.
+
+    python benchmarks/bench_collection_pipeline.py --tables 150 --latency 0.1 --fetch-workers 1
+"""
+
+import argparse
+import logging
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from async_collector import build_table_units, pack_units, unpack_county_data  # noqa: E402
+from census_metadata import group_variables  # noqa: E402
+from collection_pipeline import CollectionPipeline  # noqa: E402
+from comprehensive_acs_collector import ComprehensiveACSCollector  # noqa: E402
+from fake_census_server import start_fake_server  # noqa: E402
+
+
+def make_collector(tmp, base_url):
+    collector = ComprehensiveACSCollector("bench-key", os.path.join(tmp, "bench.db"))
+    collector.base_url = base_url
+    collector.request_delay = 0
+    collector.scheduler.daily_limit = 10 ** 6
+    return collector
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tables", type=int, default=300, help="Tables in the fake metadata")
+    parser.add_argument("--latency", type=float, default=0.02, help="Fake server latency per request (seconds)")
+    parser.add_argument("--fetch-workers", type=int, default=1, help="Pipeline fetch threads")
+    args = parser.parse_args()
+    logging.getLogger().setLevel(logging.WARNING)
+
+    server, base_url = start_fake_server(latency=args.latency, n_tables=args.tables)
+    tables = group_variables(server.metadata)
+    units = [unit for table_id, variables in tables.items() for unit in build_table_units(2023, table_id, variables)]
+
+    print(f"{'mode':<10} {'seconds':>8} {'rows':>8} {'rows/s':>9} {'commits':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        collector = make_collector(tmp, base_url)
+        started = time.perf_counter()
+        commits = 0
+        for pack in pack_units([dict(unit) for unit in units]):
+            county_data = collector.parse_pack(pack, collector.fetch_pack(pack))
+            for unit, unit_data in unpack_county_data(pack, county_data):
+                collector.store_county_data(unit['table_id'], unit_data, unit)
+                commits += 1
+        elapsed = time.perf_counter() - started
+        rows = collector_rows(collector)
+        print(f"{'inline':<10} {elapsed:>8.2f} {rows:>8} {rows / elapsed:>9.0f} {commits:>8}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        collector = make_collector(tmp, base_url)
+        pipeline = CollectionPipeline(collector.db_path, collector.counties, collector.fetch_pack, collector.parse_pack,
+                                      fetch_workers=args.fetch_workers)
+        stats = pipeline.run(pack_units([dict(unit) for unit in units]))
+        print(f"{'pipeline':<10} {stats['elapsed_seconds']:>8.2f} {stats['rows_written']:>8} "
+              f"{stats['rows_per_second']:>9.0f} {stats['transactions']:>8}")
+        print(f"stage busy: fetch {stats['fetch_seconds']}s, parse {stats['parse_seconds']}s, "
+              f"write {stats['write_seconds']}s")
+        for name, metrics in stats["queues"].items():
+            print(f"queue {name}: {metrics}")
+
+    server.shutdown()
+
+
+def collector_rows(collector) -> int:
+    conn = sqlite3.connect(collector.db_path)
+    count = conn.execute("SELECT COUNT(*) FROM acs_data").fetchone()[0]
+    conn.close()
+    return count
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Benchmark: series lookups from the published SQLite snapshot vs its
+memory-mapped columnar export (acs_columnar.ColumnarStore).
+The SQLite side opens a connection per lookup, as the server does per request.
+Both sides are checked to return identical rows. Needs NumPy.
+
+    python benchmarks/bench_columnar_store.py --variables 20000
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from acs_columnar import ColumnarStore, columnar_dir_for, np  # noqa: E402
+from acs_snapshots import current_snapshot, open_snapshot, publish_snapshot  # noqa: E402
+from acs_store import fetch_series  # noqa: E402
+from check_query_plans import COUNTIES, YEARS, build  # noqa: E402
+
+
+def median_ms(lookup, runs):
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        lookup()
+        timings.append((time.perf_counter() - started) * 1000)
+    return sorted(timings)[len(timings) // 2]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--variables", type=int, default=20000, help="Estimates per year (synthetic)")
+    parser.add_argument("--runs", type=int, default=50, help="Lookups timed per size")
+    args = parser.parse_args()
+    if np is None:
+        sys.exit("NumPy is not installed")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        build(os.path.join(tmp, "data.db"), args.variables).close()
+        snapshot_dir = os.path.join(tmp, "snapshots")
+        publish_snapshot(os.path.join(tmp, "data.db"), snapshot_dir)
+        snapshot = current_snapshot(snapshot_dir)
+        store = ColumnarStore(columnar_dir_for(snapshot))
+
+        conn = open_snapshot(snapshot)
+        variable_ids = [row[0] for row in conn.execute("SELECT variable_id FROM acs_variable_keys")]
+        conn.close()
+        counties = list(COUNTIES.values())
+        rng = random.Random(0)
+
+        def sqlite_lookup(variables):
+            conn = open_snapshot(snapshot)
+            rows = fetch_series(conn, variables, YEARS, counties)
+            conn.close()
+            return rows
+
+        print(f"{'variables':>9} {'values':>7} {'sqlite ms':>10} {'columnar ms':>12}")
+        for size in (1, 10, 100, 500):
+            variables = rng.sample(variable_ids, size)
+            rows = sqlite_lookup(variables)
+            assert rows == store.fetch_series(variables, YEARS, counties)
+            sqlite_ms = median_ms(lambda: sqlite_lookup(variables), args.runs)
+            columnar_ms = median_ms(lambda: store.fetch_series(variables, YEARS, counties), args.runs)
+            print(f"{size:>9} {len(rows):>7} {sqlite_ms:>10.3f} {columnar_ms:>12.3f}")
+
+
+if __name__ == "__main__":
+    main()
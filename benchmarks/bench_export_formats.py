@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+"""
+Benchmark: size and load time of the collected values as CSV, Parquet and
+Arrow IPC (acs_export). Loads are what an analysis session does first:
+
+  SELECT * FROM acs_data into Python tuples (the current approach)
+  csv.reader over the CSV export, and pyarrow.csv.read_csv
+  pyarrow.dataset over the partitioned Parquet / Arrow exports
+
+Needs pyarrow.
+
+    python benchmarks/bench_export_formats.py --variables 20000
+"""
+
+import argparse
+import csv
+import glob
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from acs_export import export_dataset, pa  # noqa: E402
+from check_query_plans import build  # noqa: E402
+
+
+def directory_bytes(path):
+    return sum(os.path.getsize(name) for name in glob.glob(os.path.join(path, "**", "*"), recursive=True)
+               if os.path.isfile(name))
+
+
+def timed(load):
+    started = time.perf_counter()
+    rows = load()
+    return time.perf_counter() - started, rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--variables", type=int, default=20000, help="Estimates per year (synthetic)")
+    parser.add_argument("--chunk-rows", type=int, default=500_000, help="Rows per export chunk")
+    args = parser.parse_args()
+    if pa is None:
+        sys.exit("pyarrow is not installed")
+    import pyarrow.csv
+    import pyarrow.dataset
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "data.db")
+        build(db_path, args.variables).close()
+
+        csv_path = os.path.join(tmp, "acs_data.csv")
+        started = time.perf_counter()
+        conn = sqlite3.connect(db_path)
+        cursor = conn.execute("SELECT year, variable_id, county_fips, county_name, value, margin_of_error "
+                              "FROM acs_data")
+        with open(csv_path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["year", "variable_id", "county_fips", "county_name", "value", "margin_of_error"])
+            while True:
+                rows = cursor.fetchmany(args.chunk_rows)
+                if not rows:
+                    break
+                writer.writerows(rows)
+        conn.close()
+        csv_export = time.perf_counter() - started
+
+        exports = {}
+        for file_format in ("parquet", "arrow"):
+            out_dir = os.path.join(tmp, file_format)
+            exports[file_format] = (out_dir, export_dataset(db_path, out_dir, file_format, args.chunk_rows))
+
+        def select_all():
+            conn = sqlite3.connect(db_path)
+            rows = conn.execute("SELECT * FROM acs_data").fetchall()
+            conn.close()
+            return len(rows)
+
+        def csv_reader():
+            with open(csv_path, newline="") as f:
+                return len(list(csv.reader(f))) - 1
+
+        def dataset(file_format):
+            out_dir = exports[file_format][0]
+            return pyarrow.dataset.dataset(out_dir, format="parquet" if file_format == "parquet" else "arrow",
+                                           partitioning="hive").to_table().num_rows
+
+        # Arrow IPC streams are read one file at a time (the dataset reader wants the file format)
+        def arrow_streams():
+            files = glob.glob(os.path.join(exports["arrow"][0], "**", "*.arrows"), recursive=True)
+            return sum(pa.ipc.open_stream(name).read_all().num_rows for name in files)
+
+        loads = (
+            ("SELECT * FROM acs_data (tuples)", os.path.getsize(db_path), select_all),
+            ("CSV, csv.reader", os.path.getsize(csv_path), csv_reader),
+            ("CSV, pyarrow.csv", os.path.getsize(csv_path),
+             lambda: pyarrow.csv.read_csv(csv_path).num_rows),
+            ("Parquet (zstd), dataset", directory_bytes(exports["parquet"][0]), lambda: dataset("parquet")),
+            ("Arrow IPC streams", directory_bytes(exports["arrow"][0]), arrow_streams),
+        )
+        print(f"CSV export {csv_export:.2f}s; "
+              + "; ".join(f"{name} export {stats['seconds']:.2f}s" for name, (_, stats) in exports.items()))
+        print(f"{'load':<34} {'MB':>8} {'seconds':>8} {'rows':>10}")
+        for name, size, load in loads:
+            seconds, rows = timed(load)
+            print(f"{name:<34} {size / 1e6:>8.1f} {seconds:>8.3f} {rows:>10}")
+
+
+if __name__ == "__main__":
+    main()
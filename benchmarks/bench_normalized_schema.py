@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Benchmark: database size and lookup latency of the acs_data layouts.
+Compares the original acs_data table (one text row per estimate and per MOE,
+single-column indexes), the same table after the natural-key and paired-MOE
+migrations, and the normalized acs_facts layout behind the acs_data view.
+
+By default a synthetic database in the original layout is generated; pass
+--db to measure a copy of an existing comprehensive_acs_data.db instead (the
+file itself is never modified).
+
+    python benchmarks/bench_normalized_schema.py --variables 20000 --years 7
+    python benchmarks/bench_normalized_schema.py --db comprehensive_acs_data.db
+"""
+
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from acs_store import init_data_schema, migrate_natural_key, migrate_paired_moe  # noqa: E402
+
+COUNTIES = {"Chatham": "051", "Liberty": "179", "Bryan": "029", "Effingham": "103"}
+
+# The server's get_actual_data_values query
+LOOKUP_SQL = '''
+    SELECT variable_id, value, margin_of_error, county_name
+    FROM acs_data
+    WHERE variable_id IN ({placeholders})
+    AND year = ?
+    AND county_name LIKE ?
+'''
+
+
+def build_original(db_path, n_variables, years):
+    """acs_data as the collectors originally wrote it."""
+    conn = sqlite3.connect(db_path)
+    conn.execute('''
+        CREATE TABLE acs_data (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            variable_id TEXT,
+            county_name TEXT,
+            county_fips TEXT,
+            year INTEGER,
+            value REAL,
+            margin_of_error REAL,
+            data_type TEXT,
+            collected_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    rng = random.Random(0)
+
+    def rows():
+        for year in years:
+            for index in range(n_variables):
+                table, line = divmod(index, 40)
+                base = f"B{table:05d}_{line + 1:03d}"
+                for county_name, county_fips in COUNTIES.items():
+                    yield (base + "E", county_name, county_fips, year, float(rng.randint(0, 100000)), "estimate")
+                    yield (base + "M", county_name, county_fips, year, float(rng.randint(0, 5000)), "margin_of_error")
+
+    conn.executemany('''
+        INSERT INTO acs_data (variable_id, county_name, county_fips, year, value, data_type)
+        VALUES (?, ?, ?, ?, ?, ?)
+    ''', rows())
+    conn.execute('CREATE INDEX idx_data_variable ON acs_data (variable_id)')
+    conn.execute('CREATE INDEX idx_data_county ON acs_data (county_name)')
+    conn.execute('CREATE INDEX idx_data_year ON acs_data (year)')
+    conn.commit()
+    conn.close()
+
+
+def database_size(db_path):
+    conn = sqlite3.connect(db_path)
+    rows = conn.execute("SELECT COUNT(*) FROM acs_data").fetchone()[0]
+    conn.close()
+    return os.path.getsize(db_path), rows
+
+
+def lookup_latency(db_path, variable_ids, years, runs, per_query):
+    """Median milliseconds of the get_actual_data_values query for per_query random estimates."""
+    conn = sqlite3.connect(db_path)
+    rng = random.Random(1)
+    sql = LOOKUP_SQL.format(placeholders=','.join('?' * per_query))
+    timings = []
+    for _ in range(runs):
+        params = rng.sample(variable_ids, per_query) + [rng.choice(years), f"%{rng.choice(list(COUNTIES))}%"]
+        started = time.perf_counter()
+        conn.execute(sql, params).fetchall()
+        timings.append((time.perf_counter() - started) * 1000)
+    conn.close()
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db", help="Existing database in the original layout (copied, not modified)")
+    parser.add_argument("--variables", type=int, default=20000, help="Estimate/MOE pairs per year (synthetic)")
+    parser.add_argument("--years", type=int, default=7, help="Years of data (synthetic)")
+    parser.add_argument("--runs", type=int, default=200, help="Lookups timed per layout")
+    parser.add_argument("--per-query", type=int, default=50, help="Variables per lookup")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        original = os.path.join(tmp, "original.db")
+        if args.db:
+            shutil.copyfile(args.db, original)
+        else:
+            print(f"Generating {args.variables} variables x {len(COUNTIES)} counties x {args.years} years...")
+            build_original(original, args.variables, list(range(2023 - args.years + 1, 2024)))
+
+        conn = sqlite3.connect(original)
+        variable_ids = [row[0] for row in conn.execute(
+            "SELECT DISTINCT variable_id FROM acs_data WHERE data_type = 'estimate'")]
+        years = [row[0] for row in conn.execute("SELECT DISTINCT year FROM acs_data")]
+        conn.close()
+
+        paired = os.path.join(tmp, "paired.db")
+        shutil.copyfile(original, paired)
+        conn = sqlite3.connect(paired)
+        migrate_natural_key(conn)
+        migrate_paired_moe(conn)
+        conn.execute('VACUUM')
+        conn.close()
+
+        normalized = os.path.join(tmp, "normalized.db")
+        shutil.copyfile(original, normalized)
+        conn = sqlite3.connect(normalized)
+        started = time.perf_counter()
+        init_data_schema(conn)
+        migration_seconds = time.perf_counter() - started
+        conn.close()
+
+        print(f"{'layout':<34} {'MB':>8} {'rows':>10} {'bytes/value':>12} {'lookup ms':>10}")
+        values = None
+        for name, db_path in (("original (E and M rows)", original),
+                              ("natural key + paired MOE", paired),
+                              ("normalized acs_facts", normalized)):
+            size, rows = database_size(db_path)
+            if values is None:
+                values = rows  # one row per value in the original layout
+            latency = lookup_latency(db_path, variable_ids, years, args.runs, args.per_query)
+            print(f"{name:<34} {size / 1e6:>8.1f} {rows:>10} {size / values:>12.1f} {latency:>10.3f}")
+        print(f"migration from the original layout: {migration_seconds:.1f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Benchmark: run plan generation, per-table groups requests vs. one variables.json pass.
+Builds the table -> variable plan for one year against the local fake Census API
+and reports wall time and metadata requests spent for each approach.
+
+    python benchmarks/bench_plan_generation.py --tables 400 --latency 0.05
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from census_metadata import fetch_variables, group_variables  # noqa: E402
+from comprehensive_acs_collector import ComprehensiveACSCollector  # noqa: E402
+from fake_census_server import start_fake_server  # noqa: E402
+
+
+def discover_all_tables(collector) -> list:
+    """The old plan's first step: one groups request listing every table."""
+    data = collector.make_request(f"{collector.base_url}/{collector.year}/{collector.dataset}/groups")
+    groups = data['groups'] if isinstance(data, dict) and 'groups' in data else data
+    tables = [group.get('name', '') for group in groups if isinstance(group, dict)]
+    return sorted(table_id for table_id in tables if table_id.startswith(('B', 'C', 'S')))
+
+
+def get_table_variables(collector, table_id: str) -> list:
+    """The old plan's per-table step: one groups/{table_id} request per table."""
+    data = collector.make_request(f"{collector.base_url}/{collector.year}/{collector.dataset}/groups/{table_id}")
+    variables = []
+    for var_id, info in data.get('variables', {}).items():
+        if var_id in ['NAME', 'GEO_ID']:
+            continue
+        variables.append({
+            'id': var_id,
+            'name': info.get('label', ''),
+            'description': info.get('concept', ''),
+            'type': 'estimate' if var_id.endswith('E') else 'margin_of_error' if var_id.endswith('M') else 'other'
+        })
+    return variables
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tables", type=int, default=400, help="Tables in the fake metadata")
+    parser.add_argument("--latency", type=float, default=0.05, help="Fake server latency per request (seconds)")
+    args = parser.parse_args()
+
+    server, base_url = start_fake_server(latency=args.latency, n_tables=args.tables)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        collector = ComprehensiveACSCollector("bench-key", os.path.join(tmp, "bench.db"))
+        collector.base_url = base_url
+        collector.request_delay = 0
+
+        def per_table():
+            tables = discover_all_tables(collector)
+            return {table_id: get_table_variables(collector, table_id) for table_id in tables}
+
+        def single_pass():
+            metadata = fetch_variables(collector.year, collector.dataset, base_url,
+                                       cache_dir=os.path.join(tmp, "cache"), fetch=collector.make_request)
+            return group_variables(metadata)
+
+        print(f"{'approach':<28} {'seconds':>8} {'requests':>9} {'tables':>7} {'variables':>10}")
+        results = {}
+        for name, plan in (("groups/{table} per table", per_table),
+                           ("variables.json (cold)", single_pass),
+                           ("variables.json (cached)", single_pass)):
+            before = server.request_count
+            started = time.perf_counter()
+            tables = plan()
+            elapsed = time.perf_counter() - started
+            results[name] = tables
+            n_vars = sum(len(v) for v in tables.values())
+            print(f"{name:<28} {elapsed:>8.3f} {server.request_count - before:>9} {len(tables):>7} {n_vars:>10}")
+
+        old = {t: sorted(v["id"] for v in vs) for t, vs in results["groups/{table} per table"].items()}
+        new = {t: [v["id"] for v in vs] for t, vs in results["variables.json (cold)"].items()}
+        print(f"plans identical: {old == new}")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Benchmark: collection wall time vs. number of API keys.
+Each key is throttled to --rate requests/sec (as the Census quota forces in
+practice); the quota scheduler spreads requests over all keys by remaining
+budget, so wall time should drop roughly in proportion to the key count.
+
+    python benchmarks/bench_quota_scheduler.py --requests 120 --rate 10
+    python benchmarks/bench_quota_scheduler.py --requests 80 --rate 5 --concurrency 8
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from async_collector import AsyncCollectionEngine  # noqa: E402
+from bench_async_collector import COUNTIES, make_units  # noqa: E402
+from comprehensive_acs_collector import ComprehensiveACSCollector  # noqa: E402
+from fake_census_server import start_fake_server  # noqa: E402
+from quota_scheduler import QuotaScheduler  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=120, help="Data requests per run")
+    parser.add_argument("--rate", type=float, default=10.0, help="Requests per second allowed per key")
+    parser.add_argument("--keys", default="1,2,4,8", help="Key counts to test")
+    parser.add_argument("--concurrency", type=int, default=32, help="Requests in flight")
+    parser.add_argument("--daily-limit", type=int, default=None,
+                        help="Make the fake server return 429 after this many requests per key")
+    args = parser.parse_args()
+
+    server, base_url = start_fake_server(latency=0.02, daily_limit=args.daily_limit)
+    units = make_units(server.metadata, args.requests)
+
+    print(f"{'keys':>5} {'seconds':>8} {'req/s':>8} {'failed':>7} {'speedup':>8}")
+    baseline = None
+    for n_keys in [int(x) for x in args.keys.split(",")]:
+        keys = [f"bench-key-{i}" for i in range(n_keys)]
+        server.key_usage.clear()
+        with tempfile.TemporaryDirectory() as tmp:
+            db_path = os.path.join(tmp, "bench.db")
+            ComprehensiveACSCollector(keys[0], db_path)  # creates the schema
+            scheduler = QuotaScheduler(db_path, keys, daily_limit=10 ** 6)
+            engine = AsyncCollectionEngine(db_path, keys, COUNTIES, base_url=base_url, concurrency=args.concurrency,
+                                           requests_per_second=args.rate, burst=1, scheduler=scheduler,
+                                           pack_requests=False)
+            stats = engine.run(units)
+        baseline = baseline or stats["elapsed_seconds"]
+        print(f"{n_keys:>5} {stats['elapsed_seconds']:>8.2f} {stats['requests_per_second']:>8.1f} "
+              f"{stats['failed_units']:>7} {baseline / stats['elapsed_seconds']:>7.1f}x")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Benchmark: requests per year with and without cross-table request packing.
+Counts data requests for a full-year plan (one table batch per unit vs. packed
+50-variable requests) and times both against the local fake Census API.
+
+    python benchmarks/bench_request_packing.py --tables 1193
+    python benchmarks/bench_request_packing.py --variables-json metadata_cache/acs_acs5_2023_variables.json
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from async_collector import AsyncCollectionEngine, build_table_units, pack_units  # noqa: E402
+from bench_async_collector import COUNTIES  # noqa: E402
+from census_metadata import group_variables  # noqa: E402
+from comprehensive_acs_collector import ComprehensiveACSCollector  # noqa: E402
+from fake_census_server import start_fake_server  # noqa: E402
+from quota_scheduler import QuotaScheduler  # noqa: E402
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tables", type=int, default=1193, help="Tables in the fake metadata")
+    parser.add_argument("--variables-json", help="Count requests for a real variables.json instead (no timing run)")
+    parser.add_argument("--latency", type=float, default=0.02, help="Fake server latency per request (seconds)")
+    args = parser.parse_args()
+
+    if args.variables_json:
+        with open(args.variables_json) as f:
+            metadata = json.load(f)
+        server = None
+    else:
+        server, base_url = start_fake_server(latency=args.latency, n_tables=args.tables)
+        metadata = server.metadata
+
+    tables = group_variables(metadata)
+    units = [unit for table_id, variables in tables.items() for unit in build_table_units(2023, table_id, variables)]
+    packs = pack_units(units)
+    n_vars = sum(len(unit["variables"]) for unit in units)
+    print(f"tables: {len(tables)}, estimate/MOE variables: {n_vars}, lower bound: {-(-n_vars // 50)} requests")
+    print(f"{'mode':<10} {'requests':>9} {'avg vars':>9} {'seconds':>8} {'rows':>8}")
+
+    for name, pack in (("per-table", False), ("packed", True)):
+        n_requests = len(packs) if pack else len(units)
+        line = f"{name:<10} {n_requests:>9} {n_vars / n_requests:>9.1f}"
+        if server:
+            with tempfile.TemporaryDirectory() as tmp:
+                db_path = os.path.join(tmp, "bench.db")
+                ComprehensiveACSCollector("bench-key", db_path)  # creates the schema
+                scheduler = QuotaScheduler(db_path, ["bench-key"], daily_limit=10 ** 6)
+                engine = AsyncCollectionEngine(db_path, ["bench-key"], COUNTIES, base_url=base_url, concurrency=8,
+                                               requests_per_second=10000, scheduler=scheduler, pack_requests=pack)
+                stats = engine.run([dict(unit) for unit in units])
+            line += f" {stats['elapsed_seconds']:>8.2f} {stats['rows_written']:>8}"
+        print(line)
+
+    if server:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
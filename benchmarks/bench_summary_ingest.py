@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Benchmark: offline ingestion of summary files (summary_files.py).
+Writes synthetic table files in the Census layout (acsdt5y<year>-<table>.dat:
+nation, state and every county row of the country, then tract rows), loads
+them for the collectors' four counties once per worker count and checks that
+every value arrived and every load stored the same rows.
+
+--full-scan puts the wanted county rows last, so every file is read to the
+end (the CPU-bound case the process pool is for).
+
+    python benchmarks/bench_summary_ingest.py --tables 200 --lines 60 --workers 1 2 4 8 --full-scan
+"""
+
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from acs_store import data_stats, init_data_schema  # noqa: E402
+from summary_files import ingest_summary_files  # noqa: E402
+
+COUNTIES = {"Chatham": "051", "Liberty": "179", "Effingham": "103", "Bryan": "029"}
+STATE_FIPS = "13"
+
+
+def geo_ids(states: int = 52, counties_per_state: int = 62, tracts: int = 20000, full_scan: bool = False):
+    """GEO_IDs in file order; Georgia's counties include the collectors' four."""
+    ids = ["0100000US"] + [f"0400000US{state:02d}" for state in range(1, states + 1)]
+    ids += [f"0500000US{state:02d}{county:03d}" for state in range(1, states + 1)
+            for county in range(1, 2 * counties_per_state, 2)]
+    ids += [f"0500000US{STATE_FIPS}{fips}" for fips in COUNTIES.values()
+            if f"0500000US{STATE_FIPS}{fips}" not in ids]
+    ids.sort()
+    ids += [f"1400000US{index % states + 1:02d}{index:09d}" for index in range(tracts)]
+    if full_scan:
+        wanted = [f"0500000US{STATE_FIPS}{fips}" for fips in COUNTIES.values()]
+        ids = [geo for geo in ids if geo not in wanted] + wanted
+    return ids
+
+
+def write_fixtures(directory: str, year: int, tables: int, lines: int, tracts: int = 20000,
+                   full_scan: bool = False, seed: int = 0):
+    """Write one table file per table; returns the number of values (estimate + MOE) the four counties get."""
+    rng = random.Random(seed)
+    geos = geo_ids(tracts=tracts, full_scan=full_scan)
+    os.makedirs(directory, exist_ok=True)
+    for table in range(tables):
+        table_id = f"B{table + 10000:05d}"
+        header = ["GEO_ID"] + [f"{table_id}_{kind}{line:03d}" for line in range(1, lines + 1) for kind in "EM"]
+        # A small pool of random value rows keeps generation fast
+        bodies = ["|".join(str(rng.randint(0, 99999)) for _ in header[1:]) for _ in range(64)]
+        with open(os.path.join(directory, f"acsdt5y{year}-{table_id.lower()}.dat"), "w") as f:
+            f.write("|".join(header) + "\n")
+            f.writelines(f"{geo}|{bodies[index % 64]}\n" for index, geo in enumerate(geos))
+    return tables * lines * len(COUNTIES)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tables", type=int, default=200, help="Table files to generate")
+    parser.add_argument("--lines", type=int, default=60, help="Estimate lines per table (each has an MOE)")
+    parser.add_argument("--tracts", type=int, default=20000, help="Tract rows after the county rows")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4], help="Worker counts to compare")
+    parser.add_argument("--full-scan", action="store_true", help="Wanted rows last: read every file to the end")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = os.path.join(tmp, "summary")
+        started = time.perf_counter()
+        expected = write_fixtures(directory, 2023, args.tables, args.lines, args.tracts, args.full_scan)
+        size = sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+        print(f"Generated {args.tables} files ({size / 1e6:.0f} MB) in {time.perf_counter() - started:.1f}s")
+
+        print(f"{'workers':>7} {'seconds':>8} {'files/s':>8} {'speedup':>8}")
+        baseline = reference = None
+        for workers in args.workers:
+            db_path = os.path.join(tmp, f"data-{workers}.db")
+            conn = sqlite3.connect(db_path)
+            # The collectors' log table (one row per ingested file) and the data tables
+            conn.execute('''
+                CREATE TABLE collection_log (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT, table_id TEXT, county_name TEXT, status TEXT,
+                    variables_collected INTEGER, error_message TEXT, collected_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            init_data_schema(conn)
+            conn.commit()
+            conn.close()
+
+            started = time.perf_counter()
+            ingest_summary_files(db_path, directory, [2023], COUNTIES, STATE_FIPS, workers=workers)
+            seconds = time.perf_counter() - started
+
+            conn = sqlite3.connect(db_path)
+            assert data_stats(conn)['total_values'] == expected
+            rows = conn.execute("SELECT variable_id, county_fips, year, value, margin_of_error FROM acs_data "
+                                "ORDER BY variable_id, county_fips").fetchall()
+            conn.close()
+            reference = reference or rows
+            assert rows == reference
+            baseline = baseline or seconds
+            print(f"{workers:>7} {seconds:>8.2f} {args.tables / seconds:>8.0f} {baseline / seconds:>7.2f}x")
+
+if __name__ == "__main__":
+    main()
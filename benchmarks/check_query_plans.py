@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+EXPLAIN QUERY PLAN checks for the data lookups.
+Builds a small database with the collectors' schema, prints the plan of each
+lookup and exits with status 1 if any plan has a step that is not a SEARCH on
+an index or primary key (a SCAN or a temporary b-tree) or lacks an expected
+index. Run it after schema or query changes.
+Also times fetch_values for many variables and years against the old
+per-year LIKE query through the acs_data view; the timing is informational
+(best of several repeats; the gap is small and machine-dependent) and does
+not affect the exit status.
+
+    python benchmarks/check_query_plans.py
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from acs_store import (connect, county_data_rows, fetch_values, geo_keys_for, init_data_schema,  # noqa: E402
+                       insert_data_rows, values_query)
+
+COUNTIES = {"Chatham": "051", "Liberty": "179", "Bryan": "029", "Effingham": "103"}
+YEARS = list(range(2017, 2024))
+
+
+def query_plan(conn, sql, params):
+    return [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+
+
+def check(name, plan, required):
+    problems = [step for step in plan if step.startswith("SCAN") or "TEMP B-TREE" in step]
+    problems += [f"missing: {step}" for step in required if not any(step in s for s in plan)]
+    status = "ok" if not problems else "FAIL"
+    print(f"[{status}] {name}")
+    for step in plan:
+        print(f"       {step}")
+    for problem in problems:
+        print(f"       !! {problem}")
+    return not problems
+
+
+def build(db_path, n_variables):
+    conn = connect(db_path)
+    init_data_schema(conn)
+    cursor = conn.cursor()
+    for year in YEARS:
+        county_data = {name: {} for name in COUNTIES}
+        for index in range(n_variables):
+            base = f"B{index // 40:05d}_{index % 40 + 1:03d}"
+            for county_index, name in enumerate(COUNTIES):
+                county_data[name][base + "E"] = float(index + county_index + year)
+                county_data[name][base + "M"] = float(index % 97)
+        insert_data_rows(cursor, county_data_rows(county_data, COUNTIES, year))
+    conn.commit()
+    conn.execute("ANALYZE")
+    return conn
+
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = build(os.path.join(tmp, "plans.db"), 5000)
+        variables = [f"B{i // 40:05d}_{i % 40 + 1:03d}E" for i in range(0, 5000, 37)][:100]
+        geo_keys = sorted(geo_keys_for(conn.cursor(), list(COUNTIES.values())).values())
+
+        results = [
+            check("fetch_series: 100 variables x 4 counties x 7 years",
+                  query_plan(conn, values_query(len(variables), len(geo_keys), len(YEARS)),
+                             variables + geo_keys + YEARS),
+                  ["USING COVERING INDEX sqlite_autoindex_acs_variable_keys",
+                   "USING PRIMARY KEY (var_key=? AND geo_key=?"]),
+            check("geography lookup by FIPS",
+                  query_plan(conn, "SELECT geo_key FROM acs_geographies WHERE county_fips IN (?, ?)", ["051", "179"]),
+                  ["sqlite_autoindex_acs_geographies"]),
+            check("acs_data view by variable, FIPS and year",
+                  query_plan(conn, "SELECT value FROM acs_data WHERE variable_id = ? AND county_fips = ? AND year = ?",
+                             [variables[0], "051", 2023]),
+                  ["USING PRIMARY KEY"]),
+        ]
+
+        runs, repeats = 50, 5
+        batched = per_year = float("inf")
+        for _ in range(repeats):
+            started = time.perf_counter()
+            for _ in range(runs):
+                rows = fetch_values(conn, variables, YEARS, COUNTIES["Chatham"])
+            batched = min(batched, (time.perf_counter() - started) / runs * 1000)
+
+        like_sql = f'''
+            SELECT variable_id, value, margin_of_error, county_name FROM acs_data
+            WHERE variable_id IN ({','.join('?' * len(variables))}) AND year = ? AND county_name LIKE ?
+        '''
+        for _ in range(repeats):
+            started = time.perf_counter()
+            for _ in range(runs):
+                for year in YEARS:
+                    conn.execute(like_sql, variables + [year, "%Chatham%"]).fetchall()
+            per_year = min(per_year, (time.perf_counter() - started) / runs * 1000)
+        conn.close()
+
+        print(f"\n{len(rows)} values for {len(variables)} variables x {len(YEARS)} years:")
+        print(f"  fetch_values (one statement)      {batched:8.3f} ms")
+        print(f"  LIKE query per year (7 statements) {per_year:8.3f} ms")
+
+    sys.exit(0 if all(results) else 1)
+
+
+if __name__ == "__main__":
+    main()
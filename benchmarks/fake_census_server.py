@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Local fake Census API for collector benchmarks.
+Serves the endpoints the collectors use (groups list, per-table groups,
+variables.json and county data queries) from synthetic metadata, with a
+configurable per-request latency so concurrency effects are visible. Like the
+real API, subject/profile tables are only served by their own endpoints.
+"""
+
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Tuple
+from urllib.parse import parse_qs, urlparse
+
+
+def dataset_of(table_id: str) -> str:
+    """Endpoint that serves a table family on the real API."""
+    for prefix, dataset in (("S", "acs/acs5/subject"), ("DP", "acs/acs5/profile"), ("CP", "acs/acs5/cprofile")):
+        if table_id.startswith(prefix):
+            return dataset
+    return "acs/acs5"
+
+
+def make_metadata(n_tables: int = 200, seed: int = 7, families=("B", "B", "B", "C")) -> Dict:
+    """Build a synthetic variables.json payload with realistic table sizes."""
+    rnd = random.Random(seed)
+    variables = {
+        "NAME": {"label": "Geographic Area Name", "concept": "", "group": "N/A"},
+        "GEO_ID": {"label": "Geography", "concept": "", "group": "N/A"}
+    }
+    for t in range(n_tables):
+        family = rnd.choice(families)
+        table_id = f"{family}{t + 1:05d}"
+        # Most ACS tables are small; a few have hundreds of lines
+        lines = rnd.choice([1, 3, 5, 7, 9, 13, 20, 25, 31, 49, 60, 120])
+        concept = f"SYNTHETIC CONCEPT {t + 1}"
+        for line in range(1, lines + 1):
+            base = f"{table_id}_{line:03d}"
+            label = "Total:" if line == 1 else f"Total:!!Line {line}"
+            variables[base + "E"] = {"label": f"Estimate!!{label}", "concept": concept, "group": table_id}
+            variables[base + "M"] = {"label": f"Margin of Error!!{label}", "concept": concept, "group": table_id}
+    return {"variables": variables}
+
+
+class FakeCensusHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.request_count += 1
+        if server.latency:
+            time.sleep(server.latency)
+
+        parsed = urlparse(self.path)
+        params = parse_qs(parsed.query)
+        path = parsed.path.rstrip("/")
+        if path.endswith(".json"):
+            path = path[:-5]
+        parts = path.split("/")
+        # /data/{year}/{dataset...}/[variables|groups|groups/{table}]
+        if parts[-1] in ("variables", "groups"):
+            dataset = "/".join(parts[3:-1])
+        elif len(parts) >= 2 and parts[-2] == "groups":
+            dataset = "/".join(parts[3:-2])
+        else:
+            dataset = "/".join(parts[3:])
+        variables = server.datasets.get(dataset)
+        if variables is None:
+            return self._send(404, "error: unknown dataset")
+
+        key = params.get("key", [""])[0]
+        if server.daily_limit is not None and key:
+            with server.lock:
+                used = server.key_usage.get(key, 0) + 1
+                server.key_usage[key] = used
+            if used > server.daily_limit:
+                return self._send(429, {"error": {"code": 429, "message": "You have exceeded your daily request limit."}})
+
+        if parts[-1] == "variables":
+            return self._send(200, {"variables": variables})
+        if parts[-1] == "groups":
+            groups = [g for g in server.groups if dataset_of(g) == dataset]
+            return self._send(200, {"groups": [{"name": g, "description": g} for g in groups]})
+        if len(parts) >= 2 and parts[-2] == "groups":
+            table_id = parts[-1]
+            table_vars = {k: v for k, v in variables.items() if v.get("group") == table_id}
+            return self._send(200, {"variables": table_vars})
+
+        # Data query: ?get=A,B&for=county:051,179&in=state:13
+        requested = params.get("get", [""])[0].split(",")
+        unknown = [v for v in requested if v not in variables]
+        if unknown:
+            return self._send(400, f"error: error: unknown variable '{unknown[0]}'")
+        counties = params.get("for", ["county:*"])[0].split(":", 1)[1].split(",")
+        state = params.get("in", ["state:13"])[0].split(":", 1)[1]
+        rows = [requested + ["state", "county"]]
+        for county in counties:
+            rnd = random.Random(f"{county}:{','.join(requested)}")
+            rows.append([str(rnd.randint(0, 100000)) for _ in requested] + [state, county])
+        return self._send(200, rows)
+
+    def _send(self, status: int, body):
+        payload = body.encode("utf-8") if isinstance(body, str) else json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+def start_fake_server(latency: float = 0.05, n_tables: int = 200, daily_limit: int = None,
+                      families=("B", "B", "B", "C")) -> Tuple[ThreadingHTTPServer, str]:
+    """Start the fake API on a free local port; returns (server, base_url)."""
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeCensusHandler)
+    server.daemon_threads = True
+    server.latency = latency
+    server.metadata = make_metadata(n_tables, families=families)
+    server.groups = sorted({v["group"] for v in server.metadata["variables"].values() if v["group"] != "N/A"})
+    # Per-endpoint variables; endpoints with no tables answer 404
+    server.datasets = {}
+    for var_id, info in server.metadata["variables"].items():
+        endpoints = {dataset_of(g) for g in server.groups} if info["group"] == "N/A" else {dataset_of(info["group"])}
+        for dataset in endpoints:
+            server.datasets.setdefault(dataset, {})[var_id] = info
+    server.daily_limit = daily_limit
+    server.key_usage = {}
+    server.request_count = 0
+    server.lock = threading.Lock()
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    host, port = server.server_address
+    return server, f"http://{host}:{port}/data"
+
+
+if __name__ == "__main__":
+    srv, url = start_fake_server()
+    print(f"Fake Census API listening at {url}")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        srv.shutdown()
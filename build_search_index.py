@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+Build the static variable search index for the browser.
+Exports estimate variable IDs, labels and table IDs from acs_variables.db into a
+compact, content-hashed JSON file under assets/, precompressed with gzip (and
+brotli when the `brotli` package is installed). The front-end searches it
+locally and only calls /api/search-variables for queries it cannot answer.
+
+Run after (re)loading the catalog:  python build_search_index.py
+"""
+
+import argparse
+import glob
+import gzip
+import hashlib
+import json
+import os
+import sqlite3
+from typing import Dict
+
+try:
+    import brotli
+except ImportError:  # optional: gzip is always produced
+    brotli = None
+
+INDEX_PREFIX = "search-index"
+MANIFEST_NAME = "search-index-manifest.json"
+ASSETS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets")
+
+
+def build_search_index(db_path: str = "acs_variables.db", out_dir: str = ASSETS_DIR) -> Dict:
+    """Export the compact index and return the manifest describing it."""
+    conn = sqlite3.connect(db_path)
+    cursor = conn.cursor()
+
+    cursor.execute("SELECT value FROM catalog_meta WHERE key = 'version'")
+    row = cursor.fetchone()
+    catalog_version = int(row[0]) if row else 0
+
+    cursor.execute('''
+        SELECT id, name, concept, group_name, year
+        FROM variables
+        WHERE value_kind = 'estimate' AND group_name != ''
+        ORDER BY group_name, id
+    ''')
+
+    # Columnar layout: table-level fields are stored once and referenced by index
+    tables = []
+    concepts = []
+    table_index = {}
+    var_table = []
+    var_suffix = []
+    var_label = []
+    years = set()
+    for var_id, name, concept, group_name, year in cursor.fetchall():
+        idx = table_index.get(group_name)
+        if idx is None:
+            idx = table_index[group_name] = len(tables)
+            tables.append(group_name)
+            concepts.append(concept or "")
+        var_table.append(idx)
+        # B01001_002E -> "002E"; the browser rebuilds the ID from the table ID
+        var_suffix.append(var_id[len(group_name) + 1:] if var_id.startswith(group_name + "_") else var_id)
+        var_label.append((name or "").replace("Estimate!!", "", 1))
+        years.add(year)
+    conn.close()
+
+    index = {
+        "format": 1,
+        "catalog_version": catalog_version,
+        "years": sorted(y for y in years if y is not None),
+        "tables": tables,
+        "concepts": concepts,
+        "var_table": var_table,
+        "var_suffix": var_suffix,
+        "var_label": var_label
+    }
+    raw = json.dumps(index, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+    content_hash = hashlib.sha256(raw).hexdigest()[:12]
+    filename = f"{INDEX_PREFIX}.{content_hash}.json"
+
+    os.makedirs(out_dir, exist_ok=True)
+    path = os.path.join(out_dir, filename)
+    with open(path, "wb") as f:
+        f.write(raw)
+    with open(path + ".gz", "wb") as f:
+        f.write(gzip.compress(raw, compresslevel=9))
+    if brotli is not None:
+        with open(path + ".br", "wb") as f:
+            f.write(brotli.compress(raw, quality=11))
+
+    manifest_path = os.path.join(out_dir, MANIFEST_NAME)
+    previous = None
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            previous = json.load(f).get("file")
+
+    manifest = {
+        "file": filename,
+        "url": f"/assets/{filename}",
+        "catalog_version": catalog_version,
+        "variables": len(var_table),
+        "tables": len(tables),
+        "bytes": len(raw),
+        "gzip_bytes": os.path.getsize(path + ".gz"),
+        "brotli_bytes": os.path.getsize(path + ".br") if brotli is not None else None
+    }
+    # Write the manifest atomically so the server never reads a partial file
+    tmp_path = manifest_path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, manifest_path)
+
+    # Keep the current and previous builds (pages already loaded may still reference it)
+    keep = {filename, previous}
+    for old in glob.glob(os.path.join(out_dir, f"{INDEX_PREFIX}.*.json*")):
+        base = os.path.basename(old)
+        if base.split(".json")[0] + ".json" not in keep:
+            os.remove(old)
+
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the static browser search index")
+    parser.add_argument("--db", default="acs_variables.db", help="Path to the variables catalog")
+    parser.add_argument("--out", default=ASSETS_DIR, help="Output directory (served at /assets)")
+    args = parser.parse_args()
+
+    manifest = build_search_index(args.db, args.out)
+    print(f"Wrote {manifest['file']}: {manifest['variables']} variables in {manifest['tables']} tables")
+    print(f"  raw {manifest['bytes']} bytes, gzip {manifest['gzip_bytes']} bytes"
+          + (f", brotli {manifest['brotli_bytes']} bytes" if manifest['brotli_bytes'] else ""))
+
+
+if __name__ == "__main__":
+    main()
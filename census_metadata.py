@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Census API metadata helpers.
+Downloads variables.json once per year and dataset, caches it on disk, and
+groups it into table -> variable lists so collectors can plan a whole year
+without one groups/{table_id} request per table. Also maps each table family
+to the endpoint that serves it.
+"""
+
+import json
+import logging
+import os
+import time
+from typing import Callable, Dict, List, Tuple
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = "metadata_cache"
+# Published vintages do not change, so the cached copy only needs an occasional refresh
+DEFAULT_MAX_AGE_SECONDS = 30 * 24 * 3600
+
+# Table family -> (endpoint suffix under the base dataset, table id prefixes)
+TABLE_DATASETS = {
+    'detailed': ('', ('B', 'C')),
+    'subject': ('/subject', ('S',)),
+    'profile': ('/profile', ('DP',)),
+    'cprofile': ('/cprofile', ('CP',)),
+}
+
+
+def table_datasets(base_dataset: str = "acs/acs5", families: List[str] = None) -> List[Tuple[str, Tuple[str, ...]]]:
+    """(dataset, table prefixes) for each table family, e.g. ('acs/acs5/subject', ('S',))."""
+    return [(base_dataset + suffix, prefixes)
+            for family, (suffix, prefixes) in TABLE_DATASETS.items()
+            if families is None or family in families]
+
+
+def dataset_for_table(table_id: str, base_dataset: str = "acs/acs5") -> str:
+    """Endpoint that serves a table: S tables live at acs/acs5/subject, DP at /profile, CP at /cprofile."""
+    # Longer prefixes first, so CP02 is not taken for a detailed C table
+    for suffix, prefixes in sorted(TABLE_DATASETS.values(), key=lambda item: -max(len(p) for p in item[1])):
+        if table_id.startswith(prefixes):
+            return base_dataset + suffix
+    return base_dataset
+
+
+def _default_fetch(url: str) -> Dict:
+    response = requests.get(url, timeout=60)
+    response.raise_for_status()
+    return response.json()
+
+
+def cache_path(year, dataset: str, cache_dir: str = DEFAULT_CACHE_DIR) -> str:
+    return os.path.join(cache_dir, f"{dataset.replace('/', '_')}_{year}_variables.json")
+
+
+def fetch_variables(year, dataset: str = "acs/acs5", base_url: str = "https://api.census.gov/data",
+                    cache_dir: str = DEFAULT_CACHE_DIR, max_age_seconds: float = DEFAULT_MAX_AGE_SECONDS,
+                    fetch: Callable[[str], Dict] = None) -> Dict:
+    """Return the variables.json payload for a year, from the disk cache when fresh."""
+    path = cache_path(year, dataset, cache_dir)
+    if os.path.exists(path) and time.time() - os.path.getmtime(path) < max_age_seconds:
+        with open(path, "r") as f:
+            logger.info(f"Using cached metadata: {path}")
+            return json.load(f)
+
+    url = f"{base_url}/{year}/{dataset}/variables.json"
+    logger.info(f"Downloading metadata: {url}")
+    data = (fetch or _default_fetch)(url)
+
+    os.makedirs(cache_dir, exist_ok=True)
+    # Write to a temp file and rename, so a crash never leaves a truncated cache
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+    return data
+
+
+def group_variables(metadata: Dict, prefixes: Tuple[str, ...] = ('B', 'C', 'S')) -> Dict[str, List[Dict]]:
+    """Group a variables.json payload into {table_id: [variable records]}.
+
+    Records match the ones built from per-table groups/{table_id} responses.
+    """
+    tables = {}
+    for var_id, info in metadata.get('variables', {}).items():
+        table_id = info.get('group', '')
+        if var_id in ['NAME', 'GEO_ID'] or not table_id or not table_id.startswith(prefixes):
+            continue
+        tables.setdefault(table_id, []).append({
+            'id': var_id,
+            'name': info.get('label', ''),
+            'description': info.get('concept', ''),
+            'type': 'estimate' if var_id.endswith('E') else 'margin_of_error' if var_id.endswith('M') else 'other'
+        })
+    for variables in tables.values():
+        variables.sort(key=lambda var: var['id'])
+    return dict(sorted(tables.items()))
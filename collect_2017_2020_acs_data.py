@@ -12,8 +12,18 @@ import json
 import logging
 from datetime import datetime
 from typing import List, Dict, Set
+import argparse
 import os
 
+from acs_snapshots import SNAPSHOT_DIR, SnapshotInvalid, publish_snapshot
+from acs_store import (connect, county_data_rows, data_stats, deferred_indexes, init_data_schema, insert_data_rows,
+                       rebuild_data_stats)
+from async_collector import AsyncCollectionEngine, build_table_units, pack_units
+from census_metadata import dataset_for_table, fetch_variables, group_variables, table_datasets
+from collection_pipeline import CollectionPipeline
+from quota_scheduler import QuotaScheduler, load_api_keys
+from run_plan import CollectionRunPlan, is_invalid_request, record_unit
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -28,7 +38,6 @@ logger = logging.getLogger(__name__)
 class BatchACSCollector:
     def __init__(self, api_keys: List[str], db_path: str = "comprehensive_acs_data.db"):
         self.api_keys = api_keys
-        self.current_key_index = 0
         self.db_path = db_path
         self.base_url = "https://api.census.gov/data"
         self.years = ["2017", "2018", "2019", "2020"]
@@ -49,11 +58,20 @@ class BatchACSCollector:
         # Initialize database
         self.init_database()
         
+        # The web app reads published snapshots of the database, never the database itself
+        self.snapshot_dir = os.path.join(os.path.dirname(db_path), SNAPSHOT_DIR)
+        
+        # Per-key daily usage is persisted in the database, so restarts remember spent quota
+        self.scheduler = QuotaScheduler(self.db_path, self.api_keys, self.max_requests_per_day)
+        
+        # Table x year x batch units with their status, so interrupted runs can resume
+        self.run_plan = CollectionRunPlan(self.db_path, 'batch_2017_2020')
+        
     def init_database(self):
         """Initialize SQLite database with proper schema."""
         logger.info(f"Using existing database: {self.db_path}")
         
-        conn = sqlite3.connect(self.db_path)
+        conn = connect(self.db_path)
         cursor = conn.cursor()
         
         # Create tables if they don't exist (they should already exist)
@@ -79,21 +97,6 @@ class BatchACSCollector:
             )
         ''')
         
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS acs_data (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                variable_id TEXT,
-                county_name TEXT,
-                county_fips TEXT,
-                year INTEGER,
-                value REAL,
-                margin_of_error REAL,
-                data_type TEXT,
-                collected_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (variable_id) REFERENCES acs_variables (variable_id)
-            )
-        ''')
-        
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS collection_log (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -107,109 +110,55 @@ class BatchACSCollector:
         ''')
         
         # Create indexes for better performance
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_data_variable ON acs_data (variable_id)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_data_county ON acs_data (county_name)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_data_year ON acs_data (year)')
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_variables_table ON acs_variables (table_id)')
         
         conn.commit()
+        
+        # Collected values: integer-keyed acs_facts behind the acs_data view
+        # (older databases with an acs_data table are migrated)
+        init_data_schema(conn)
         conn.close()
         logger.info("Database initialized successfully")
     
-    def get_current_api_key(self) -> str:
-        """Get the current API key."""
-        if self.current_key_index >= len(self.api_keys):
-            raise Exception("All API keys exhausted!")
-        return self.api_keys[self.current_key_index]
-    
-    def switch_to_next_api_key(self):
-        """Switch to the next API key."""
-        self.current_key_index += 1
-        self.requests_made = 0  # Reset request counter
-        if self.current_key_index < len(self.api_keys):
-            logger.info(f"Switching to API key {self.current_key_index + 1}/{len(self.api_keys)}: {self.get_current_api_key()[:20]}...")
-        else:
-            logger.error("All API keys exhausted!")
-    
-    def make_request(self, url: str, params: Dict = None) -> Dict:
-        """Make API request with rate limiting and error handling."""
-        if self.requests_made >= self.max_requests_per_day:
-            logger.warning("Daily API limit reached for current key, switching to next key...")
-            self.switch_to_next_api_key()
-        
-        time.sleep(self.request_delay)
-        self.requests_made += 1
-        
-        try:
-            response = requests.get(url, params=params, timeout=30)
-            response.raise_for_status()
-            data = response.json()
-            logger.info(f"API Response received: {len(data)} rows")
-            return data
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Request failed: {e}")
-            if hasattr(e, 'response') and e.response is not None:
-                logger.error(f"Response status: {e.response.status_code}")
-                logger.error(f"Response text: {e.response.text}")
-            raise
-        except json.JSONDecodeError as e:
-            logger.error(f"JSON decode error: {e}")
-            if hasattr(e, 'response') and e.response is not None:
-                logger.error(f"Response text: {e.response.text}")
-            raise
-    
-    def discover_all_tables(self, year: str) -> List[str]:
-        """Discover all available ACS 5-Year tables for a specific year."""
-        logger.info(f"Discovering all ACS 5-Year tables for {year}...")
-        
-        # Get table list from Census API
-        url = f"{self.base_url}/{year}/{self.dataset}/groups"
-        data = self.make_request(url)
-        
-        tables = []
-        # The API returns {"groups": [...]}, so we need to access the groups array
-        if isinstance(data, dict) and 'groups' in data:
-            for group in data['groups']:
-                table_id = group.get('name', '')
-                if table_id and table_id.startswith(('B', 'C', 'S')):
-                    tables.append(table_id)
-        else:
-            # Fallback: if data is already an array
-            for group in data:
-                if isinstance(group, dict):
-                    table_id = group.get('name', '')
-                    if table_id and table_id.startswith(('B', 'C', 'S')):
-                        tables.append(table_id)
-        
-        logger.info(f"Discovered {len(tables)} tables for {year}")
-        return sorted(tables)
-    
-    def get_table_variables(self, year: str, table_id: str) -> List[Dict]:
-        """Get all variables for a specific table."""
-        logger.info(f"Getting variables for table {table_id} ({year})")
-        
-        url = f"{self.base_url}/{year}/{self.dataset}/groups/{table_id}"
-        data = self.make_request(url)
-        
-        variables = []
-        for var in data.get('variables', {}):
-            var_info = data['variables'][var]
-            # Skip metadata variables that aren't valid for data API
-            if var in ['NAME', 'GEO_ID']:
-                continue
-            variables.append({
-                'id': var,
-                'name': var_info.get('label', ''),
-                'description': var_info.get('concept', ''),
-                'type': 'estimate' if var.endswith('E') else 'margin_of_error' if var.endswith('M') else 'other'
-            })
-        
-        logger.info(f"Found {len(variables)} variables in table {table_id} ({year})")
-        return variables
+    def make_request(self, url: str, params: Dict = None, use_key: bool = False) -> Dict:
+        """Make API request with rate limiting and error handling.
+        
+        With use_key, the quota scheduler picks the key with the most remaining
+        budget; a 429 puts that key on cooldown and the request moves to another key.
+        """
+        while True:
+            request_params = dict(params or {})
+            key = self.scheduler.acquire() if use_key else None
+            if key:
+                request_params['key'] = key
+            
+            time.sleep(self.request_delay)
+            self.requests_made += 1
+            
+            try:
+                response = requests.get(url, params=request_params, timeout=30)
+                response.raise_for_status()
+                data = response.json()
+                logger.info(f"API Response received: {len(data)} rows")
+                return data
+            except requests.exceptions.RequestException as e:
+                if key and getattr(e, 'response', None) is not None and e.response.status_code == 429:
+                    self.scheduler.report_rate_limited(key)
+                    continue
+                logger.error(f"Request failed: {e}")
+                if hasattr(e, 'response') and e.response is not None:
+                    logger.error(f"Response status: {e.response.status_code}")
+                    logger.error(f"Response text: {e.response.text}")
+                raise
+            except json.JSONDecodeError as e:
+                logger.error(f"JSON decode error: {e}")
+                if hasattr(e, 'response') and e.response is not None:
+                    logger.error(f"Response text: {e.response.text}")
+                raise
     
     def store_table_info(self, table_id: str, table_name: str, variables: List[Dict]):
         """Store table and variable information in database."""
-        conn = sqlite3.connect(self.db_path)
+        conn = connect(self.db_path)
         cursor = conn.cursor()
         
         # Store table info (only if not already exists)
@@ -219,61 +168,15 @@ class BatchACSCollector:
         ''', (table_id, table_name, f"ACS 5-Year Table {table_id}", len(variables)))
         
         # Store variable info (only if not already exists)
-        for var in variables:
-            cursor.execute('''
-                INSERT OR IGNORE INTO acs_variables 
-                (variable_id, table_id, variable_name, variable_description, variable_type)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (var['id'], table_id, var['name'], var['description'], var['type']))
+        cursor.executemany('''
+            INSERT OR IGNORE INTO acs_variables 
+            (variable_id, table_id, variable_name, variable_description, variable_type)
+            VALUES (?, ?, ?, ?, ?)
+        ''', ((var['id'], table_id, var['name'], var['description'], var['type']) for var in variables))
         
         conn.commit()
         conn.close()
     
-    def collect_county_data(self, year: str, table_id: str, variables: List[Dict]) -> Dict:
-        """Collect data for all counties for a specific table."""
-        logger.info(f"Collecting {year} data for table {table_id}")
-        
-        # Build variable list (both estimates and margins of error)
-        var_list = [var['id'] for var in variables if var['type'] in ['estimate', 'margin_of_error']]
-        
-        if not var_list:
-            logger.warning(f"No valid variables found for table {table_id}")
-            return {}
-        
-        # Build county FIPS list (just the county part, not full FIPS)
-        county_fips = list(self.counties.values())
-        
-        # Batch variables to avoid URL length limits (max ~50 variables per request)
-        batch_size = 50
-        all_data = {}
-        
-        for i in range(0, len(var_list), batch_size):
-            batch_vars = var_list[i:i + batch_size]
-            logger.info(f"Processing batch {i//batch_size + 1}/{(len(var_list) + batch_size - 1)//batch_size} ({len(batch_vars)} variables)")
-            
-            # Make API request for this batch
-            url = f"{self.base_url}/{year}/{self.dataset}"
-            params = {
-                'get': ','.join(batch_vars),
-                'for': 'county:' + ','.join(county_fips),
-                'in': f'state:{self.state_fips}',
-                'key': self.get_current_api_key()
-            }
-            
-            try:
-                data = self.make_request(url, params)
-                batch_data = self.parse_county_data(table_id, data, batch_vars)
-                # Merge batch data into all_data
-                for county, county_data in batch_data.items():
-                    if county not in all_data:
-                        all_data[county] = {}
-                    all_data[county].update(county_data)
-            except Exception as e:
-                logger.error(f"Failed to collect batch data for table {table_id}: {e}")
-                continue
-        
-        return all_data
-    
     def parse_county_data(self, table_id: str, data: List, var_list: List[str]) -> Dict:
         """Parse API response and return structured data."""
         if not data or len(data) < 2:
@@ -312,159 +215,142 @@ class BatchACSCollector:
         
         return county_data
     
-    def store_county_data(self, year: str, table_id: str, county_data: Dict):
-        """Store collected county data in database."""
-        conn = sqlite3.connect(self.db_path)
+    def store_county_data(self, year: str, table_id: str, county_data: Dict, unit: Dict = None):
+        """Store collected county data in database.
+        
+        When a planned unit is given, its collection_log row is marked done in the
+        same transaction as the data.
+        """
+        started = time.perf_counter()
+        conn = connect(self.db_path)
         cursor = conn.cursor()
         
-        total_variables = 0
-        
-        for county_name, variables in county_data.items():
-            county_fips = self.counties[county_name]
-            
-            for var_id, value in variables.items():
-                # Determine data type
-                data_type = 'estimate' if var_id.endswith('E') else 'margin_of_error' if var_id.endswith('M') else 'other'
-                
-                cursor.execute('''
-                    INSERT INTO acs_data 
-                    (variable_id, county_name, county_fips, year, value, data_type)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                ''', (var_id, county_name, county_fips, int(year), value, data_type))
-                
-                total_variables += 1
+        rows = list(county_data_rows(county_data, self.counties, year))
+        total_variables = len(rows)
+        # Upserts: values identical to the stored ones are not rewritten
+        changed = insert_data_rows(cursor, rows)
         
         # Log collection
-        cursor.execute('''
-            INSERT INTO collection_log 
-            (table_id, county_name, status, variables_collected)
-            VALUES (?, ?, ?, ?)
-        ''', (table_id, 'All Counties', 'Success', total_variables))
+        record_unit(cursor, unit or {'table_id': table_id}, total_variables)
         
         conn.commit()
         conn.close()
         
-        logger.info(f"Stored {total_variables} data points for table {table_id} ({year})")
+        elapsed = time.perf_counter() - started
+        logger.info(f"Stored {total_variables} data points ({changed} new or changed) for table {table_id} ({year}, "
+                    f"{total_variables / elapsed if elapsed else 0:.0f} rows/s)")
     
-    def collect_year_data(self, year: str) -> Dict:
-        """Collect all data for a specific year."""
-        logger.info(f"Starting {year} ACS data collection...")
-        start_time = datetime.now()
-        
-        year_stats = {
-            'year': year,
-            'tables_processed': 0,
-            'successful_tables': 0,
-            'failed_tables': 0,
-            'data_points': 0,
-            'variables': 0,
-            'start_time': start_time
+    def load_table_variables(self, year: str) -> Dict[str, List[Dict]]:
+        """All tables and their variables for a year, from one (cached) variables.json download per endpoint.
+        
+        Each table family is read from the endpoint that serves it (detailed,
+        subject, profile, comparison profile); endpoints and tables in the
+        negative cache are skipped.
+        """
+        tables = {}
+        for dataset, prefixes in table_datasets(self.dataset):
+            invalid = self.run_plan.invalid_tables(year, dataset)
+            if '*' in invalid:
+                continue
+            try:
+                metadata = fetch_variables(year, dataset, self.base_url, fetch=self.make_request)
+            except requests.exceptions.RequestException as e:
+                if not is_invalid_request(e):
+                    raise
+                # The endpoint does not exist for this year (e.g. no comparison profiles)
+                self.run_plan.mark_invalid(year, dataset, '*', str(e))
+                continue
+            for table_id, variables in group_variables(metadata, prefixes).items():
+                if table_id not in invalid:
+                    tables[table_id] = variables
+        logger.info(f"Found {len(tables)} tables in {year} metadata")
+        return tables
+    
+    def plan_collection(self, resume: bool = False) -> int:
+        """Persist the run plan (one unit per table batch per year) and return the run id.
+        
+        Each year is planned from a single variables.json pass instead of one
+        groups/{table_id} request per table; tables already planned by a
+        resumed run are skipped.
+        """
+        run_id, status = self.run_plan.start_run(resume)
+        if status != 'planning':
+            return run_id
+        
+        planned = self.run_plan.planned_tables(run_id)
+        for year in self.years:
+            tables = self.load_table_variables(year)
+            units = []
+            for table_id, variables in tables.items():
+                if (year, table_id) in planned:
+                    continue
+                self.store_table_info(table_id, f"Table {table_id}", variables)
+                units.extend(build_table_units(year, table_id, variables,
+                                               dataset=dataset_for_table(table_id, self.dataset)))
+            # One transaction per year, so a year's plan is either fully there or absent
+            self.run_plan.add_units(run_id, units)
+        
+        self.run_plan.mark_planned(run_id)
+        return run_id
+    
+    def fetch_pack(self, pack: List[Dict]) -> List:
+        """Request one pack of planned units (possibly from several tables) for all counties."""
+        variables = [var for unit in pack for var in unit['variables']]
+        url = f"{self.base_url}/{pack[0]['year']}/{pack[0].get('dataset', self.dataset)}"
+        params = {
+            'get': ','.join(variables),
+            'for': 'county:' + ','.join(self.counties.values()),
+            'in': f'state:{self.state_fips}'
         }
-        
-        try:
-            # Discover all tables
-            tables = self.discover_all_tables(year)
-            logger.info(f"Will collect data from {len(tables)} tables for {year}")
-            
-            for i, table_id in enumerate(tables, 1):
-                logger.info(f"Processing table {i}/{len(tables)}: {table_id} ({year})")
-                year_stats['tables_processed'] += 1
-                
-                try:
-                    # Get variables for this table
-                    variables = self.get_table_variables(year, table_id)
-                    
-                    if not variables:
-                        logger.warning(f"No variables found for table {table_id}")
-                        continue
-                    
-                    # Store table and variable info
-                    self.store_table_info(table_id, f"Table {table_id}", variables)
-                    
-                    # Collect county data
-                    county_data = self.collect_county_data(year, table_id, variables)
-                    
-                    if county_data:
-                        # Store county data
-                        self.store_county_data(year, table_id, county_data)
-                        year_stats['successful_tables'] += 1
-                        logger.info(f"Successfully collected data for table {table_id} ({year})")
-                    else:
-                        logger.warning(f"No data collected for table {table_id}")
-                        year_stats['failed_tables'] += 1
-                    
-                    # Progress update
-                    if i % 10 == 0:
-                        elapsed = datetime.now() - start_time
-                        logger.info(f"Progress: {i}/{len(tables)} tables processed. "
-                                  f"Successful: {year_stats['successful_tables']}, Failed: {year_stats['failed_tables']}. "
-                                  f"Elapsed: {elapsed}")
-                    
-                except Exception as e:
-                    logger.error(f"Failed to process table {table_id} ({year}): {e}")
-                    year_stats['failed_tables'] += 1
-                    
-                    # Log failure
-                    conn = sqlite3.connect(self.db_path)
-                    cursor = conn.cursor()
-                    cursor.execute('''
-                        INSERT INTO collection_log 
-                        (table_id, county_name, status, error_message)
-                        VALUES (?, ?, ?, ?)
-                    ''', (table_id, 'All Counties', 'Failed', str(e)))
-                    conn.commit()
-                    conn.close()
-            
-            # Calculate final stats
-            end_time = datetime.now()
-            year_stats['end_time'] = end_time
-            year_stats['total_time'] = end_time - start_time
-            
-            # Get database counts for this year
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            cursor.execute("SELECT COUNT(*) FROM acs_data WHERE year = ?", (int(year),))
-            year_stats['data_points'] = cursor.fetchone()[0]
-            cursor.execute("SELECT COUNT(DISTINCT variable_id) FROM acs_data WHERE year = ?", (int(year),))
-            year_stats['variables'] = cursor.fetchone()[0]
-            conn.close()
-            
-            logger.info("=" * 60)
-            logger.info(f"{year} COLLECTION COMPLETE!")
-            logger.info(f"Total tables processed: {year_stats['tables_processed']}")
-            logger.info(f"Successful: {year_stats['successful_tables']}")
-            logger.info(f"Failed: {year_stats['failed_tables']}")
-            logger.info(f"Data points collected: {year_stats['data_points']}")
-            logger.info(f"Variables collected: {year_stats['variables']}")
-            logger.info(f"Total time: {year_stats['total_time']}")
-            logger.info(f"API requests made: {self.requests_made}")
-            logger.info("=" * 60)
-            
-            return year_stats
-            
-        except Exception as e:
-            logger.error(f"{year} Collection failed: {e}")
-            raise
+        return self.make_request(url, params, use_key=True)
+    
+    def parse_pack(self, pack: List[Dict], data: List) -> Dict:
+        """Parse a pack's response into {county: {var_id: value}}."""
+        variables = [var for unit in pack for var in unit['variables']]
+        return self.parse_county_data(pack[0]['table_id'], data, variables)
     
-    def run_batch_collection(self):
-        """Run the complete batch data collection process for all years."""
+    def run_batch_collection(self, resume: bool = False):
+        """Run the complete batch data collection process for all years.
+        
+        Each year's pending units go through the collection pipeline (see
+        collection_pipeline): requests, parsing and database writes run as
+        separate stages, so the network and the disk overlap.
+        """
         logger.info("Starting batch ACS data collection for 2017-2020...")
         overall_start_time = datetime.now()
         
-        # Initialize with first API key
-        logger.info(f"Using API key 1/{len(self.api_keys)}: {self.get_current_api_key()[:20]}...")
+        # Quota left on each key (persisted across restarts)
+        self.scheduler.log_summary()
         
-        all_year_stats = []
+        collected_years = []
         
         try:
-            for year in self.years:
-                year_stats = self.collect_year_data(year)
-                all_year_stats.append(year_stats)
-                
-                # Brief pause between years
-                if year != self.years[-1]:  # Not the last year
-                    logger.info("Brief pause before starting next year...")
-                    time.sleep(2)
+            run_id = self.plan_collection(resume)
+            
+            # A first load into an empty acs_data builds its indexes once, after the last year
+            with deferred_indexes(self.db_path):
+                for year in self.years:
+                    units = self.run_plan.pending_units(run_id, year)
+                    # Small tables share requests; results are routed back to each table's unit
+                    packs = pack_units(units)
+                    logger.info(f"Will collect {len(units)} units in {len(packs)} requests for {year}")
+                    
+                    pipeline = CollectionPipeline(self.db_path, self.counties, self.fetch_pack, self.parse_pack)
+                    stats = pipeline.run(packs)
+                    collected_years.append(year)
+                    logger.info(f"{year}: {stats['successful_units']} units stored, {stats['failed_units']} failed, "
+                                f"{stats['rows_written']} rows ({stats['rows_per_second']} rows/s)")
+                    if stats['quota_exhausted']:
+                        break
+                    
+                    # Brief pause between years
+                    if year != self.years[-1]:  # Not the last year
+                        logger.info("Brief pause before starting next year...")
+                        time.sleep(2)
+            
+            if self.run_plan.finish_run(run_id):
+                # Only complete runs become visible to the web app
+                self.publish_snapshot()
             
             # Final summary
             overall_end_time = datetime.now()
@@ -472,19 +358,25 @@ class BatchACSCollector:
             
             logger.info("=" * 80)
             logger.info("BATCH COLLECTION COMPLETE!")
+            logger.info(f"Run {run_id}: {self.run_plan.progress(run_id)}")
             logger.info("=" * 80)
             
             total_data_points = 0
             total_variables = 0
             
-            for stats in all_year_stats:
-                logger.info(f"{stats['year']}: {stats['data_points']} data points, {stats['variables']} variables")
-                total_data_points += stats['data_points']
-                total_variables += stats['variables']
+            conn = sqlite3.connect(self.db_path)
+            year_counts = data_stats(conn)['years']
+            conn.close()
+            for year in collected_years:
+                counts = year_counts.get(int(year), {})
+                logger.info(f"{year}: {counts.get('values', 0)} data points, {counts.get('variables', 0)} variables")
+                total_data_points += counts.get('values', 0)
+                total_variables += counts.get('variables', 0)
             
             logger.info(f"TOTAL: {total_data_points} data points, {total_variables} variables")
             logger.info(f"Total time: {overall_total_time}")
-            logger.info(f"API keys used: {self.current_key_index + 1}/{len(self.api_keys)}")
+            keys_used = sum(1 for row in self.scheduler.usage_summary() if row['requests'])
+            logger.info(f"API keys used: {keys_used}/{len(self.api_keys)}")
             logger.info("=" * 80)
             
             # Final database summary
@@ -493,53 +385,113 @@ class BatchACSCollector:
         except Exception as e:
             logger.error(f"Batch collection failed: {e}")
             raise
+        finally:
+            # Hand back requests reserved for this run but not made
+            self.scheduler.release()
+    
+    def run_async_batch_collection(self, concurrency: int = 8, requests_per_second: float = 5.0, resume: bool = False):
+        """Run the batch collection with many requests in flight, spread over all API keys."""
+        logger.info(f"Starting async batch ACS data collection ({concurrency} concurrent requests)...")
+        overall_start_time = datetime.now()
+        
+        engine = AsyncCollectionEngine(
+            self.db_path, self.api_keys, self.counties, self.state_fips,
+            base_url=self.base_url, dataset=self.dataset,
+            concurrency=concurrency, requests_per_second=requests_per_second,
+            scheduler=self.scheduler
+        )
+        
+        run_id = self.plan_collection(resume)
+        units = self.run_plan.pending_units(run_id)
+        
+        with deferred_indexes(self.db_path):
+            stats = engine.run(units)
+        if self.run_plan.finish_run(run_id):
+            # Only complete runs become visible to the web app
+            self.publish_snapshot()
+        
+        logger.info("=" * 80)
+        logger.info("ASYNC BATCH COLLECTION COMPLETE!")
+        logger.info(f"Run {run_id}: {self.run_plan.progress(run_id)}")
+        logger.info(f"Units: {stats['units']} in {stats['requests']} requests (successful: {stats['successful_units']}, failed: {stats['failed_units']})")
+        logger.info(f"Rows written: {stats['rows_written']} ({stats['rows_per_second']} rows/s)")
+        logger.info(f"Total time: {datetime.now() - overall_start_time}")
+        logger.info("=" * 80)
+        
+        self.print_final_database_summary()
+        return stats
     
     def print_final_database_summary(self):
         """Print final summary of all collected data."""
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
         
-        # Get counts by year
-        cursor.execute("SELECT year, COUNT(*) as records, COUNT(DISTINCT variable_id) as variables FROM acs_data GROUP BY year ORDER BY year")
-        year_data = cursor.fetchall()
-        
-        # Get total counts
-        cursor.execute("SELECT COUNT(*) FROM acs_data")
-        total_records = cursor.fetchone()[0]
+        # Counts come from the stats table the writers maintain, not a scan of the values
+        stats = data_stats(conn)
+        year_data = [(year, counts['values'], counts['variables']) for year, counts in stats['years'].items()]
+        total_records = stats['total_values']
+        year_count = len(stats['years'])
+        county_count = len(stats['counties'])
         
-        cursor.execute("SELECT COUNT(DISTINCT year) FROM acs_data")
-        year_count = cursor.fetchone()[0]
-        
-        cursor.execute("SELECT COUNT(DISTINCT variable_id) FROM acs_data")
+        cursor.execute("SELECT COUNT(*) FROM acs_variable_keys")
         total_variables = cursor.fetchone()[0]
         
-        cursor.execute("SELECT COUNT(DISTINCT county_name) FROM acs_data")
-        county_count = cursor.fetchone()[0]
-        
         logger.info("FINAL DATABASE SUMMARY:")
         logger.info(f"Years in database: {year_count}")
         logger.info(f"Total records: {total_records}")
         logger.info(f"Total unique variables: {total_variables}")
         logger.info(f"Counties: {county_count}")
+        logger.info(f"Last collected: {stats['last_collected']}")
         logger.info("")
         logger.info("Data by year:")
         for year, records, variables in year_data:
             logger.info(f"  {year}: {records} records, {variables} variables")
         
         conn.close()
+    
+    def recompute_stats(self):
+        """Rebuild the data statistics table from a full scan and print the summary."""
+        conn = connect(self.db_path)
+        rebuild_data_stats(conn)
+        conn.close()
+        self.print_final_database_summary()
+    
+    def publish_snapshot(self):
+        """Validate and publish the collected data as the web app's next snapshot (see acs_snapshots)."""
+        try:
+            # Another collector's unfinished run in the shared database does not block this one
+            publish_snapshot(self.db_path, self.snapshot_dir, collector=self.run_plan.collector)
+        except SnapshotInvalid as e:
+            logger.error(str(e))
 
 
 def main():
     """Main function to run the batch data collection."""
-    # Read API keys from file
-    with open('api_keys.txt', 'r') as f:
-        api_keys = [line.strip() for line in f.readlines() if line.strip()]
+    parser = argparse.ArgumentParser(description="Collect ACS 5-Year data for 2017-2020")
+    parser.add_argument("--concurrency", type=int, default=1,
+                        help="Requests in flight; above 1 uses the async collection engine")
+    parser.add_argument("--rate", type=float, default=5.0,
+                        help="Requests per second per API key (async engine only)")
+    parser.add_argument("--resume", action="store_true",
+                        help="Continue the last unfinished run, collecting only pending or failed units")
+    parser.add_argument("--recompute", action="store_true",
+                        help="Rebuild the data statistics table from scratch, print the summary and exit")
+    args = parser.parse_args()
     
-    logger.info(f"Loaded {len(api_keys)} API keys from api_keys.txt")
+    # Read API keys from the environment and api_keys.txt
+    api_keys = load_api_keys('api_keys.txt')
+    
+    logger.info(f"Loaded {len(api_keys)} API keys")
     
     try:
         collector = BatchACSCollector(api_keys)
-        collector.run_batch_collection()
+        if args.recompute:
+            collector.recompute_stats()
+            return
+        if args.concurrency > 1:
+            collector.run_async_batch_collection(args.concurrency, args.rate, resume=args.resume)
+        else:
+            collector.run_batch_collection(resume=args.resume)
         logger.info("Batch collection completed successfully!")
         
     except Exception as e:
@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+Staged collection pipeline for the threaded (non-async) collectors.
+Fetch workers, a parse stage and a single SQLite writer run on their own
+threads connected by bounded queues, so network I/O, parsing and disk writes
+overlap. Each queue records backpressure metrics (depth, time producers spent
+blocked, time consumers spent starved).
+"""
+
+import logging
+import queue
+import threading
+import time
+from typing import Callable, Dict, Iterable, Iterator, List, Tuple
+
+from acs_store import connect, county_data_rows, insert_data_rows
+from async_collector import unpack_county_data
+from quota_scheduler import QuotaExhausted
+from run_plan import is_invalid_request, record_unit
+
+logger = logging.getLogger(__name__)
+
+_DONE = object()
+
+
+class StageQueue:
+    """Bounded queue between two stages that measures backpressure."""
+
+    def __init__(self, name: str, maxsize: int):
+        self.name = name
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.maxsize = maxsize
+        self.items = 0
+        self.max_depth = 0
+        self.put_wait_seconds = 0.0  # producer blocked on a full queue
+        self.get_wait_seconds = 0.0  # consumer starved on an empty queue
+        self._lock = threading.Lock()
+
+    def put(self, item):
+        started = time.perf_counter()
+        self.queue.put(item)
+        waited = time.perf_counter() - started
+        with self._lock:
+            self.put_wait_seconds += waited
+            self.items += 1
+            self.max_depth = max(self.max_depth, self.queue.qsize())
+
+    def get(self, timeout: float = None):
+        started = time.perf_counter()
+        try:
+            return self.queue.get(timeout=timeout)
+        finally:
+            with self._lock:
+                self.get_wait_seconds += time.perf_counter() - started
+
+    def metrics(self) -> Dict:
+        return {
+            'items': self.items,
+            'capacity': self.maxsize,
+            'max_depth': self.max_depth,
+            'put_wait_seconds': round(self.put_wait_seconds, 3),
+            'get_wait_seconds': round(self.get_wait_seconds, 3)
+        }
+
+
+class CollectionPipeline:
+    def __init__(self, db_path: str, counties: Dict[str, str],
+                 fetch: Callable[[List[Dict]], object],
+                 parse: Callable[[List[Dict], object], Dict] = None,
+                 fetch_workers: int = 1, queue_size: int = 32,
+                 write_batch_rows: int = 5000,
+                 rows: Callable[[Dict, object], List[Tuple]] = None):
+        """fetch(pack) returns the raw API response for a packed request;
+        parse(pack, data) turns it into {county: {var_id: value}}.
+        Sources that build acs_data rows themselves pass rows(unit, data)
+        instead of parse (one unit per pack)."""
+        self.db_path = db_path
+        self.counties = counties
+        self.fetch = fetch
+        self.parse = parse
+        self.unit_rows = rows
+        self.fetch_workers = max(1, fetch_workers)
+        self.queue_size = queue_size
+        self.write_batch_rows = write_batch_rows
+
+    # ---------------------------------------------------------------- stages
+
+    def _fetch_stage(self, packs: Iterator[List[Dict]], parse_queue: StageQueue, stats: Dict):
+        while not self._stop.is_set():
+            # A lazy packs iterator may block here; stats keep their own lock
+            with self._packs_lock:
+                pack = next(packs, None)
+            if pack is None:
+                return
+            with self._lock:
+                stats['units'] += len(pack)
+            self._fetch_pack(pack, parse_queue, stats)
+
+    def _fetch_pack(self, pack: List[Dict], parse_queue: StageQueue, stats: Dict):
+        started = time.perf_counter()
+        try:
+            data, error = self.fetch(pack), None
+        except Exception as e:
+            data, error = None, e
+        with self._lock:
+            stats['requests'] += 1
+            stats['fetch_seconds'] += time.perf_counter() - started
+
+        if isinstance(error, QuotaExhausted):
+            # Leave this and every unstarted pack pending for --resume
+            logger.error(f"Stopping collection: {error}")
+            self._stop.set()
+            return
+        if error is not None and len(pack) > 1 and is_invalid_request(error):
+            # One bad variable rejects the whole request; retry each table batch on its own
+            logger.warning(f"Packed request for {len(pack)} units rejected ({error}); retrying separately")
+            for unit in pack:
+                if not self._stop.is_set():
+                    self._fetch_pack([unit], parse_queue, stats)
+            return
+        if error is not None:
+            # Timeouts, 5xx and exhausted 429 retries fail every unit of the pack (retried on --resume)
+            # instead of multiplying requests while the API is unhealthy
+            logger.error(f"Failed to collect {len(pack)} unit(s) from {pack[0]['table_id']} ({pack[0]['year']}): {error}")
+            if len(pack) == 1:
+                # Rejected outright (unknown variable/endpoint): never request it again
+                pack[0]['invalid'] = is_invalid_request(error)
+        parse_queue.put((pack, data, str(error) if error is not None else None))
+
+    def _parse_stage(self, parse_queue: StageQueue, write_queue: StageQueue, stats: Dict):
+        while True:
+            item = parse_queue.get()
+            if item is _DONE:
+                write_queue.put(_DONE)
+                return
+            started = time.perf_counter()
+            pack, data, error = item
+            try:
+                if error:
+                    results = [(unit, [], error) for unit in pack]
+                elif self.unit_rows is not None:
+                    results = [(unit, self.unit_rows(unit, data), None) for unit in pack]
+                else:
+                    county_data = self.parse(pack, data)
+                    results = [(unit, self._rows(unit, unit_data), None)
+                               for unit, unit_data in unpack_county_data(pack, county_data)]
+            except Exception as e:
+                logger.error(f"Failed to parse response for {pack[0]['table_id']} ({pack[0]['year']}): {e}")
+                results = [(unit, [], str(e)) for unit in pack]
+            stats['parse_seconds'] += time.perf_counter() - started
+            for result in results:
+                write_queue.put(result)
+
+    def _rows(self, unit: Dict, county_data: Dict) -> List[Tuple]:
+        return list(county_data_rows(county_data, self.counties, unit['year']))
+
+    def _write_stage(self, write_queue: StageQueue, stats: Dict):
+        """Single writer: one connection, large transactions.
+
+        Commits once write_batch_rows are pending or the queue runs dry, so a
+        backlog is written in big transactions while the write lock is never
+        held idle (the quota scheduler shares the database).
+        """
+        conn = connect(self.db_path)
+        cursor = conn.cursor()
+        pending_rows = 0
+        pending_units = 0
+        try:
+            while True:
+                item = write_queue.get()
+                started = time.perf_counter()
+                if item is not _DONE:
+                    unit, rows, error = item
+                    if rows:
+                        # Counts only new or changed rows; re-collected identical values are skipped
+                        stats['rows_written'] += insert_data_rows(cursor, rows)
+                    # Same transaction as the data, so a planned unit is never half-recorded
+                    status = record_unit(cursor, unit, len(rows), error)
+                    pending_rows += len(rows)
+                    pending_units += 1
+                    stats['successful_units' if status == 'Success' else 'failed_units'] += 1
+                    if (stats['successful_units'] + stats['failed_units']) % 100 == 0:
+                        logger.info(f"Progress: {stats['successful_units']} units stored, "
+                                    f"{stats['failed_units']} failed, {stats['rows_written']} rows")
+                if pending_units and (item is _DONE or pending_rows >= self.write_batch_rows or
+                                      write_queue.queue.empty()):
+                    conn.commit()
+                    stats['transactions'] += 1
+                    pending_rows = pending_units = 0
+                stats['write_seconds'] += time.perf_counter() - started
+                if item is _DONE:
+                    return
+        except Exception as e:
+            # Stop the fetchers and keep draining so upstream stages never block on a dead writer
+            logger.error(f"Writer failed: {e}")
+            self._writer_error = e
+            self._stop.set()
+            while write_queue.get() is not _DONE:
+                pass
+        finally:
+            conn.close()
+
+    # ------------------------------------------------------------------- run
+
+    def run(self, packs: Iterable[List[Dict]]) -> Dict:
+        """Collect all packs and return run statistics, including queue backpressure metrics.
+
+        packs may be lazy (e.g. yielded as their sources become ready); fetch
+        workers take the next one as they free up. 'units' counts the units
+        taken, so packs left pending by a quota stop are not included.
+        """
+        stats = {'units': 0, 'requests': 0,
+                 'successful_units': 0, 'failed_units': 0, 'rows_written': 0, 'transactions': 0,
+                 'fetch_seconds': 0.0, 'parse_seconds': 0.0, 'write_seconds': 0.0}
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._packs_lock = threading.Lock()
+        self._writer_error = None
+        work = iter(packs)
+        parse_queue = StageQueue('parse', self.queue_size)
+        write_queue = StageQueue('write', self.queue_size * 4)
+
+        started = time.perf_counter()
+        writer = threading.Thread(target=self._write_stage, args=(write_queue, stats), name="acs-writer")
+        parser = threading.Thread(target=self._parse_stage, args=(parse_queue, write_queue, stats), name="acs-parse")
+        fetchers = [threading.Thread(target=self._fetch_stage, args=(work, parse_queue, stats), name=f"acs-fetch-{i}")
+                    for i in range(self.fetch_workers)]
+        for thread in [writer, parser] + fetchers:
+            thread.start()
+        for thread in fetchers:
+            thread.join()
+        parse_queue.put(_DONE)
+        parser.join()
+        writer.join()
+        if self._writer_error:
+            raise self._writer_error
+
+        elapsed = time.perf_counter() - started
+        stats['quota_exhausted'] = self._stop.is_set()
+        stats['elapsed_seconds'] = round(elapsed, 3)
+        stats['requests_per_second'] = round(stats['requests'] / elapsed, 2) if elapsed else 0.0
+        stats['rows_per_second'] = round(stats['rows_written'] / elapsed, 1) if elapsed else 0.0
+        for key in ('fetch_seconds', 'parse_seconds', 'write_seconds'):
+            stats[key] = round(stats[key], 3)
+        stats['queues'] = {q.name: q.metrics() for q in (parse_queue, write_queue)}
+        self.log_metrics(stats)
+        return stats
+
+    @staticmethod
+    def log_metrics(stats: Dict):
+        logger.info(f"Pipeline: {stats['units']} units in {stats['requests']} requests, "
+                    f"{stats['rows_written']} rows in {stats['transactions']} transactions, "
+                    f"{stats['elapsed_seconds']}s ({stats['requests_per_second']} req/s, {stats['rows_per_second']} rows/s)")
+        logger.info(f"Stage busy time: fetch {stats['fetch_seconds']}s, parse {stats['parse_seconds']}s, "
+                    f"write {stats['write_seconds']}s")
+        for name, metrics in stats['queues'].items():
+            logger.info(f"Queue {name}: max depth {metrics['max_depth']}/{metrics['capacity']}, "
+                        f"producers blocked {metrics['put_wait_seconds']}s, "
+                        f"consumer starved {metrics['get_wait_seconds']}s")
@@ -11,8 +11,19 @@ import json
 import logging
 from datetime import datetime
 from typing import List, Dict, Set
+import argparse
 import os
 
+from acs_snapshots import SNAPSHOT_DIR, SnapshotInvalid, publish_snapshot
+from acs_store import (connect, county_data_rows, data_stats, deferred_indexes, init_data_schema, insert_data_rows,
+                       rebuild_data_stats)
+from async_collector import AsyncCollectionEngine, build_table_units, pack_units
+from census_metadata import dataset_for_table, fetch_variables, group_variables, table_datasets
+from collection_pipeline import CollectionPipeline
+from quota_scheduler import QuotaExhausted, QuotaScheduler, load_api_keys
+from run_plan import CollectionRunPlan, is_invalid_request, record_unit
+from summary_files import ingest_summary_files
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -25,8 +36,10 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 class ComprehensiveACSCollector:
-    def __init__(self, api_key: str, db_path: str = "comprehensive_acs_data.db"):
+    def __init__(self, api_key: str, db_path: str = "comprehensive_acs_data.db", api_keys: List[str] = None):
         self.api_key = api_key
+        # Additional keys share the load through the quota scheduler
+        self.api_keys = list(dict.fromkeys([api_key] + list(api_keys or [])))
         self.db_path = db_path
         self.base_url = "https://api.census.gov/data"
         self.year = "2023"
@@ -47,11 +60,20 @@ class ComprehensiveACSCollector:
         # Initialize database
         self.init_database()
         
+        # The web app reads published snapshots of the database, never the database itself
+        self.snapshot_dir = os.path.join(os.path.dirname(db_path), SNAPSHOT_DIR)
+        
+        # Per-key daily usage is persisted in the database, so restarts remember spent quota
+        self.scheduler = QuotaScheduler(self.db_path, self.api_keys, self.max_requests_per_day)
+        
+        # Table x batch units with their status, so interrupted runs can resume
+        self.run_plan = CollectionRunPlan(self.db_path, 'comprehensive')
+        
     def init_database(self):
         """Initialize SQLite database with proper schema."""
         logger.info(f"Initializing database: {self.db_path}")
         
-        conn = sqlite3.connect(self.db_path)
+        conn = connect(self.db_path)
         cursor = conn.cursor()
         
         # Create tables
@@ -77,21 +99,6 @@ class ComprehensiveACSCollector:
             )
         ''')
         
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS acs_data (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                variable_id TEXT,
-                county_name TEXT,
-                county_fips TEXT,
-                year INTEGER,
-                value REAL,
-                margin_of_error REAL,
-                data_type TEXT,
-                collected_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY (variable_id) REFERENCES acs_variables (variable_id)
-            )
-        ''')
-        
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS collection_log (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -105,92 +112,58 @@ class ComprehensiveACSCollector:
         ''')
         
         # Create indexes for better performance
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_data_variable ON acs_data (variable_id)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_data_county ON acs_data (county_name)')
-        cursor.execute('CREATE INDEX IF NOT EXISTS idx_data_year ON acs_data (year)')
         cursor.execute('CREATE INDEX IF NOT EXISTS idx_variables_table ON acs_variables (table_id)')
         
         conn.commit()
+        
+        # Collected values: integer-keyed acs_facts behind the acs_data view
+        # (older databases with an acs_data table are migrated)
+        init_data_schema(conn)
         conn.close()
         logger.info("Database initialized successfully")
     
-    def make_request(self, url: str, params: Dict = None) -> Dict:
-        """Make API request with rate limiting and error handling."""
-        if self.requests_made >= self.max_requests_per_day:
-            logger.error("Daily API limit reached!")
-            raise Exception("Daily API limit reached")
-        
-        time.sleep(self.request_delay)
-        self.requests_made += 1
-        
-        try:
-            response = requests.get(url, params=params, timeout=30)
-            response.raise_for_status()
-            data = response.json()
-            logger.info(f"API Response received: {len(data)} rows")
-            return data
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Request failed: {e}")
-            logger.error(f"Response status: {response.status_code}")
-            logger.error(f"Response text: {response.text}")
-            raise
-        except json.JSONDecodeError as e:
-            logger.error(f"JSON decode error: {e}")
-            logger.error(f"Response text: {response.text}")
-            raise
-    
-    def discover_all_tables(self) -> List[str]:
-        """Discover all available ACS 5-Year tables."""
-        logger.info("Discovering all ACS 5-Year tables...")
-        
-        # Get table list from Census API
-        url = f"{self.base_url}/{self.year}/{self.dataset}/groups"
-        data = self.make_request(url)
-        
-        tables = []
-        # The API returns {"groups": [...]}, so we need to access the groups array
-        if isinstance(data, dict) and 'groups' in data:
-            for group in data['groups']:
-                table_id = group.get('name', '')
-                if table_id and table_id.startswith(('B', 'C', 'S')):
-                    tables.append(table_id)
-        else:
-            # Fallback: if data is already an array
-            for group in data:
-                if isinstance(group, dict):
-                    table_id = group.get('name', '')
-                    if table_id and table_id.startswith(('B', 'C', 'S')):
-                        tables.append(table_id)
-        
-        logger.info(f"Discovered {len(tables)} tables")
-        return sorted(tables)
-    
-    def get_table_variables(self, table_id: str) -> List[Dict]:
-        """Get all variables for a specific table."""
-        logger.info(f"Getting variables for table {table_id}")
-        
-        url = f"{self.base_url}/{self.year}/{self.dataset}/groups/{table_id}"
-        data = self.make_request(url)
-        
-        variables = []
-        for var in data.get('variables', {}):
-            var_info = data['variables'][var]
-            # Skip metadata variables that aren't valid for data API
-            if var in ['NAME', 'GEO_ID']:
-                continue
-            variables.append({
-                'id': var,
-                'name': var_info.get('label', ''),
-                'description': var_info.get('concept', ''),
-                'type': 'estimate' if var.endswith('E') else 'margin_of_error' if var.endswith('M') else 'other'
-            })
-        
-        logger.info(f"Found {len(variables)} variables in table {table_id}")
-        return variables
+    def make_request(self, url: str, params: Dict = None, use_key: bool = False) -> Dict:
+        """Make API request with rate limiting and error handling.
+        
+        With use_key, the quota scheduler picks the key with the most remaining
+        budget; a 429 puts that key on cooldown and the request moves to another key.
+        """
+        while True:
+            request_params = dict(params or {})
+            try:
+                key = self.scheduler.acquire() if use_key else None
+            except QuotaExhausted:
+                logger.error("Daily API limit reached!")
+                raise
+            if key:
+                request_params['key'] = key
+            
+            time.sleep(self.request_delay)
+            self.requests_made += 1
+            
+            try:
+                response = requests.get(url, params=request_params, timeout=30)
+                response.raise_for_status()
+                data = response.json()
+                logger.info(f"API Response received: {len(data)} rows")
+                return data
+            except requests.exceptions.RequestException as e:
+                if key and getattr(e, 'response', None) is not None and e.response.status_code == 429:
+                    self.scheduler.report_rate_limited(key)
+                    continue
+                logger.error(f"Request failed: {e}")
+                if getattr(e, 'response', None) is not None:
+                    logger.error(f"Response status: {e.response.status_code}")
+                    logger.error(f"Response text: {e.response.text}")
+                raise
+            except json.JSONDecodeError as e:
+                logger.error(f"JSON decode error: {e}")
+                logger.error(f"Response text: {response.text}")
+                raise
     
     def store_table_info(self, table_id: str, table_name: str, variables: List[Dict]):
         """Store table and variable information in database."""
-        conn = sqlite3.connect(self.db_path)
+        conn = connect(self.db_path)
         cursor = conn.cursor()
         
         # Store table info
@@ -200,61 +173,15 @@ class ComprehensiveACSCollector:
         ''', (table_id, table_name, f"ACS 5-Year Table {table_id}", len(variables)))
         
         # Store variable info
-        for var in variables:
-            cursor.execute('''
-                INSERT OR REPLACE INTO acs_variables 
-                (variable_id, table_id, variable_name, variable_description, variable_type)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (var['id'], table_id, var['name'], var['description'], var['type']))
+        cursor.executemany('''
+            INSERT OR REPLACE INTO acs_variables 
+            (variable_id, table_id, variable_name, variable_description, variable_type)
+            VALUES (?, ?, ?, ?, ?)
+        ''', ((var['id'], table_id, var['name'], var['description'], var['type']) for var in variables))
         
         conn.commit()
         conn.close()
     
-    def collect_county_data(self, table_id: str, variables: List[Dict]) -> Dict:
-        """Collect data for all counties for a specific table."""
-        logger.info(f"Collecting data for table {table_id}")
-        
-        # Build variable list (both estimates and margins of error)
-        var_list = [var['id'] for var in variables if var['type'] in ['estimate', 'margin_of_error']]
-        
-        if not var_list:
-            logger.warning(f"No valid variables found for table {table_id}")
-            return {}
-        
-        # Build county FIPS list (just the county part, not full FIPS)
-        county_fips = list(self.counties.values())
-        
-        # Batch variables to avoid URL length limits (max ~50 variables per request)
-        batch_size = 50
-        all_data = {}
-        
-        for i in range(0, len(var_list), batch_size):
-            batch_vars = var_list[i:i + batch_size]
-            logger.info(f"Processing batch {i//batch_size + 1}/{(len(var_list) + batch_size - 1)//batch_size} ({len(batch_vars)} variables)")
-            
-            # Make API request for this batch
-            url = f"{self.base_url}/{self.year}/{self.dataset}"
-            params = {
-                'get': ','.join(batch_vars),
-                'for': 'county:' + ','.join(county_fips),
-                'in': f'state:{self.state_fips}',
-                'key': self.api_key
-            }
-            
-            try:
-                data = self.make_request(url, params)
-                batch_data = self.parse_county_data(table_id, data, batch_vars)
-                # Merge batch data into all_data
-                for county, county_data in batch_data.items():
-                    if county not in all_data:
-                        all_data[county] = {}
-                    all_data[county].update(county_data)
-            except Exception as e:
-                logger.error(f"Failed to collect batch data for table {table_id}: {e}")
-                continue
-        
-        return all_data
-    
     def parse_county_data(self, table_id: str, data: List, var_list: List[str]) -> Dict:
         """Parse API response and return structured data."""
         if not data or len(data) < 2:
@@ -293,100 +220,124 @@ class ComprehensiveACSCollector:
         
         return county_data
     
-    def store_county_data(self, table_id: str, county_data: Dict):
-        """Store collected county data in database."""
-        conn = sqlite3.connect(self.db_path)
+    def store_county_data(self, table_id: str, county_data: Dict, unit: Dict = None):
+        """Store collected county data in database.
+        
+        When a planned unit is given, its collection_log row is marked done in the
+        same transaction as the data.
+        """
+        started = time.perf_counter()
+        conn = connect(self.db_path)
         cursor = conn.cursor()
         
-        total_variables = 0
-        
-        for county_name, variables in county_data.items():
-            county_fips = self.counties[county_name]
-            
-            for var_id, value in variables.items():
-                # Determine data type
-                data_type = 'estimate' if var_id.endswith('E') else 'margin_of_error' if var_id.endswith('M') else 'other'
-                
-                cursor.execute('''
-                    INSERT INTO acs_data 
-                    (variable_id, county_name, county_fips, year, value, data_type)
-                    VALUES (?, ?, ?, ?, ?, ?)
-                ''', (var_id, county_name, county_fips, int(self.year), value, data_type))
-                
-                total_variables += 1
+        rows = list(county_data_rows(county_data, self.counties, self.year))
+        total_variables = len(rows)
+        # Upserts: values identical to the stored ones are not rewritten
+        changed = insert_data_rows(cursor, rows)
         
         # Log collection
-        cursor.execute('''
-            INSERT INTO collection_log 
-            (table_id, county_name, status, variables_collected)
-            VALUES (?, ?, ?, ?)
-        ''', (table_id, 'All Counties', 'Success', total_variables))
+        record_unit(cursor, unit or {'table_id': table_id}, total_variables)
         
         conn.commit()
         conn.close()
         
-        logger.info(f"Stored {total_variables} data points for table {table_id}")
+        elapsed = time.perf_counter() - started
+        logger.info(f"Stored {total_variables} data points ({changed} new or changed) for table {table_id} "
+                    f"({total_variables / elapsed if elapsed else 0:.0f} rows/s)")
+    
+    def load_table_variables(self) -> Dict[str, List[Dict]]:
+        """All tables and their variables, from one (cached) variables.json download per endpoint.
+        
+        Each table family is read from the endpoint that serves it (detailed,
+        subject, profile, comparison profile); endpoints and tables in the
+        negative cache are skipped.
+        """
+        tables = {}
+        for dataset, prefixes in table_datasets(self.dataset):
+            invalid = self.run_plan.invalid_tables(self.year, dataset)
+            if '*' in invalid:
+                continue
+            try:
+                metadata = fetch_variables(self.year, dataset, self.base_url, fetch=self.make_request)
+            except requests.exceptions.RequestException as e:
+                if not is_invalid_request(e):
+                    raise
+                # The endpoint does not exist for this year (e.g. no comparison profiles)
+                self.run_plan.mark_invalid(self.year, dataset, '*', str(e))
+                continue
+            for table_id, variables in group_variables(metadata, prefixes).items():
+                if table_id not in invalid:
+                    tables[table_id] = variables
+        logger.info(f"Found {len(tables)} tables in {self.year} metadata")
+        return tables
+    
+    def plan_collection(self, resume: bool = False) -> int:
+        """Persist the run plan (one unit per table batch) and return the run id.
+        
+        The plan comes from a single variables.json pass instead of one
+        groups/{table_id} request per table; tables already planned by a
+        resumed run are skipped.
+        """
+        run_id, status = self.run_plan.start_run(resume)
+        if status != 'planning':
+            return run_id
+        
+        planned = self.run_plan.planned_tables(run_id)
+        tables = self.load_table_variables()
+        logger.info(f"Planning {len(tables) - len(planned)} tables ({len(planned)} already planned)")
+        
+        units = []
+        for table_id, variables in tables.items():
+            if (self.year, table_id) in planned:
+                continue
+            self.store_table_info(table_id, f"Table {table_id}", variables)
+            units.extend(build_table_units(self.year, table_id, variables,
+                                           dataset=dataset_for_table(table_id, self.dataset)))
+        
+        self.run_plan.add_units(run_id, units)
+        self.run_plan.mark_planned(run_id)
+        return run_id
+    
+    def fetch_pack(self, pack: List[Dict]) -> List:
+        """Request one pack of planned units (possibly from several tables) for all counties."""
+        variables = [var for unit in pack for var in unit['variables']]
+        url = f"{self.base_url}/{pack[0]['year']}/{pack[0].get('dataset', self.dataset)}"
+        params = {
+            'get': ','.join(variables),
+            'for': 'county:' + ','.join(self.counties.values()),
+            'in': f'state:{self.state_fips}'
+        }
+        return self.make_request(url, params, use_key=True)
+    
+    def parse_pack(self, pack: List[Dict], data: List) -> Dict:
+        """Parse a pack's response into {county: {var_id: value}}."""
+        variables = [var for unit in pack for var in unit['variables']]
+        return self.parse_county_data(pack[0]['table_id'], data, variables)
     
-    def run_comprehensive_collection(self):
-        """Run the complete data collection process."""
+    def run_comprehensive_collection(self, resume: bool = False):
+        """Run the complete data collection process.
+        
+        Requests, parsing and database writes run as separate pipeline stages
+        (see collection_pipeline), so the network and the disk overlap.
+        """
         logger.info("Starting comprehensive ACS data collection...")
         start_time = datetime.now()
         
         try:
-            # Discover all tables
-            tables = self.discover_all_tables()
-            logger.info(f"Will collect data from {len(tables)} tables")
+            run_id = self.plan_collection(resume)
+            units = self.run_plan.pending_units(run_id)
+            # Small tables share requests; results are routed back to each table's unit
+            packs = pack_units(units)
+            logger.info(f"Will collect {len(units)} units in {len(packs)} requests in run {run_id}")
             
-            successful_tables = 0
-            failed_tables = 0
+            pipeline = CollectionPipeline(self.db_path, self.counties, self.fetch_pack, self.parse_pack)
+            # A first load into an empty acs_data builds its indexes once at the end
+            with deferred_indexes(self.db_path):
+                stats = pipeline.run(packs)
             
-            for i, table_id in enumerate(tables, 1):
-                logger.info(f"Processing table {i}/{len(tables)}: {table_id}")
-                
-                try:
-                    # Get variables for this table
-                    variables = self.get_table_variables(table_id)
-                    
-                    if not variables:
-                        logger.warning(f"No variables found for table {table_id}")
-                        continue
-                    
-                    # Store table and variable info
-                    self.store_table_info(table_id, f"Table {table_id}", variables)
-                    
-                    # Collect county data
-                    county_data = self.collect_county_data(table_id, variables)
-                    
-                    if county_data:
-                        # Store county data
-                        self.store_county_data(table_id, county_data)
-                        successful_tables += 1
-                        logger.info(f"Successfully collected data for table {table_id}")
-                    else:
-                        logger.warning(f"No data collected for table {table_id}")
-                        failed_tables += 1
-                    
-                    # Progress update
-                    if i % 10 == 0:
-                        elapsed = datetime.now() - start_time
-                        logger.info(f"Progress: {i}/{len(tables)} tables processed. "
-                                  f"Successful: {successful_tables}, Failed: {failed_tables}. "
-                                  f"Elapsed: {elapsed}")
-                    
-                except Exception as e:
-                    logger.error(f"Failed to process table {table_id}: {e}")
-                    failed_tables += 1
-                    
-                    # Log failure
-                    conn = sqlite3.connect(self.db_path)
-                    cursor = conn.cursor()
-                    cursor.execute('''
-                        INSERT INTO collection_log 
-                        (table_id, county_name, status, error_message)
-                        VALUES (?, ?, ?, ?)
-                    ''', (table_id, 'All Counties', 'Failed', str(e)))
-                    conn.commit()
-                    conn.close()
+            if self.run_plan.finish_run(run_id):
+                # Only complete runs become visible to the web app
+                self.publish_snapshot()
             
             # Final summary
             end_time = datetime.now()
@@ -394,19 +345,85 @@ class ComprehensiveACSCollector:
             
             logger.info("=" * 60)
             logger.info("COLLECTION COMPLETE!")
-            logger.info(f"Total tables processed: {len(tables)}")
-            logger.info(f"Successful: {successful_tables}")
-            logger.info(f"Failed: {failed_tables}")
+            logger.info(f"Run {run_id}: {self.run_plan.progress(run_id)}")
+            logger.info(f"Units processed this session: {stats['successful_units'] + stats['failed_units']}")
+            logger.info(f"Successful: {stats['successful_units']}")
+            logger.info(f"Failed: {stats['failed_units']}")
+            logger.info(f"Rows written: {stats['rows_written']} in {stats['transactions']} transactions "
+                        f"({stats['rows_per_second']} rows/s)")
             logger.info(f"Total time: {total_time}")
             logger.info(f"API requests made: {self.requests_made}")
             logger.info("=" * 60)
             
             # Database summary
             self.print_database_summary()
+            return stats
             
         except Exception as e:
             logger.error(f"Collection failed: {e}")
             raise
+        finally:
+            # Hand back requests reserved for this run but not made
+            self.scheduler.release()
+    
+    def run_async_collection(self, concurrency: int = 8, requests_per_second: float = 5.0, resume: bool = False):
+        """Run the collection with many requests in flight (see async_collector)."""
+        logger.info(f"Starting async ACS data collection ({concurrency} concurrent requests)...")
+        start_time = datetime.now()
+        
+        engine = AsyncCollectionEngine(
+            self.db_path, self.api_keys, self.counties, self.state_fips,
+            base_url=self.base_url, dataset=self.dataset,
+            concurrency=concurrency, requests_per_second=requests_per_second,
+            scheduler=self.scheduler
+        )
+        
+        run_id = self.plan_collection(resume)
+        units = self.run_plan.pending_units(run_id)
+        
+        with deferred_indexes(self.db_path):
+            stats = engine.run(units)
+        self.requests_made += engine.requests_made
+        if self.run_plan.finish_run(run_id):
+            # Only complete runs become visible to the web app
+            self.publish_snapshot()
+        
+        logger.info("=" * 60)
+        logger.info("ASYNC COLLECTION COMPLETE!")
+        logger.info(f"Run {run_id}: {self.run_plan.progress(run_id)}")
+        logger.info(f"Units: {stats['units']} in {stats['requests']} requests (successful: {stats['successful_units']}, failed: {stats['failed_units']})")
+        logger.info(f"Rows written: {stats['rows_written']} ({stats['rows_per_second']} rows/s)")
+        logger.info(f"Total time: {datetime.now() - start_time}")
+        logger.info(f"API requests made: {self.requests_made}")
+        logger.info("=" * 60)
+        
+        self.print_database_summary()
+        return stats
+    
+    def run_summary_file_ingestion(self, directory: str, tables: List[str] = None, workers: int = 1):
+        """Load the Census summary files in directory instead of calling the API (see summary_files).
+        
+        Files are parsed in this process (or a pool of workers processes) and
+        stored by the same single writer as API results; no requests are made.
+        """
+        logger.info(f"Starting offline ingestion of summary files from {directory}...")
+        start_time = datetime.now()
+        
+        stats = ingest_summary_files(self.db_path, directory, [self.year], self.counties, self.state_fips,
+                                     tables, workers)
+        if stats['successful_units']:
+            self.publish_snapshot()
+        
+        logger.info("=" * 60)
+        logger.info("SUMMARY FILE INGESTION COMPLETE!")
+        logger.info(f"Files: {stats['units']} (successful: {stats['successful_units']}, failed: {stats['failed_units']})")
+        logger.info(f"Rows written: {stats['rows_written']} in {stats['transactions']} transactions "
+                    f"({stats['rows_per_second']} rows/s)")
+        logger.info(f"Total time: {datetime.now() - start_time}")
+        logger.info("=" * 60)
+        
+        self.print_database_summary()
+        return stats
     
     def print_database_summary(self):
         """Print summary of collected data."""
@@ -420,32 +437,73 @@ class ComprehensiveACSCollector:
         cursor.execute("SELECT COUNT(*) FROM acs_variables")
         variable_count = cursor.fetchone()[0]
         
-        cursor.execute("SELECT COUNT(*) FROM acs_data")
-        data_count = cursor.fetchone()[0]
-        
-        cursor.execute("SELECT COUNT(DISTINCT county_name) FROM acs_data")
-        county_count = cursor.fetchone()[0]
+        # Data counts come from the stats table the writers maintain, not a scan of the values
+        stats = data_stats(conn)
         
         logger.info("DATABASE SUMMARY:")
         logger.info(f"Tables: {table_count}")
         logger.info(f"Variables: {variable_count}")
-        logger.info(f"Data points: {data_count}")
-        logger.info(f"Counties: {county_count}")
+        logger.info(f"Data points: {stats['total_values']}")
+        logger.info(f"Counties: {len(stats['counties'])}")
+        logger.info(f"Last collected: {stats['last_collected']}")
         
         conn.close()
+    
+    def recompute_stats(self):
+        """Rebuild the data statistics table from a full scan and print the summary."""
+        conn = connect(self.db_path)
+        rebuild_data_stats(conn)
+        conn.close()
+        self.print_database_summary()
+    
+    def publish_snapshot(self):
+        """Validate and publish the collected data as the web app's next snapshot (see acs_snapshots)."""
+        try:
+            # Another collector's unfinished run in the shared database does not block this one
+            publish_snapshot(self.db_path, self.snapshot_dir, collector=self.run_plan.collector)
+        except SnapshotInvalid as e:
+            logger.error(str(e))
 
 
 def main():
     """Main function to run the comprehensive data collection."""
-    # You'll need to set your Census API key
-    api_key = os.getenv('CENSUS_API_KEY')
+    parser = argparse.ArgumentParser(description="Collect all ACS 5-Year tables for the configured counties")
+    parser.add_argument("--concurrency", type=int, default=1,
+                        help="Requests in flight; above 1 uses the async collection engine")
+    parser.add_argument("--rate", type=float, default=5.0,
+                        help="Requests per second per API key (async engine only)")
+    parser.add_argument("--resume", action="store_true",
+                        help="Continue the last unfinished run, collecting only pending or failed units")
+    parser.add_argument("--recompute", action="store_true",
+                        help="Rebuild the data statistics table from scratch, print the summary and exit")
+    parser.add_argument("--summary-files", metavar="DIR",
+                        help="Load Census summary files (acsdt5y<year>-<table>.dat) from DIR instead of calling the API")
+    parser.add_argument("--tables", nargs="+", help="Only these tables (with --summary-files)")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="Processes parsing summary files (default: 1, parse in this process)")
+    args = parser.parse_args()
+    
+    # You'll need to set your Census API key (CENSUS_API_KEY, CENSUS_API_KEYS or api_keys.txt)
+    api_keys = load_api_keys('api_keys.txt')
+    
+    if args.recompute or args.summary_files:
+        # No requests are made, so no key is needed
+        collector = ComprehensiveACSCollector(api_keys[0] if api_keys else '', api_keys=api_keys[1:])
+        if args.summary_files:
+            collector.run_summary_file_ingestion(args.summary_files, args.tables, args.workers)
+        else:
+            collector.recompute_stats()
+        return
     
-    if not api_key:
+    if not api_keys:
         logger.error("Please set CENSUS_API_KEY environment variable")
         return
     
-    collector = ComprehensiveACSCollector(api_key)
-    collector.run_comprehensive_collection()
+    collector = ComprehensiveACSCollector(api_keys[0], api_keys=api_keys[1:])
+    if args.concurrency > 1:
+        collector.run_async_collection(args.concurrency, args.rate, resume=args.resume)
+    else:
+        collector.run_comprehensive_collection(resume=args.resume)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,140 @@
+import re
+import time
+from array import array
+from functools import lru_cache
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+WORD_RE = re.compile(r'[a-z0-9]+')
+# Posting entries walked between two checks of the lookup limits
+POSTING_CHUNK = 4096
+
+
+def tokenize(text: str) -> List[str]:
+    """Split a label or concept into lowercase search terms"""
+    return WORD_RE.findall((text or '').lower())
+
+
+def trigrams(word: str) -> List[str]:
+    """Return the distinct padded trigrams of a word (pg_trgm style)"""
+    padded = f"  {word} "
+    return sorted({padded[i:i + 3] for i in range(len(padded) - 2)})
+
+
+@lru_cache(maxsize=65536)
+def _gram_set(word: str) -> frozenset:
+    return frozenset(trigrams(word))
+
+
+def similarity(a: str, b: str) -> float:
+    """Trigram similarity of two words (shared / all distinct trigrams)"""
+    grams_a, grams_b = _gram_set(a), _gram_set(b)
+    if not grams_a or not grams_b:
+        return 0.0
+    shared = len(grams_a & grams_b)
+    return shared / (len(grams_a) + len(grams_b) - shared)
+
+
+def text_similarity(words: List[str], text: str) -> float:
+    """Mean, over the query words, of each word's best trigram similarity to a term of text"""
+    terms = set(tokenize(text))
+    if not words or not terms:
+        return 0.0
+    return sum(max(similarity(word, term) for term in terms) for word in words) / len(words)
+
+
+def rank_by_similarity(search_term: str, rows: List, text: Callable[[object], str]) -> List:
+    """rows ordered by text_similarity of text(row) to search_term, best first (ties keep their order)"""
+    words = tokenize(search_term)
+    scored = [(-text_similarity(words, text(row)), index, row) for index, row in enumerate(rows)]
+    scored.sort(key=lambda item: item[:2])
+    return [row for _, _, row in scored]
+
+
+class TrigramIndex:
+    """In-memory trigram index over the label/concept vocabulary.
+
+    Each trigram maps to an array of integer term ids, so the whole index stays
+    compact and candidate generation is a walk over a handful of posting lists.
+    """
+
+    def __init__(self, terms: Iterable[Tuple[str, int]]):
+        self.terms = []
+        self.frequencies = array('I')
+        self.gram_counts = array('H')
+        self.term_ids = {}
+        self.postings = {}
+
+        for term, frequency in terms:
+            term_id = len(self.terms)
+            grams = trigrams(term)
+            self.terms.append(term)
+            self.frequencies.append(min(int(frequency or 0), 0xFFFFFFFF))
+            self.gram_counts.append(min(len(grams), 0xFFFF))
+            self.term_ids[term] = term_id
+            for gram in grams:
+                posting = self.postings.get(gram)
+                if posting is None:
+                    posting = self.postings[gram] = array('I')
+                posting.append(term_id)
+
+    def __len__(self):
+        return len(self.terms)
+
+    def __contains__(self, term: str):
+        return term in self.term_ids
+
+    def lookup(self, word: str, limit: int = 5, min_similarity: float = 0.25,
+               max_postings: int = 20000, deadline: Optional[float] = None) -> List[Tuple[str, float]]:
+        """Return vocabulary terms similar to word, best first.
+
+        Candidate generation is bounded: posting lists are visited rarest first
+        and the walk stops after max_postings entries or once deadline (a
+        time.monotonic() value) has passed. Both limits are checked every
+        POSTING_CHUNK entries, so one huge posting list cannot overrun them.
+        """
+        word = word.lower()
+        query_grams = trigrams(word)
+        if not query_grams:
+            return []
+
+        lists = sorted((self.postings[g] for g in query_grams if g in self.postings), key=len)
+        shared = {}
+        visited = 0
+        exhausted = lambda: visited >= max_postings or (deadline and time.monotonic() > deadline)
+        for posting in lists:
+            for start in range(0, len(posting), POSTING_CHUNK):
+                if exhausted():
+                    break
+                chunk = posting[start:start + min(POSTING_CHUNK, max_postings - visited)]
+                for term_id in chunk:
+                    shared[term_id] = shared.get(term_id, 0) + 1
+                visited += len(chunk)
+            if exhausted():
+                break
+
+        query_count = len(query_grams)
+        scored = []
+        for term_id, count in shared.items():
+            similarity = count / (query_count + self.gram_counts[term_id] - count)
+            if similarity >= min_similarity:
+                scored.append((similarity, self.frequencies[term_id], self.terms[term_id]))
+
+        scored.sort(key=lambda item: (-item[0], -item[1]))
+        return [(term, round(similarity, 4)) for similarity, _, term in scored[:limit]]
+
+    def correct_query(self, search_term: str, time_budget_ms: float = 50,
+                      min_similarity: float = 0.25) -> Tuple[str, Dict[str, List[Tuple[str, float]]]]:
+        """Replace unknown words in search_term with their closest vocabulary terms"""
+        deadline = time.monotonic() + time_budget_ms / 1000.0
+        corrected = []
+        suggestions = {}
+        for word in search_term.split():
+            key = word.lower()
+            # Known terms, IDs and very short words are kept as typed
+            if key in self.term_ids or len(key) < 3 or any(ch.isdigit() for ch in key):
+                corrected.append(word)
+                continue
+            matches = self.lookup(key, min_similarity=min_similarity, deadline=deadline)
+            suggestions[word] = matches
+            corrected.append(matches[0][0] if matches else word)
+        return ' '.join(corrected), suggestions
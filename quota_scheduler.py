@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Multi-key Census API quota scheduler.
+Spreads requests across every available API key by remaining daily budget,
+persists per-key usage in SQLite so restarts remember what each key has spent,
+and puts keys that get HTTP 429 on cooldown. Usage is reserved in small blocks
+(leases), so handing out a key is an in-memory operation most of the time.
+"""
+
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def load_api_keys(path: str = "api_keys.txt") -> List[str]:
+    """Load API keys from CENSUS_API_KEYS / CENSUS_API_KEY and the keys file (one per line)."""
+    keys = []
+    env_keys = os.environ.get("CENSUS_API_KEYS", "")
+    keys.extend(k.strip() for k in env_keys.replace(",", " ").split() if k.strip())
+    if os.environ.get("CENSUS_API_KEY"):
+        keys.append(os.environ["CENSUS_API_KEY"].strip())
+    if path and os.path.exists(path):
+        with open(path, "r") as f:
+            keys.extend(line.strip() for line in f if line.strip() and not line.startswith("#"))
+    # De-duplicate, keeping the first occurrence order
+    return list(dict.fromkeys(keys))
+
+
+def key_id(api_key: str) -> str:
+    """Stable, non-secret identifier for a key (what gets stored and logged)."""
+    return hashlib.sha1(api_key.encode("utf-8")).hexdigest()[:12]
+
+
+class QuotaExhausted(Exception):
+    """Raised when every key is out of daily budget or cooling down."""
+
+
+class QuotaScheduler:
+    def __init__(self, db_path: str, api_keys: List[str], daily_limit: int = 500,
+                 cooldown_seconds: Optional[float] = None, lease_size: int = 10):
+        self.db_path = db_path
+        self.api_keys = list(dict.fromkeys(api_keys))
+        self.key_ids = {key: key_id(key) for key in self.api_keys}
+        self.daily_limit = daily_limit
+        # None: a 429 benches the key until the daily quota resets (midnight UTC)
+        self.cooldown_seconds = cooldown_seconds
+        # Requests are reserved in the database lease_size at a time and handed out from memory;
+        # a crashed process forfeits at most lease_size requests per key for the day
+        self.lease_size = max(1, lease_size)
+        self._leased = {}          # key -> reserved by this process, not used yet
+        self._remaining = {}       # key -> unreserved budget at the last reservation
+        self._cooldown_until = {}  # key -> cooldown end known to this process
+        self._lease_date = None    # usage_date the leases were reserved on
+        self._lock = threading.Lock()
+        self.init_database()
+
+    def init_database(self):
+        """Create the per-key usage table."""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        cursor = conn.cursor()
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS api_key_usage (
+                key_id TEXT,
+                usage_date TEXT,
+                requests INTEGER DEFAULT 0,
+                rate_limited INTEGER DEFAULT 0,
+                cooldown_until REAL DEFAULT 0,
+                last_used_at TIMESTAMP,
+                PRIMARY KEY (key_id, usage_date)
+            )
+        ''')
+        conn.commit()
+        conn.close()
+
+    @staticmethod
+    def today() -> str:
+        return datetime.now(timezone.utc).strftime("%Y-%m-%d")
+
+    def _usage(self, cursor) -> Dict[str, Dict]:
+        cursor.execute('''
+            SELECT key_id, requests, rate_limited, cooldown_until FROM api_key_usage WHERE usage_date = ?
+        ''', (self.today(),))
+        return {row[0]: {'requests': row[1], 'rate_limited': row[2], 'cooldown_until': row[3]}
+                for row in cursor.fetchall()}
+
+    def acquire(self) -> Optional[str]:
+        """Take one request on the key with the most remaining budget.
+
+        Every key that is not cooling down competes on its leased plus
+        unreserved budget, so consecutive requests rotate across keys instead
+        of draining one key's lease first. When the chosen key holds no lease,
+        a block of up to lease_size is reserved for it in one short
+        transaction (see _reserve); most calls never touch SQLite. Returns
+        None when there are no keys configured (keyless requests); raises
+        QuotaExhausted when every key is spent or cooling down.
+        """
+        if not self.api_keys:
+            return None
+        now = time.time()
+        with self._lock:
+            if self._lease_date != self.today():
+                # A new quota day: leases reserved on the previous day's row no longer count
+                self._leased.clear()
+                self._remaining.clear()
+                self._lease_date = self.today()
+            # Each failed reservation refreshes every key's budget, so this ends within one pass per key
+            for _ in range(len(self.api_keys) + 1):
+                candidates = [key for key in self.api_keys if self._cooldown_until.get(key, 0) <= now
+                              and self._leased.get(key, 0) + self._remaining.get(key, self.daily_limit) > 0]
+                if not candidates:
+                    break
+                best_key = max(candidates,
+                               key=lambda key: self._leased.get(key, 0) + self._remaining.get(key, self.daily_limit))
+                if self._leased.get(best_key) or self._reserve(best_key, now):
+                    self._leased[best_key] -= 1
+                    return best_key
+        raise QuotaExhausted("All API keys exhausted or cooling down")
+
+    def _reserve(self, api_key: str, now: float) -> bool:
+        """Reserve a block of requests on api_key; False if it has no budget left or is cooling down.
+
+        Also refreshes every key's unreserved budget and cooldown from the
+        database, which other processes may have changed.
+        """
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            cursor = conn.cursor()
+            # IMMEDIATE takes the write lock up front, so concurrent processes never double-book a key
+            cursor.execute('BEGIN IMMEDIATE')
+            usage = self._usage(cursor)
+            for key in self.api_keys:
+                row = usage.get(self.key_ids[key], {'requests': 0, 'cooldown_until': 0})
+                self._cooldown_until[key] = row['cooldown_until'] or 0
+                self._remaining[key] = max(self.daily_limit - row['requests'], 0)
+            if self._cooldown_until[api_key] > now or not self._remaining[api_key]:
+                conn.rollback()
+                return False
+            block = min(self.lease_size, self._remaining[api_key])
+            cursor.execute('''
+                INSERT INTO api_key_usage (key_id, usage_date, requests, last_used_at)
+                VALUES (?, ?, ?, CURRENT_TIMESTAMP)
+                ON CONFLICT (key_id, usage_date) DO UPDATE SET
+                    requests = requests + excluded.requests, last_used_at = CURRENT_TIMESTAMP
+            ''', (self.key_ids[api_key], self.today(), block))
+            conn.commit()
+        finally:
+            conn.close()
+        self._leased[api_key] = self._leased.get(api_key, 0) + block
+        self._remaining[api_key] -= block
+        return True
+
+    def release(self):
+        """Give this process's unused reserved requests back (call when a run ends)."""
+        with self._lock:
+            unused = {key: count for key, count in self._leased.items() if count}
+            self._leased.clear()
+            if not unused or self._lease_date != self.today():
+                return
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.executemany('''
+                UPDATE api_key_usage SET requests = MAX(requests - ?, 0) WHERE key_id = ? AND usage_date = ?
+            ''', [(count, self.key_ids[key], self.today()) for key, count in unused.items()])
+            conn.commit()
+            conn.close()
+
+    def report_rate_limited(self, api_key: str):
+        """Put a key that returned HTTP 429 on cooldown (its unused reserved requests are given back)."""
+        if not api_key:
+            return
+        if self.cooldown_seconds is None:
+            tomorrow = (datetime.now(timezone.utc) + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+            cooldown_until = tomorrow.timestamp()
+        else:
+            cooldown_until = time.time() + self.cooldown_seconds
+        with self._lock:
+            unused = self._leased.pop(api_key, 0)
+            self._cooldown_until[api_key] = cooldown_until
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.execute('''
+                INSERT INTO api_key_usage (key_id, usage_date, requests, rate_limited, cooldown_until)
+                VALUES (?, ?, 0, 1, ?)
+                ON CONFLICT (key_id, usage_date) DO UPDATE SET
+                    requests = MAX(requests - ?, 0), rate_limited = rate_limited + 1,
+                    cooldown_until = excluded.cooldown_until
+            ''', (self.key_ids[api_key], self.today(), cooldown_until, unused))
+            conn.commit()
+            conn.close()
+        logger.warning(f"API key {self.key_ids[api_key]} rate limited; cooling down until "
+                       f"{datetime.fromtimestamp(cooldown_until).strftime('%Y-%m-%d %H:%M:%S')}")
+
+    def remaining_budget(self) -> int:
+        """Total requests still available today across keys that are not cooling down."""
+        return sum(row['remaining'] for row in self.usage_summary() if not row['cooling_down'])
+
+    def usage_summary(self) -> List[Dict]:
+        """Per-key usage for today."""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        usage = self._usage(conn.cursor())
+        conn.close()
+        now = time.time()
+        summary = []
+        for key in self.api_keys:
+            row = usage.get(self.key_ids[key], {'requests': 0, 'rate_limited': 0, 'cooldown_until': 0})
+            # Requests this process reserved but has not made yet are still available
+            requests = max(row['requests'] - self._leased.get(key, 0), 0)
+            summary.append({
+                'key_id': self.key_ids[key],
+                'requests': requests,
+                'remaining': max(self.daily_limit - requests, 0),
+                'rate_limited': row['rate_limited'],
+                'cooling_down': bool(row['cooldown_until'] and row['cooldown_until'] > now)
+            })
+        return summary
+
+    def log_summary(self):
+        for row in self.usage_summary():
+            logger.info(f"API key {row['key_id']}: {row['requests']} used today, {row['remaining']} remaining"
+                        + (" (cooling down)" if row['cooling_down'] else ""))
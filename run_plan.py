@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+Persisted collection run plans.
+A run is planned as table x year x batch units stored in collection_log with a
+status; each unit is marked done in the same transaction that writes its data,
+so an interrupted run can be resumed without re-collecting finished units.
+Requests the API rejects as invalid are remembered in invalid_requests so they
+are never planned again: a rejected unit by its table and exact variable list
+(one bad variable must not drop the rest of its table), a missing endpoint as '*'.
+"""
+
+import logging
+import sqlite3
+from typing import Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Columns added to the collectors' collection_log table for planned units
+PLAN_COLUMNS = {
+    'run_id': 'INTEGER',
+    'year': 'TEXT',
+    'dataset': 'TEXT',
+    'unit_index': 'INTEGER',
+    'variables': 'TEXT',
+    'updated_at': 'TIMESTAMP'
+}
+
+
+# HTTP statuses meaning the request itself is wrong (unknown variable or endpoint), not transient
+INVALID_REQUEST_STATUSES = (400, 404)
+
+
+def is_invalid_request(error: Exception) -> bool:
+    """Whether an exception is an API rejection that retrying can never fix."""
+    response = getattr(error, 'response', None)
+    return getattr(response, 'status_code', None) in INVALID_REQUEST_STATUSES
+
+
+def invalid_unit_key(unit: Dict) -> str:
+    """invalid_requests key of a rejected unit: its table and exact variable list."""
+    return f"{unit['table_id']}:{','.join(unit['variables'])}"
+
+
+def record_unit(cursor, unit: Dict, variables_collected: int, error: str = None) -> str:
+    """Record a finished unit in collection_log using the caller's transaction; returns its status.
+
+    Planned units (with a log_id) have their row updated; ad-hoc units get a
+    new log row as before. A unit that collected nothing without an error is
+    Failed ('No data returned'), so --resume retries it. Units flagged
+    invalid are marked Invalid (never retried) and added to the negative cache.
+    """
+    if not variables_collected and not error:
+        error = 'No data returned'
+    status = 'Invalid' if unit.get('invalid') else 'Failed' if error else 'Success'
+    if unit.get('invalid'):
+        cursor.execute('''
+            INSERT OR REPLACE INTO invalid_requests (year, dataset, table_id, reason)
+            VALUES (?, ?, ?, ?)
+        ''', (str(unit['year']), unit.get('dataset', ''), invalid_unit_key(unit), error))
+    if unit.get('log_id'):
+        cursor.execute('''
+            UPDATE collection_log
+            SET status = ?, variables_collected = ?, error_message = ?, updated_at = CURRENT_TIMESTAMP
+            WHERE id = ?
+        ''', (status, variables_collected, error, unit['log_id']))
+    else:
+        cursor.execute('''
+            INSERT INTO collection_log
+            (table_id, county_name, status, variables_collected, error_message)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (unit['table_id'], 'All Counties', status, variables_collected, error))
+    return status
+
+
+class CollectionRunPlan:
+    def __init__(self, db_path: str, collector: str):
+        self.db_path = db_path
+        self.collector = collector
+        self.init_database()
+
+    def init_database(self):
+        """Create the runs table and add the plan columns to collection_log."""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        cursor = conn.cursor()
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS collection_runs (
+                run_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                collector TEXT,
+                status TEXT,
+                units INTEGER DEFAULT 0,
+                started_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                finished_at TIMESTAMP
+            )
+        ''')
+        # Negative cache: table_id '*' means the dataset does not exist for that year,
+        # 'B01001:B01001_001E,...' (invalid_unit_key) one rejected unit
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS invalid_requests (
+                year TEXT,
+                dataset TEXT,
+                table_id TEXT,
+                reason TEXT,
+                recorded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (year, dataset, table_id)
+            )
+        ''')
+        cursor.execute("PRAGMA table_info(collection_log)")
+        existing = {row[1] for row in cursor.fetchall()}
+        for column, column_type in PLAN_COLUMNS.items():
+            if column not in existing:
+                cursor.execute(f"ALTER TABLE collection_log ADD COLUMN {column} {column_type}")
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_log_run_status ON collection_log (run_id, status)')
+        conn.commit()
+        conn.close()
+
+    def start_run(self, resume: bool = False) -> Tuple[int, str]:
+        """Return (run_id, status) of the run to work on.
+
+        With resume, the latest unfinished run for this collector is picked up;
+        otherwise unfinished runs are superseded and a new run is started.
+        """
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT run_id, status FROM collection_runs
+            WHERE collector = ? AND status IN ('planning', 'running')
+            ORDER BY run_id DESC LIMIT 1
+        ''', (self.collector,))
+        row = cursor.fetchone()
+        if resume and row:
+            conn.close()
+            logger.info(f"Resuming run {row[0]} ({row[1]}): {self.progress(row[0])}")
+            return row[0], row[1]
+        if resume:
+            logger.info("No unfinished run to resume; starting a new run")
+        cursor.execute('''
+            UPDATE collection_runs SET status = 'superseded', finished_at = CURRENT_TIMESTAMP
+            WHERE collector = ? AND status IN ('planning', 'running')
+        ''', (self.collector,))
+        cursor.execute("INSERT INTO collection_runs (collector, status) VALUES (?, 'planning')", (self.collector,))
+        run_id = cursor.lastrowid
+        conn.commit()
+        conn.close()
+        logger.info(f"Started collection run {run_id}")
+        return run_id, 'planning'
+
+    def planned_tables(self, run_id: int) -> Set[Tuple[str, str]]:
+        """(year, table_id) pairs already in the plan."""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        cursor = conn.cursor()
+        cursor.execute('SELECT DISTINCT year, table_id FROM collection_log WHERE run_id = ?', (run_id,))
+        planned = {(row[0], row[1]) for row in cursor.fetchall()}
+        conn.close()
+        return planned
+
+    def add_units(self, run_id: int, units: List[Dict]):
+        """Persist units as Pending in one transaction and tag them with their log_id.
+
+        Units the API already rejected (see invalid_unit_key) are not planned.
+        """
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        cursor = conn.cursor()
+        cursor.execute("SELECT year, dataset, table_id FROM invalid_requests WHERE table_id LIKE '%:%'")
+        rejected = set(cursor.fetchall())
+        planned = [unit for unit in units
+                   if (str(unit['year']), unit.get('dataset', ''), invalid_unit_key(unit)) not in rejected]
+        if len(planned) < len(units):
+            logger.info(f"Skipping {len(units) - len(planned)} units the API rejected before")
+        units = planned
+        for index, unit in enumerate(units):
+            cursor.execute('''
+                INSERT INTO collection_log
+                (table_id, county_name, status, variables_collected, run_id, year, dataset,
+                 unit_index, variables, updated_at)
+                VALUES (?, 'All Counties', 'Pending', 0, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+            ''', (unit['table_id'], run_id, str(unit['year']), unit.get('dataset'),
+                  unit.get('unit_index', index), ','.join(unit['variables'])))
+            unit['log_id'] = cursor.lastrowid
+            unit['run_id'] = run_id
+        cursor.execute('UPDATE collection_runs SET units = units + ? WHERE run_id = ?', (len(units), run_id))
+        conn.commit()
+        conn.close()
+
+    def mark_planned(self, run_id: int):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.execute("UPDATE collection_runs SET status = 'running' WHERE run_id = ? AND status = 'planning'", (run_id,))
+        conn.commit()
+        conn.close()
+
+    def pending_units(self, run_id: int, year: Optional[str] = None) -> List[Dict]:
+        """Units of a run that are still Pending or Failed, in plan order."""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        cursor = conn.cursor()
+        query = '''
+            SELECT id, year, dataset, table_id, unit_index, variables FROM collection_log
+            WHERE run_id = ? AND status IN ('Pending', 'Failed')
+        '''
+        params = [run_id]
+        if year is not None:
+            query += ' AND year = ?'
+            params.append(str(year))
+        cursor.execute(query + ' ORDER BY id', params)
+        units = []
+        for log_id, unit_year, dataset, table_id, unit_index, variables in cursor.fetchall():
+            unit = {'log_id': log_id, 'run_id': run_id, 'year': unit_year, 'table_id': table_id,
+                    'unit_index': unit_index, 'variables': variables.split(',') if variables else []}
+            if dataset:
+                unit['dataset'] = dataset
+            units.append(unit)
+        conn.close()
+        return units
+
+    def invalid_tables(self, year, dataset: str) -> Set[str]:
+        """Negative-cache keys of a year and dataset: '*' (the whole dataset) or rejected units' keys."""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        cursor = conn.cursor()
+        cursor.execute('SELECT table_id FROM invalid_requests WHERE year = ? AND dataset = ?', (str(year), dataset))
+        invalid = {row[0] for row in cursor.fetchall()}
+        conn.close()
+        return invalid
+
+    def mark_invalid(self, year, dataset: str, table_id: str, reason: str):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        conn.execute('''
+            INSERT OR REPLACE INTO invalid_requests (year, dataset, table_id, reason) VALUES (?, ?, ?, ?)
+        ''', (str(year), dataset, table_id, reason))
+        conn.commit()
+        conn.close()
+        logger.warning(f"Marked {dataset} {table_id} ({year}) invalid: {reason}")
+
+    def mark_failed(self, unit: Dict, error: str):
+        """Record a unit that produced no data."""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        record_unit(conn.cursor(), unit, 0, error)
+        conn.commit()
+        conn.close()
+
+    def progress(self, run_id: int) -> Dict[str, int]:
+        """Unit counts by status."""
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        cursor = conn.cursor()
+        cursor.execute('SELECT status, COUNT(*) FROM collection_log WHERE run_id = ? GROUP BY status', (run_id,))
+        counts = dict(cursor.fetchall())
+        conn.close()
+        return counts
+
+    def finish_run(self, run_id: int) -> bool:
+        """Mark the run complete if no units are left; returns whether it is complete."""
+        counts = self.progress(run_id)
+        remaining = counts.get('Pending', 0) + counts.get('Failed', 0)
+        if remaining:
+            logger.info(f"Run {run_id}: {remaining} units still pending or failed; rerun with --resume to continue")
+            return False
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        # A run still in planning has tables left to plan, so it is not complete yet
+        cursor = conn.execute('''
+            UPDATE collection_runs SET status = 'complete', finished_at = CURRENT_TIMESTAMP
+            WHERE run_id = ? AND status = 'running'
+        ''', (run_id,))
+        if not cursor.rowcount:
+            conn.close()
+            logger.info(f"Run {run_id}: plan is incomplete; rerun with --resume to continue")
+            return False
+        conn.commit()
+        conn.close()
+        logger.info(f"Run {run_id} complete")
+        return True
@@ -0,0 +1,222 @@
+import sqlite3
+import copy
+import json
+import time
+import threading
+from collections import OrderedDict
+from typing import Callable, Dict, Optional
+
+
+class SearchCache:
+    """Bounded LRU/TTL cache for variable search results.
+
+    Entries are keyed on the normalized query, limit and filters and are tagged
+    with the catalog version they were computed against, so bumping the version
+    (see ACSDatabase.populate_from_api) invalidates everything at once. A small
+    SQLite store sits behind the in-process LRU so gunicorn workers share hits.
+    Shared hits never write on the lookup path: their last_used times are
+    batched into the next store write. Callers always get a copy of the
+    cached results, so mutating them cannot corrupt the cache.
+    """
+
+    def __init__(self, db_path: str = 'search_cache.db', max_entries: int = 512,
+                 ttl_seconds: float = 3600, shared_max_entries: int = 5000):
+        self.db_path = db_path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.shared_max_entries = shared_max_entries
+
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._version = None
+        # Shared-store hits whose last_used is written with the next put
+        self._touched = {}
+
+        # Hit-rate counters (per process)
+        self.memory_hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+        self.init_store()
+
+    def init_store(self):
+        """Create the shared cache table"""
+        try:
+            conn = self._connect()
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS search_cache (
+                    cache_key TEXT PRIMARY KEY,
+                    catalog_version INTEGER,
+                    results TEXT,
+                    created_at REAL,
+                    last_used REAL
+                )
+            ''')
+            conn.execute('CREATE INDEX IF NOT EXISTS idx_cache_last_used ON search_cache(last_used)')
+            conn.commit()
+            conn.close()
+        except sqlite3.Error as e:
+            print(f"Warning: Could not initialize search cache store: {e}")
+            self.db_path = None
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=5)
+
+    @staticmethod
+    def make_key(search_term: str, limit: int, filters: Optional[Dict] = None) -> str:
+        """Normalize query, limit and filters into a cache key"""
+        normalized = ' '.join(search_term.lower().split())
+        filter_items = sorted((k, str(v)) for k, v in (filters or {}).items() if v not in (None, '', []))
+        return json.dumps([normalized, int(limit), filter_items], separators=(',', ':'))
+
+    def get_or_compute(self, search_term: str, limit: int, filters: Optional[Dict],
+                       catalog_version: int, compute: Callable[[], object]):
+        """Return cached results for the query or compute and store them"""
+        key = self.make_key(search_term, limit, filters)
+        self._check_version(catalog_version)
+
+        cached = self._memory_get(key)
+        if cached is not None:
+            self.memory_hits += 1
+            return copy.deepcopy(cached)
+
+        cached = self._shared_get(key, catalog_version)
+        if cached is not None:
+            self.shared_hits += 1
+            self._memory_put(key, cached)
+            return copy.deepcopy(cached)
+
+        self.misses += 1
+        results = compute()
+        self._memory_put(key, copy.deepcopy(results))
+        self._shared_put(key, catalog_version, results)
+        return results
+
+    def _check_version(self, catalog_version: int):
+        """Drop in-process entries computed against an older catalog"""
+        with self._lock:
+            if self._version == catalog_version:
+                return
+            if self._version is not None:
+                self.invalidations += 1
+            self._version = catalog_version
+            self._entries.clear()
+        if self.db_path:
+            try:
+                conn = self._connect()
+                conn.execute('DELETE FROM search_cache WHERE catalog_version != ?', (catalog_version,))
+                conn.commit()
+                conn.close()
+            except sqlite3.Error:
+                pass
+
+    def _memory_get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            created_at, results = entry
+            if time.time() - created_at > self.ttl_seconds:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return results
+
+    def _memory_put(self, key: str, results):
+        with self._lock:
+            self._entries[key] = (time.time(), results)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def _shared_get(self, key: str, catalog_version: int):
+        if not self.db_path:
+            return None
+        try:
+            conn = self._connect()
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT results FROM search_cache
+                WHERE cache_key = ? AND catalog_version = ? AND created_at > ?
+            ''', (key, catalog_version, time.time() - self.ttl_seconds))
+            row = cursor.fetchone()
+            conn.close()
+        except sqlite3.Error:
+            return None
+        if not row:
+            return None
+        with self._lock:
+            self._touched[key] = time.time()
+        return self._decode(json.loads(row[0]))
+
+    def _shared_put(self, key: str, catalog_version: int, results):
+        if not self.db_path:
+            return
+        now = time.time()
+        with self._lock:
+            touched, self._touched = self._touched, {}
+        try:
+            conn = self._connect()
+            # last_used of the shared hits since the previous put, for LRU eviction
+            conn.executemany('UPDATE search_cache SET last_used = ? WHERE cache_key = ?',
+                             [(used, touched_key) for touched_key, used in touched.items()])
+            conn.execute('''
+                INSERT OR REPLACE INTO search_cache (cache_key, catalog_version, results, created_at, last_used)
+                VALUES (?, ?, ?, ?, ?)
+            ''', (key, catalog_version, json.dumps(results), now, now))
+            # Keep the shared store bounded by evicting least recently used rows
+            conn.execute('''
+                DELETE FROM search_cache WHERE cache_key IN (
+                    SELECT cache_key FROM search_cache
+                    ORDER BY last_used DESC
+                    LIMIT -1 OFFSET ?
+                )
+            ''', (self.shared_max_entries,))
+            conn.commit()
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+    @staticmethod
+    def _decode(results):
+        """Restore row tuples after a JSON round trip"""
+        if isinstance(results, list):
+            return [tuple(r) if isinstance(r, list) else r for r in results]
+        if isinstance(results, dict) and isinstance(results.get('results'), list):
+            return dict(results, results=[tuple(r) if isinstance(r, list) else r for r in results['results']])
+        return results
+
+    def clear(self):
+        """Remove all cached entries (in-process and shared)"""
+        with self._lock:
+            self._entries.clear()
+        if self.db_path:
+            try:
+                conn = self._connect()
+                conn.execute('DELETE FROM search_cache')
+                conn.commit()
+                conn.close()
+            except sqlite3.Error:
+                pass
+
+    def stats(self) -> Dict:
+        """Return hit-rate counters for this process"""
+        lookups = self.memory_hits + self.shared_hits + self.misses
+        hits = self.memory_hits + self.shared_hits
+        return {
+            'catalog_version': self._version,
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+            'ttl_seconds': self.ttl_seconds,
+            'lookups': lookups,
+            'memory_hits': self.memory_hits,
+            'shared_hits': self.shared_hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations,
+            'hit_rate': round(hits / lookups, 4) if lookups else 0.0
+        }
@@ -1,6 +1,11 @@
 from flask import Flask, request, jsonify, send_file
-import csv, io, time, requests, zipfile, os, sqlite3
+import csv, io, json, time, requests, zipfile, os, sqlite3, hashlib
+from acs_columnar import ColumnarStore, columnar_dir_for
 from acs_database import ACSDatabase
+from acs_export import parquet_bytes
+from acs_snapshots import current_snapshot, open_snapshot, read_manifest
+from acs_store import data_stats, fetch_series
+from search_cache import SearchCache
 import openai
 from dotenv import load_dotenv
 
@@ -9,11 +14,34 @@ load_dotenv()
 
 app = Flask(__name__)
 
+ASSETS_DIR = os.path.join(os.path.dirname(__file__), "assets")
+
 # Serve static files from assets directory
 @app.route('/assets/<path:filename>')
 def serve_static(filename):
+    # Content-hashed search index builds never change: serve precompressed and cache forever
+    if filename.startswith('search-index.') and filename.endswith('.json'):
+        accepted = request.headers.get('Accept-Encoding', '')
+        for encoding, suffix in (('br', '.br'), ('gzip', '.gz')):
+            if encoding in accepted and os.path.exists(os.path.join(ASSETS_DIR, filename + suffix)):
+                resp = send_file(f'assets/{filename}{suffix}', mimetype='application/json')
+                resp.headers['Content-Encoding'] = encoding
+                break
+        else:
+            resp = send_file(f'assets/{filename}', mimetype='application/json')
+        resp.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+        resp.headers['Vary'] = 'Accept-Encoding'
+        return resp
     return send_file(f'assets/{filename}')
 
+def search_index_url():
+    """URL of the current static search index build, or '' if none has been built"""
+    try:
+        with open(os.path.join(ASSETS_DIR, 'search-index-manifest.json')) as f:
+            return json.load(f).get('url', '')
+    except (OSError, ValueError):
+        return ''
+
 CENSUS_BASE = "https://api.census.gov/data"
 DATASET = "acs/acs5"
 STATE_FIPS = "13"
@@ -26,6 +54,12 @@ COUNTIES = {
     "Effingham": "103"
 }
 DEFAULT_COUNTY = "Chatham"
+
+# Collected ACS values (see comprehensive_acs_collector.py / collect_2017_2020_acs_data.py),
+# read from the snapshot the collectors last published (see acs_snapshots.py)
+DATA_DB = os.environ.get("ACS_DATA_DB", "comprehensive_acs_data.db")
+SNAPSHOT_DIR = os.environ.get("ACS_SNAPSHOT_DIR", "snapshots")
+DATA_YEARS = "2017-2023"
 DEFAULT_API_KEY = os.environ.get("CENSUS_API_KEY", "1f9fd90d5bd516181c8cbc907122204225f71b35")
 OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY")
 
@@ -33,9 +67,16 @@ OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY")
 DOWNLOADS_DIR = os.path.join(os.path.dirname(__file__), "csv-downloads")
 os.makedirs(DOWNLOADS_DIR, exist_ok=True)
 
+# Shared search result cache (SQLite-backed so both gunicorn workers reuse hits)
+search_cache = SearchCache(
+    db_path=os.environ.get("SEARCH_CACHE_DB", "search_cache.db"),
+    max_entries=int(os.environ.get("SEARCH_CACHE_SIZE", "512")),
+    ttl_seconds=float(os.environ.get("SEARCH_CACHE_TTL", "3600"))
+)
+
 # Initialize ACS database for variable search
 try:
-    acs_db = ACSDatabase()
+    acs_db = ACSDatabase(search_cache=search_cache)
 except Exception as e:
     print(f"Warning: Could not initialize ACS database: {e}")
     acs_db = None
@@ -114,43 +155,76 @@ def build_geo_params(geo, county_name=None):
         return {"for": "block group:*", "in": f"state:{STATE_FIPS} county:{county_fips} tract:*"}
     raise ValueError("Invalid geo")
 
-def get_actual_data_values(variable_ids, year=2023, county_name="Chatham"):
-    """Query actual data values from comprehensive_acs_data.db"""
+def open_data_db():
+    """Read-only connection to the collected data (never creates an empty file)
+
+    The live snapshot is looked up on every call, so a newly published one is
+    picked up without a restart. Until one is published, the collectors'
+    database is read directly.
+    """
+    snapshot = current_snapshot(SNAPSHOT_DIR)
+    if snapshot:
+        return open_snapshot(snapshot)
+    return sqlite3.connect(f"file:{DATA_DB}?mode=ro", uri=True)
+
+# Memory-mapped arrays of the live snapshot, reopened when a new snapshot is published
+_columnar = {'directory': None, 'store': None}
+
+def columnar_store():
+    """ColumnarStore of the live snapshot, or None (no snapshot, no export or no NumPy)"""
+    snapshot = current_snapshot(SNAPSHOT_DIR)
+    if not snapshot:
+        return None
+    directory = columnar_dir_for(snapshot)
+    if _columnar['directory'] != directory:
+        try:
+            store = ColumnarStore(directory)
+        except (OSError, ValueError, RuntimeError):
+            store = None
+        _columnar.update(directory=directory, store=store)
+    return _columnar['store']
+
+def fetch_data_series(variable_ids, years, county_fips_list):
+    """(variable_id, county_fips, year, value, moe) rows from the columnar arrays, else from SQLite"""
+    store = columnar_store()
+    if store:
+        return store.fetch_series(variable_ids, years, county_fips_list)
+    conn = open_data_db()
     try:
-        conn = sqlite3.connect('comprehensive_acs_data.db')
-        cursor = conn.cursor()
-        
-        # Create placeholders for the IN clause
-        placeholders = ','.join(['?' for _ in variable_ids])
-        
-        query = f'''
-            SELECT variable_id, value, county_name
-            FROM acs_data 
-            WHERE variable_id IN ({placeholders})
-            AND year = ?
-            AND county_name LIKE ?
-        '''
-        
-        params = variable_ids + [year, f'%{county_name}%']
-        cursor.execute(query, params)
-        results = cursor.fetchall()
-        
+        return fetch_series(conn, variable_ids, years, county_fips_list)
+    finally:
         conn.close()
-        
-        # Convert to dictionary for easy lookup
-        data_values = {}
-        for var_id, value, county in results:
-            data_values[var_id] = {
-                'value': value,
-                'county': county
-            }
-        
-        return data_values
-        
+
+def get_actual_data_values(variable_ids, year=2023, county_name="Chatham", years=None):
+    """Query actual data values from comprehensive_acs_data.db
+
+    Returns {var_id: {'value', 'county'[, 'margin_of_error']}} for one year, or
+    {var_id: {year: {...}}} when a list of years is given.
+    """
+    # Exact county match, resolved to FIPS before touching the database
+    county = str(county_name or DEFAULT_COUNTY).strip().title()
+    county_fips = COUNTIES.get(county)
+    if county_fips is None:
+        return {}
+    try:
+        rows = fetch_data_series(list(variable_ids), years or [year], [county_fips])
     except Exception as e:
         print(f"Error querying data values: {e}")
         return {}
 
+    data_values = {}
+    for var_id, _, row_year, value, moe in rows:
+        if value is None:
+            continue
+        entry = {'value': value, 'county': county}
+        if moe is not None:
+            entry['margin_of_error'] = moe
+        if years:
+            data_values.setdefault(var_id, {})[row_year] = entry
+        else:
+            data_values[var_id] = entry
+    return data_values
+
 def parse_years(value, default=2023):
     try:
         if isinstance(value, int):
@@ -173,7 +247,8 @@ def parse_years(value, default=2023):
                     continue
                 if start > end:
                     start, end = end, start
-                for y in range(start, end + 1):
+                # Clamp before expanding, so a range like 0-99999999 is never materialised
+                for y in range(max(start, 2010), min(end, 2099) + 1):
                     years.add(y)
             else:
                 try:
@@ -273,8 +348,19 @@ def build_csv_for_year(year, geo, tables, include_moe, api_key, county_name=None
     var_fields = sorted([h for h in headers_all if h not in geo_fields + ["NAME"]])
     fieldnames = geo_fields + ["NAME"] + var_fields
 
+    # Precomputed hierarchy paths from the catalog's table tree (falls back to parsing labels)
+    tree_paths = {}
+    if acs_db:
+        try:
+            tree_paths = acs_db.get_variable_paths(var_fields, year)
+        except Exception:
+            tree_paths = {}
+
     # Build human-friendly labels for variable columns
     def pretty_label(var: str) -> str:
+        if var in tree_paths:
+            prefix = "Margin of Error" if var.endswith("M") else "Estimate"
+            return f"{prefix} -> {tree_paths[var]}".replace(':', '')
         meta = variables_meta.get(var, {})
         label = meta.get("label") or var
         try:
@@ -320,13 +406,16 @@ def download():
     tables = [t.strip() for t in payload.get("tables", "").replace(",", " ").split() if t.strip()]
     include_moe = bool(payload.get("include_moe", False))
     api_key = payload.get("api_key") or DEFAULT_API_KEY or None
-    format_type = payload.get("format", "zip")  # "zip" or "combined"
+    format_type = payload.get("format", "zip")  # "zip", "combined" or "parquet" (collected data)
     calculations = payload.get("calculations", [])
     print(f"Received calculations: {calculations}")
 
     if not tables:
         return jsonify({"error": "Please provide at least one ACS table ID"}), 400
 
+    if format_type == "parquet":
+        return download_parquet(years, geo, county, tables, include_moe)
+
     # Validate variables exist for each requested year
     bad_years = []
     for y in years:
@@ -397,18 +486,66 @@ def download():
         except Exception as e:
             return jsonify({"error": f"Failed to build ZIP: {e}"}), 502
 
+def download_parquet(years, geo, county, tables, include_moe):
+    """Parquet file of collected county values (local data store, no Census API calls)
+
+    Dictionary-encoded IDs, one row per variable, county and year; county may be "all".
+    """
+    if geo != "county":
+        return jsonify({"error": "Parquet downloads cover the collected county data; use geo=county"}), 400
+    if str(county).strip().lower() == "all":
+        counties = list(COUNTIES)
+    else:
+        counties = [str(county or DEFAULT_COUNTY).strip().title()]
+        if counties[0] not in COUNTIES:
+            return jsonify({"error": f"Unknown county: {county}. Choose from {', '.join(COUNTIES)}"}), 400
+    table_ids = sorted({t.upper() for t in tables})
+    try:
+        conn = open_data_db()
+        try:
+            mem, rows = parquet_bytes(conn, years, table_ids, [COUNTIES[c] for c in counties], include_moe)
+        finally:
+            conn.close()
+    except RuntimeError as e:
+        return jsonify({"error": str(e)}), 501
+    except sqlite3.Error as e:
+        return jsonify({"error": f"Data store not available: {e}"}), 503
+    if not rows:
+        return jsonify({"error": f"No collected data for {', '.join(table_ids)} in {years[0]}-{years[-1]}"}), 404
+    county_slug = "all_counties" if len(counties) > 1 else counties[0].lower().replace(" ", "_")
+    name = f"{county_slug}_acs_{'_'.join(table_ids[:3])}_{years[0]}-{years[-1]}.parquet"
+    return send_file(mem, mimetype="application/vnd.apache.parquet", as_attachment=True, download_name=name)
+
 @app.route('/api/search-variables')
 def search_variables():
-    """Search ACS variables by name, concept, or ID"""
+    """Search ACS variables by name, concept, or ID.
+
+    Optional filters: year, family (B/C/S/DP), kind (estimate/moe) and group.
+    Pass facets=1 to get {"results", "total", "facets"} instead of a plain list.
+    """
     if not acs_db:
         return jsonify({"error": "Database not available"}), 503
     
     search_term = request.args.get('q', '').strip()
+    want_facets = request.args.get('facets', '').lower() in ('1', 'true', 'yes')
     if len(search_term) < 2:
-        return jsonify([])
+        return jsonify({"results": [], "total": 0, "facets": {}} if want_facets else [])
+    fuzzy = request.args.get('fuzzy', '').lower() in ('1', 'true', 'yes')
+    filters = {key: request.args.get(key) for key in ('year', 'family', 'kind', 'group') if request.args.get(key)}
+    try:
+        limit = max(1, min(int(request.args.get('limit', 20)), 100))
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
     
     try:
-        results = acs_db.search_variables(search_term, limit=20)
+        faceted = None
+        if filters or want_facets:
+            # Facet counts (COUNT/GROUP BY over every match) only when asked for
+            faceted = acs_db.search_variables_faceted(search_term, limit=limit, filters=filters, fuzzy=fuzzy,
+                                                      facets=want_facets)
+            results = faceted['results']
+        else:
+            results = acs_db.search_variables(search_term, limit=limit, fuzzy=fuzzy)
         # Convert to format expected by frontend
         formatted_results = []
         for var_id, name, concept, group_name, year in results:
@@ -421,10 +558,193 @@ def search_variables():
                 'concept': concept,
                 'group': group_name
             })
+        if want_facets:
+            return jsonify({
+                'results': formatted_results,
+                'total': faceted['total'],
+                'facets': faceted['facets']
+            })
         return jsonify(formatted_results)
+    except ValueError as e:
+        return jsonify({"error": f"Invalid filter: {e}"}), 400
     except Exception as e:
         return jsonify({"error": f"Search failed: {e}"}), 500
 
+@app.route('/api/tables/<table_id>/tree')
+def table_tree(table_id):
+    """Return the precomputed parent/child hierarchy of a table"""
+    if not acs_db:
+        return jsonify({"error": "Database not available"}), 503
+    
+    year = request.args.get('year')
+    try:
+        year = int(year) if year else None
+    except ValueError:
+        return jsonify({"error": "year must be an integer"}), 400
+    
+    try:
+        tree = acs_db.get_table_tree(table_id, year)
+    except Exception as e:
+        return jsonify({"error": f"Failed to load table tree: {e}"}), 500
+    if not tree:
+        return jsonify({"error": f"No hierarchy found for table {table_id}"}), 404
+    
+    # Trees only change when the catalog is reloaded, so the catalog version makes a stable ETag
+    etag = f"{tree['table_id']}-{tree['year']}-v{acs_db.get_catalog_version()}"
+    if request.if_none_match.contains(etag):
+        resp = app.response_class(status=304)
+    else:
+        resp = jsonify(tree)
+    resp.set_etag(etag)
+    resp.headers["Cache-Control"] = "public, max-age=300"
+    return resp
+
+@app.route('/api/variables')
+def variables_details():
+    """Details for many variables at once: ids=B01001_001E,B19013_001E[&fields=name,concept,attributes]
+
+    attributes and var_values (JSON) are only included when listed in fields.
+    """
+    if not acs_db:
+        return jsonify({"error": "Database not available"}), 503
+    
+    var_ids = list(dict.fromkeys(v.strip().upper() for v in request.args.get('ids', '').split(',') if v.strip()))
+    if not var_ids:
+        return jsonify({"error": "ids is required, e.g. ids=B01001_001E,B19013_001E"}), 400
+    if len(var_ids) > 1000:
+        return jsonify({"error": "at most 1000 ids per request"}), 400
+    fields = [f.strip() for f in request.args.get('fields', '').split(',') if f.strip()] or None
+    
+    # The catalog only changes on reload, so its version plus the query makes a stable ETag
+    query = ','.join(var_ids) + '|' + ','.join(fields or [])
+    etag = f"vars-{hashlib.sha1(query.encode()).hexdigest()[:16]}-v{acs_db.get_catalog_version()}"
+    if request.if_none_match.contains(etag):
+        resp = app.response_class(status=304)
+    else:
+        try:
+            details = acs_db.get_variables_details(var_ids, fields=fields)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        except Exception as e:
+            return jsonify({"error": f"Lookup failed: {e}"}), 500
+        resp = jsonify({
+            'variables': details,
+            'missing': [var_id for var_id in var_ids if var_id not in details]
+        })
+    resp.set_etag(etag)
+    resp.headers["Cache-Control"] = "public, max-age=300"
+    return resp
+
+@app.route('/api/series')
+def data_series():
+    """Time series of collected values, answered from the local data store in one query
+    (or from the memory-mapped arrays of the live snapshot, see acs_columnar.py).
+
+    Params: variables (comma-separated IDs, required), counties (names or "all",
+    default Chatham), years (e.g. 2017-2023, the default; intersected with the
+    collected years) and format=columnar for parallel arrays instead of one
+    series per variable and county.
+    """
+    variable_ids = [v.strip().upper() for v in request.args.get('variables', '').split(',') if v.strip()]
+    if not variable_ids:
+        return jsonify({"error": "variables is required, e.g. variables=B19013_001E"}), 400
+    if len(variable_ids) > 500:
+        return jsonify({"error": "at most 500 variables per request"}), 400
+
+    county_arg = request.args.get('counties', DEFAULT_COUNTY).strip()
+    if county_arg.lower() == 'all':
+        counties = list(COUNTIES)
+    else:
+        counties = list(dict.fromkeys(c.strip().title() for c in county_arg.split(',') if c.strip()))
+        unknown = [c for c in counties if c not in COUNTIES]
+        if unknown or not counties:
+            return jsonify({"error": f"Unknown county: {', '.join(unknown)}. Choose from {', '.join(COUNTIES)}"}), 400
+    collected_years = set(parse_years(DATA_YEARS))
+    requested = parse_years(request.args.get('years') or DATA_YEARS, default=None)
+    years = [y for y in requested if y in collected_years]
+    if not years:
+        return jsonify({"error": f"years must fall within {DATA_YEARS}"}), 400
+    columnar = request.args.get('format', '').lower() == 'columnar'
+
+    try:
+        rows = fetch_data_series(variable_ids, years, [COUNTIES[c] for c in counties])
+    except sqlite3.Error as e:
+        return jsonify({"error": f"Data store not available: {e}"}), 503
+
+    county_names = {fips: name for name, fips in COUNTIES.items()}
+    if columnar:
+        body = {'years': years, 'variable': [], 'county': [], 'year': [], 'value': [], 'moe': []}
+        for var_id, fips, year, value, moe in rows:
+            body['variable'].append(var_id)
+            body['county'].append(county_names[fips])
+            body['year'].append(year)
+            body['value'].append(value)
+            body['moe'].append(moe)
+    else:
+        # One entry per variable and county, values aligned with "years" (null where missing)
+        position = {year: i for i, year in enumerate(years)}
+        series = {}
+        for var_id, fips, year, value, moe in rows:
+            entry = series.setdefault((var_id, fips), {
+                'variable': var_id, 'county': county_names[fips],
+                'values': [None] * len(years), 'moe': [None] * len(years)
+            })
+            i = position[year]
+            entry['values'][i] = value
+            entry['moe'][i] = moe
+        body = {'years': years, 'series': list(series.values())}
+
+    payload = json.dumps(body, separators=(',', ':'))
+    # Content hash: identical answers revalidate with a 304 until the data is re-collected
+    etag = hashlib.sha1(payload.encode()).hexdigest()
+    if request.if_none_match.contains(etag):
+        resp = app.response_class(status=304)
+    else:
+        resp = app.response_class(payload, mimetype='application/json')
+    resp.set_etag(etag)
+    resp.headers["Cache-Control"] = "public, max-age=300"
+    return resp
+
+@app.route('/api/stats')
+def database_stats():
+    """Counts for the variable catalog and the collected data.
+
+    Both are read from stored statistics (catalog_meta and acs_data_stats),
+    never from a scan of the variables or the values; "snapshot" describes
+    the published snapshot being served.
+    """
+    body = {'catalog': None, 'data': None, 'snapshot': read_manifest(SNAPSHOT_DIR)}
+    if acs_db:
+        try:
+            body['catalog'] = acs_db.get_database_stats()
+        except sqlite3.Error as e:
+            body['catalog_error'] = str(e)
+    try:
+        conn = open_data_db()
+        try:
+            body['data'] = data_stats(conn)
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        body['data_error'] = str(e)
+    if body['catalog'] is None and body['data'] is None:
+        return jsonify({"error": "No database available", **body}), 503
+
+    payload = json.dumps(body, separators=(',', ':'))
+    etag = hashlib.sha1(payload.encode()).hexdigest()
+    if request.if_none_match.contains(etag):
+        resp = app.response_class(status=304)
+    else:
+        resp = app.response_class(payload, mimetype='application/json')
+    resp.set_etag(etag)
+    resp.headers["Cache-Control"] = "public, max-age=60"
+    return resp
+
+@app.route('/api/search-cache/stats')
+def search_cache_stats():
+    """Report search cache hit-rate counters for this worker"""
+    return jsonify(search_cache.stats())
+
 @app.route('/api/ask-chatgpt', methods=['POST'])
 def ask_chatgpt():
     """Ask ChatGPT questions about ACS data using the SQLite database exclusively"""
@@ -513,7 +833,9 @@ def ask_chatgpt():
         
         # For median household income, prioritize the main variable
         if 'median household income' in question_lower:
-            search_results = acs_db.search_variables('B19013_001E', limit=1)
+            details = acs_db.get_variables_details(['B19013_001E'], fields=['name', 'concept', 'group_name', 'year'])
+            search_results = [(var_id, d['name'], d['concept'], d['group_name'], d['year'])
+                              for var_id, d in details.items()]
             if not search_results:
                 search_results = acs_db.search_variables('median household income', limit=2)
         else:
@@ -570,6 +892,8 @@ def ask_chatgpt():
             if var_id in actual_data:
                 var_data['actual_value'] = actual_data[var_id]['value']
                 var_data['county'] = actual_data[var_id]['county']
+                if 'margin_of_error' in actual_data[var_id]:
+                    var_data['margin_of_error'] = actual_data[var_id]['margin_of_error']
                 context_data.append(var_data)  # Only add if we have actual data
         
         # Create conversational context for ChatGPT
@@ -764,6 +1088,7 @@ Tokens: <code class="code">B01001</code> (totals), <code class="code">B01001_003
         <select id="format" class="form__select">
           <option value="zip">ZIP archive (separate files)</option>
           <option value="combined" selected>Single CSV (one year per row)</option>
+          <option value="parquet">Parquet (collected county data)</option>
         </select>
         <p class="form__help">Choose how to organize data when downloading multiple years</p>
       </div>
@@ -945,6 +1270,60 @@ Tokens: <code class="code">B01001</code> (totals), <code class="code">B01001_003
       searchResults.style.display = 'block';
     }
 
+    // Static search index (built by build_search_index.py); searched locally with no round-trips
+    const SEARCH_INDEX_URL = '__SEARCH_INDEX_URL__';
+    let localIndex = null;
+    let localIndexLoading = null;
+
+    function loadLocalIndex() {
+      if (!SEARCH_INDEX_URL || localIndex || localIndexLoading) return localIndexLoading;
+      localIndexLoading = fetch(SEARCH_INDEX_URL)
+        .then(response => response.json())
+        .then(index => {
+          const count = index.var_table.length;
+          const haystacks = new Array(count);
+          const tableHaystacks = index.tables.map((t, i) => (t + ' ' + index.concepts[i]).toLowerCase());
+          for (let i = 0; i < count; i++) {
+            haystacks[i] = index.var_label[i].toLowerCase();
+          }
+          localIndex = { ...index, haystacks, tableHaystacks };
+          return localIndex;
+        })
+        .catch(error => {
+          console.error('Search index unavailable:', error);
+          return null;
+        });
+      return localIndexLoading;
+    }
+
+    function searchLocalIndex(query, limit = 20) {
+      const phrase = query.toLowerCase().trim();
+      const words = phrase.split(/\s+/).filter(w => w);
+      const ranked = [[], [], [], []];
+      const idx = localIndex;
+      for (let i = 0; i < idx.var_table.length; i++) {
+        const t = idx.var_table[i];
+        const label = idx.haystacks[i];
+        const varId = (idx.tables[t] + '_' + idx.var_suffix[i]).toLowerCase();
+        const tableText = idx.tableHaystacks[t];
+        if (!words.every(w => label.includes(w) || tableText.includes(w) || varId.includes(w))) continue;
+        // Same priority order as the server: phrase in label, in ID, in concept, then other matches
+        const rank = label.includes(phrase) ? 0 : varId.includes(phrase) ? 1 : tableText.includes(phrase) ? 2 : 3;
+        if (ranked[rank].length < limit) ranked[rank].push(i);
+        if (ranked[0].length >= limit) break;
+      }
+      return ranked.flat().slice(0, limit).map(i => {
+        const t = idx.var_table[i];
+        return {
+          id: idx.tables[t] + '_' + idx.var_suffix[i],
+          table_id: idx.tables[t],
+          name: 'Estimate!!' + idx.var_label[i],
+          concept: idx.concepts[t],
+          group: idx.tables[t]
+        };
+      });
+    }
+
     function performSearch(query) {
       if (query.length < 2) {
         searchResults.style.display = 'none';
@@ -955,12 +1334,31 @@ Tokens: <code class="code">B01001</code> (totals), <code class="code">B01001_003
       // Extract search terms for highlighting
       const searchTerms = query.trim().split(/\s+/).filter(term => term.length > 0);
 
+      // Answer locally when the index is loaded; only typo-level (deep) queries go to the server
+      if (localIndex) {
+        const localResults = searchLocalIndex(query);
+        if (localResults.length > 0) {
+          searchSpinner.style.display = 'none';
+          displaySearchResults(localResults, searchTerms);
+          return;
+        }
+      }
+
       // Show spinner
       searchSpinner.style.display = 'block';
       searchResults.style.display = 'none';
 
-      fetch(`/api/search-variables?q=${encodeURIComponent(query)}`)
+      // Only estimates are useful here (MOE and annotation rows map to the same tables)
+      fetch(`/api/search-variables?q=${encodeURIComponent(query)}&kind=estimate`)
         .then(response => response.json())
+        .then(data => {
+          // No exact matches: retry once with typo-tolerant matching
+          if (Array.isArray(data) && data.length === 0) {
+            return fetch(`/api/search-variables?q=${encodeURIComponent(query)}&kind=estimate&fuzzy=1`)
+              .then(response => response.json());
+          }
+          return data;
+        })
         .then(data => {
           // Hide spinner
           searchSpinner.style.display = 'none';
@@ -985,6 +1383,7 @@ Tokens: <code class="code">B01001</code> (totals), <code class="code">B01001_003
 
     // Set up search input event listener
     if (searchInput) {
+      searchInput.addEventListener('focus', loadLocalIndex);
       searchInput.addEventListener('input', function() {
         clearTimeout(searchTimeout);
         const query = this.value.trim();
@@ -1409,6 +1808,7 @@ Tokens: <code class="code">B01001</code> (totals), <code class="code">B01001_003
 </html>
 """
     from flask import make_response
+    html = html.replace("__SEARCH_INDEX_URL__", search_index_url())
     resp = make_response(html)
     resp.headers["Cache-Control"] = "no-store"
     return resp
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Offline ingestion of ACS 5-year summary files, a bulk alternative to the API.
+The Census Bureau publishes every detailed table of a year as one pipe-delimited
+file per table (the table-based summary file, 2021 onward):
+
+  acsdt5y2022-b01001.dat
+  GEO_ID|B01001_E001|B01001_M001|B01001_E002|...
+  0500000US13051|295291|*****|144170|...
+
+Each file is streamed in chunks; only rows whose GEO_ID is one of the
+configured counties are decoded and split, and reading stops as soon as all
+of them were seen (county rows come before the tract and block group rows).
+
+Scanning and parsing are CPU-bound; with workers > 1 the table files are
+spread over a process pool. A worker returns a compact batch per file (value
+and MOE matrices as array('d'), pickled as raw bytes) rather than per-row
+objects, and the collectors' CollectionPipeline turns batches into rows for
+the same single writer as API results (acs_store.insert_data_rows, one
+collection_log row per table), with zero API calls.
+
+The older sequence-based summary files (2020 and earlier) are not supported,
+so only the comprehensive collector offers --summary-files.
+"""
+
+import glob
+import logging
+import math
+import os
+import re
+from array import array
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Optional, Tuple
+
+from acs_store import deferred_indexes, estimate_id
+from collection_pipeline import CollectionPipeline
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_FILE_PATTERN = re.compile(r"^acsdt5y(\d{4})-([a-z0-9]+)\.dat$", re.IGNORECASE)
+# B01001_E001 -> B01001_001E (the API's variable ids)
+SUMMARY_COLUMN_PATTERN = re.compile(r"^([A-Z0-9]+)_([EM])(\d+)$")
+# Summary level 050 (county) GEO_IDs: 0500000US + state FIPS + county FIPS
+COUNTY_GEO_PREFIX = "0500000US"
+READ_CHUNK_BYTES = 1 << 22
+
+
+def summary_variable_id(column: str) -> Optional[str]:
+    """API variable id of a summary file column, or None for GEO_ID and other non-value columns."""
+    match = SUMMARY_COLUMN_PATTERN.match(column.strip().upper())
+    if not match:
+        return None
+    table_id, kind, line = match.groups()
+    return f"{table_id}_{line}{kind}"
+
+
+def county_geo_ids(state_fips: str, counties: Dict[str, str]) -> Dict[str, str]:
+    """{GEO_ID: county_name} of the configured counties."""
+    return {f"{COUNTY_GEO_PREFIX}{state_fips}{fips}": name for name, fips in counties.items()}
+
+
+def find_summary_files(directory: str, year, tables: List[str] = None) -> List[Tuple[str, str]]:
+    """(table_id, path) of the year's table files in directory, optionally only the given tables."""
+    wanted = {table.upper() for table in tables} if tables else None
+    files = []
+    for path in sorted(glob.glob(os.path.join(directory, f"acsdt5y{year}-*.dat"))):
+        match = SUMMARY_FILE_PATTERN.match(os.path.basename(path))
+        if not match:
+            continue
+        table_id = match.group(2).upper()
+        if wanted is None or table_id in wanted:
+            files.append((table_id, path))
+    return files
+
+
+def summary_file_units(directory: str, years: List, tables: List[str] = None) -> List[Dict]:
+    """One collection unit per table file."""
+    units = []
+    for year in years:
+        files = find_summary_files(directory, year, tables)
+        if not files:
+            logger.warning(f"No {year} summary files (acsdt5y{year}-*.dat) in {directory}")
+        for table_id, path in files:
+            units.append({'year': str(year), 'table_id': table_id, 'path': path, 'dataset': 'summary file'})
+    return units
+
+
+def _summary_row(line: bytes, columns: List[Tuple[int, str]]) -> List[str]:
+    """[GEO_ID, field of each value column] of a raw data line."""
+    fields = line.decode("utf-8", "replace").rstrip("\r").split("|")
+    return [fields[0]] + [fields[index] if index < len(fields) else "" for index, _ in columns]
+
+
+def read_summary_file(path: str, geo_ids: Dict[str, str]) -> Tuple[List[str], List[List[str]]]:
+    """(variable ids, rows) of the wanted geographies; row fields follow the variable ids.
+
+    The file is read in binary chunks searched with bytes.find for the lines
+    starting like the wanted GEO_IDs, so other lines are never decoded or
+    split; reading stops once every wanted geography was found.
+    """
+    with open(path, "rb") as f:
+        header = f.readline().decode("utf-8", "replace").rstrip("\r\n").split("|")
+        columns = [(index, summary_variable_id(column)) for index, column in enumerate(header)]
+        columns = [(index, var_id) for index, var_id in columns if var_id]
+        wanted = {f"\n{geo_id}|".encode() for geo_id in geo_ids}
+        prefix = os.path.commonprefix(sorted(wanted)) if wanted else b"\n"
+        rows = []
+        tail = b"\n"  # the previous chunk's incomplete line, after its leading newline
+        while wanted:
+            chunk = f.read(READ_CHUNK_BYTES)
+            if not chunk:
+                break
+            buffer = tail + chunk
+            # Only complete lines are searched; the rest is carried into the next chunk
+            end = buffer.rfind(b"\n")
+            # One pass for the wanted GEO_IDs' common prefix ("\n0500000US13"), then an exact check
+            start = buffer.find(prefix, 0, end)
+            while start >= 0 and wanted:
+                line_end = buffer.index(b"\n", start + 1)
+                key = next((key for key in wanted if buffer.startswith(key, start)), None)
+                if key is not None:
+                    rows.append(_summary_row(buffer[start + 1:line_end], columns))
+                    wanted.discard(key)
+                start = buffer.find(prefix, line_end, end)
+            tail = buffer[end:]
+        # A last line without a trailing newline
+        if any(tail.startswith(key) for key in wanted):
+            rows.append(_summary_row(tail[1:], columns))
+    return [var_id for _, var_id in columns], rows
+
+
+def parse_summary_file(path: str, geo_ids: Dict[str, str]) -> Dict:
+    """Compact batch of a file's wanted rows; runs in a pool worker.
+
+    {'variables': estimate ids, 'geos': GEO_IDs, 'values': array('d'),
+    'moe': array('d'), 'text': {cell: [value, moe]}}. values and moe are
+    geos x variables, row-major, NaN where the file has no number; cells with
+    text (not numbers) are listed in text.
+    """
+    columns, rows = read_summary_file(path, geo_ids)
+    variables = list(dict.fromkeys(estimate_id(var_id) for var_id in columns))
+    position = {var_id: index for index, var_id in enumerate(variables)}
+    # (column's matrix cell offset, is MOE) for every value field of a row
+    targets = [(position[estimate_id(var_id)], var_id.endswith('M')) for var_id in columns]
+    width = len(variables)
+    values = array('d', [math.nan]) * (width * len(rows))
+    margins = array('d', [math.nan]) * (width * len(rows))
+    text = {}
+    for row_index, row in enumerate(rows):
+        base = row_index * width
+        for (offset, is_moe), field in zip(targets, row[1:]):
+            field = field.strip()
+            if not field:
+                continue
+            try:
+                (margins if is_moe else values)[base + offset] = float(field)
+            except ValueError:
+                text.setdefault(base + offset, [None, None])[is_moe] = field
+    return {'variables': variables, 'geos': [row[0] for row in rows],
+            'values': values, 'moe': margins, 'text': text}
+
+
+def batch_rows(batch: Dict, geo_ids: Dict[str, str], counties: Dict[str, str], year) -> List[Tuple]:
+    """acs_data rows of a parse_summary_file batch, as county_data_rows would build them."""
+    year = int(year)
+    variables, text = batch['variables'], batch['text']
+    width = len(variables)
+    rows = []
+    for row_index, geo_id in enumerate(batch['geos']):
+        county_name = geo_ids[geo_id]
+        county_fips = counties[county_name]
+        base = row_index * width
+        values = batch['values'][base:base + width].tolist()
+        margins = batch['moe'][base:base + width].tolist()
+        for offset, (var_id, value, moe) in enumerate(zip(variables, values, margins)):
+            if base + offset in text:
+                text_value, text_moe = text[base + offset]
+                value = text_value if text_value is not None else value
+                moe = text_moe if text_moe is not None else moe
+            if value != value:  # NaN
+                value = None
+            if moe != moe:
+                moe = None
+            if value is None and moe is None:
+                continue
+            rows.append((var_id, county_name, county_fips, year, value, moe, 'estimate'))
+    return rows
+
+
+def ingest_summary_files(db_path: str, directory: str, years: List, counties: Dict[str, str],
+                         state_fips: str, tables: List[str] = None, workers: int = 1) -> Dict:
+    """Load the summary files of the given years into the collected-data database; returns pipeline stats.
+
+    By default files are parsed in this process. With workers > 1 every file
+    is submitted to a process pool up front and batches reach the pipeline's
+    single writer in completion order. On one CPU the pool only adds pickling
+    overhead, so it is opt-in.
+    """
+    workers = max(1, workers or 1)
+    geo_ids = county_geo_ids(state_fips, counties)
+    units = summary_file_units(directory, years, tables)
+    logger.info(f"Ingesting {len(units)} summary files from {directory} for {len(counties)} counties "
+                f"with {workers} workers")
+
+    def rows(unit: Dict, batch: Dict) -> List[Tuple]:
+        return batch_rows(batch, geo_ids, counties, unit['year'])
+
+    if workers == 1:
+        pipeline = CollectionPipeline(db_path, counties, lambda pack: parse_summary_file(pack[0]['path'], geo_ids),
+                                      rows=rows)
+        with deferred_indexes(db_path):
+            return pipeline.run([[unit] for unit in units])
+
+    pool = ProcessPoolExecutor(max_workers=workers)
+    try:
+        futures = {pool.submit(parse_summary_file, unit['path'], geo_ids): unit for unit in units}
+        batches = {unit['path']: future for future, unit in futures.items()}
+        # Packs arrive as their files finish parsing, so the one fetch thread never waits on a slow file
+        ready = ([futures[future]] for future in as_completed(futures))
+        pipeline = CollectionPipeline(db_path, counties, lambda pack: batches[pack[0]['path']].result(), rows=rows)
+        with deferred_indexes(db_path):
+            return pipeline.run(ready)
+    finally:
+        # After a writer failure, files not parsed yet are dropped instead of waited for
+        pool.shutdown(cancel_futures=True)